@@ -0,0 +1,149 @@
+import base64
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from bson import json_util
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# MongoDB error code for an existing index with the same keys but other options
+INDEX_OPTIONS_CONFLICT = 85
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(value: Any, article_id: str) -> str:
+    """Opaque token for the sort key of the last article on a page"""
+    return base64.urlsafe_b64encode(json_util.dumps([value, article_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        value, article_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return value, article_id
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+
+
+def serialize_article(document: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-ready article; the canonical URL stored as _id is returned as `id`"""
+    article = {'id': document.pop('_id')}
+    for key, value in document.items():
+        article[key] = value.strftime(TIMESTAMP_FORMAT) if isinstance(value, datetime) else value
+    return article
+
+
+class ArticleStore:
+    """
+    Read queries over the articles collection written by the Faust worker.
+
+    Every query is backed by an index and pages with a cursor (the sort key
+    and _id of the last article returned) instead of skip/limit, so reading
+    page 1,000 costs the same as reading page 1.
+
+    Top-by-relevance is the exception: it sorts by relevance_score but
+    filters on a processed_at window, so no index serves both as a range.
+    Its indexes put processed_at after the sort keys, which avoids an
+    in-memory sort, but the scan also walks the index entries of articles
+    outside the window. A page costs more the smaller the window is compared
+    to the retention period, and deeper pages cost more as well.
+    """
+
+    def __init__(self, collection, retention_days: int = 30):
+        self.collection = collection
+        self.retention_days = retention_days
+
+    async def ensure_indexes(self):
+        """Create the indexes the queries below rely on (no-op if they already exist)"""
+        indexes = [
+            # Latest in a category
+            IndexModel([('categories', ASCENDING), ('processed_at', DESCENDING), ('_id', DESCENDING)],
+                       name='categories_processed_at'),
+            # Top by relevance, in a category or across all of them: read in sort order,
+            # with the processed_at window checked on the index keys
+            IndexModel([('categories', ASCENDING), ('relevance_score', DESCENDING), ('_id', DESCENDING),
+                        ('processed_at', DESCENDING)],
+                       name='categories_relevance_score'),
+            IndexModel([('relevance_score', DESCENDING), ('_id', DESCENDING), ('processed_at', DESCENDING)],
+                       name='relevance_score'),
+            # Latest from a source
+            IndexModel([('source', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+                       name='source_timestamp'),
+            # Keyword search over titles and summaries
+            IndexModel([('title', 'text'), ('summary', 'text')],
+                       weights={'title': 3, 'summary': 1}, name='title_summary_text'),
+        ]
+        await self.collection.create_indexes(indexes)
+        await self._ensure_ttl_index()
+        logger.info(f"Indexes ready on {self.collection.full_name}")
+
+    async def _ensure_ttl_index(self):
+        """TTL index for retention"""
+        expire_after = self.retention_days * 86400
+        try:
+            await self.collection.create_index(
+                [('processed_at', ASCENDING)], name='processed_at_ttl', expireAfterSeconds=expire_after
+            )
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # Retention was changed: update the existing index in place
+            await self.collection.database.command(
+                'collMod', self.collection.name,
+                index={'name': 'processed_at_ttl', 'expireAfterSeconds': expire_after}
+            )
+            logger.info(f"Article retention changed to {self.retention_days} days")
+
+    async def _page(self, query: Dict[str, Any], sort_field: str, limit: int,
+                    cursor: Optional[str], hint: Optional[str] = None) -> Dict[str, Any]:
+        """One page sorted by (sort_field, _id) descending, starting after `cursor`"""
+        if cursor:
+            value, article_id = decode_cursor(cursor)
+            query = {'$and': [query, {'$or': [
+                {sort_field: {'$lt': value}},
+                {sort_field: value, '_id': {'$lt': article_id}},
+            ]}]}
+
+        find = self.collection.find(query).sort([(sort_field, DESCENDING), ('_id', DESCENDING)])
+        if hint:
+            find = find.hint(hint)
+        documents = await find.limit(limit + 1).to_list(length=limit + 1)
+
+        # Fetching one extra document tells us whether there is a next page
+        next_cursor = None
+        if len(documents) > limit:
+            documents = documents[:limit]
+            last = documents[-1]
+            next_cursor = encode_cursor(last.get(sort_field), last['_id'])
+
+        return {
+            'articles': [serialize_article(document) for document in documents],
+            'next_cursor': next_cursor,
+        }
+
+    async def latest_in_category(self, category: str, limit: int, cursor: Optional[str] = None):
+        return await self._page({'categories': category}, 'processed_at', limit, cursor)
+
+    async def top_by_relevance(self, hours: float, limit: int, category: Optional[str] = None,
+                               cursor: Optional[str] = None):
+        since = datetime.utcnow() - timedelta(hours=hours)
+        query: Dict[str, Any] = {'processed_at': {'$gte': since}}
+        if category:
+            query['categories'] = category
+        # Without a hint the planner may pick a processed_at index and sort the window in memory
+        hint = 'categories_relevance_score' if category else 'relevance_score'
+        return await self._page(query, 'relevance_score', limit, cursor, hint=hint)
+
+    async def by_source(self, source: str, limit: int, cursor: Optional[str] = None):
+        return await self._page({'source': source}, 'timestamp', limit, cursor)
+
+    async def search(self, text: str, limit: int, cursor: Optional[str] = None):
+        """Full-text matches, newest first (a stable order that pages with a cursor)"""
+        return await self._page({'$text': {'$search': text}}, 'processed_at', limit, cursor)
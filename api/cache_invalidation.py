@@ -0,0 +1,75 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Optional
+
+from confluent_kafka import Consumer
+
+logger = logging.getLogger(__name__)
+
+
+class StoredNewsListener:
+    """
+    Follows stored-news, which the worker's MongoDB sink writes after each
+    bulk write, and invalidates the cache entries the stored batch affects.
+    Invalidating on processed-news instead would run ahead of the sink's
+    batched writes, and a query in between would cache the old page again.
+
+    Every API process needs every event for its own cache, so each one
+    joins a consumer group of its own, starts at the latest offset and never
+    commits. The blocking Kafka consumer runs on a daemon thread and hands
+    invalidations to the event loop that owns the cache.
+    """
+
+    def __init__(self, cache, bootstrap_servers: str, topic: str):
+        self.cache = cache
+        self.topic = topic
+        self.config = {
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': f"news-api-cache-{socket.gethostname()}-{os.getpid()}",
+            'auto.offset.reset': 'latest',
+            'enable.auto.commit': False,
+        }
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._run, name='cache-invalidation', daemon=True)
+        self._thread.start()
+        logger.info(f"Cache invalidation listening on {self.topic}")
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        consumer = Consumer(self.config)
+        consumer.subscribe([self.topic])
+        try:
+            while not self._stopping.is_set():
+                msg = consumer.poll(1.0)
+                if msg is None:
+                    continue
+                if msg.error():
+                    logger.warning(f"Cache invalidation consumer error: {msg.error()}")
+                    continue
+                self._handle(msg.value())
+        finally:
+            consumer.close()
+
+    def _handle(self, value: bytes):
+        try:
+            stored = json.loads(value)
+        except ValueError:
+            logger.warning("Skipping undecodable stored-news message")
+            return
+        asyncio.run_coroutine_threadsafe(
+            self.cache.invalidate_stored(stored.get('categories') or [], stored.get('sources') or []),
+            self._loop
+        )
@@ -0,0 +1,133 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from article_store import ArticleStore, InvalidCursor
+from cache_invalidation import StoredNewsListener
+from query_cache import MemoryBackend, QueryCache, RedisBackend
+from api_config import (
+    MONGO_URI,
+    MONGO_DATABASE,
+    MONGO_COLLECTION,
+    MONGO_POOL_SIZE,
+    ARTICLE_RETENTION_DAYS,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    CACHE_ENABLED,
+    CACHE_BACKEND,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    REDIS_URL,
+    KAFKA_BOOTSTRAP_SERVERS,
+    STORED_TOPIC
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+store: Optional[ArticleStore] = None
+cache: Optional[QueryCache] = None
+
+
+def create_cache() -> Optional[QueryCache]:
+    if not CACHE_ENABLED:
+        return None
+    if CACHE_BACKEND == 'redis':
+        return QueryCache(RedisBackend(REDIS_URL, ttl=CACHE_TTL_SECONDS))
+    return QueryCache(MemoryBackend(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the connection pool, make sure the query indexes exist and start cache invalidation"""
+    global store, cache
+    client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=MONGO_POOL_SIZE)
+    store = ArticleStore(client[MONGO_DATABASE][MONGO_COLLECTION], retention_days=ARTICLE_RETENTION_DAYS)
+    await store.ensure_indexes()
+
+    listener = None
+    cache = create_cache()
+    if cache is not None:
+        listener = StoredNewsListener(cache, KAFKA_BOOTSTRAP_SERVERS, STORED_TOPIC)
+        listener.start()
+
+    yield
+
+    if listener is not None:
+        listener.stop()
+    client.close()
+
+
+app = FastAPI(title="News Aggregator API", lifespan=lifespan)
+
+PageSize = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+Cursor = Query(None, description="next_cursor from the previous page")
+
+
+async def paged(query, cache_key: Optional[str] = None, tags=()):
+    """
+    Run a store query, turning a bad cursor into a 400. Queries given a
+    cache key are served through the cache; `tags` name what invalidates them.
+    """
+    try:
+        if cache is None or cache_key is None:
+            return await query()
+        return await cache.get_or_load(cache_key, list(tags), query)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/articles/category/{category}")
+async def latest_in_category(category: str, limit: int = PageSize, cursor: Optional[str] = Cursor):
+    """Newest articles in a category"""
+    return await paged(
+        lambda: store.latest_in_category(category, limit, cursor),
+        cache_key=f"category|{category}|{limit}|{cursor}",
+        tags=[f"category:{category}"]
+    )
+
+
+@app.get("/articles/top")
+async def top_by_relevance(hours: float = Query(24, gt=0, le=24 * ARTICLE_RETENTION_DAYS),
+                           category: Optional[str] = None,
+                           limit: int = PageSize, cursor: Optional[str] = Cursor):
+    """Most relevant articles processed in the last `hours`, optionally within one category"""
+    return await paged(
+        lambda: store.top_by_relevance(hours, limit, category, cursor),
+        cache_key=f"top|{category or '*'}|{hours}|{limit}|{cursor}",
+        tags=[f"category:{category or '*'}"]
+    )
+
+
+@app.get("/articles/source")
+async def by_source(name: str = Query(..., description='e.g. "Hacker News" or "Reddit - r/technology"'),
+                    limit: int = PageSize, cursor: Optional[str] = Cursor):
+    """Newest articles from a source (a query parameter, since names like "Reddit - r/x" contain slashes)"""
+    return await paged(
+        lambda: store.by_source(name, limit, cursor),
+        cache_key=f"source|{name}|{limit}|{cursor}",
+        tags=[f"source:{name}"]
+    )
+
+
+@app.get("/articles/search")
+async def search(q: str = Query(..., min_length=1), limit: int = PageSize, cursor: Optional[str] = Cursor):
+    """Full-text search over titles and summaries, newest first (not cached: queries rarely repeat)"""
+    return await paged(lambda: store.search(q, limit, cursor))
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit rate and eviction counts for the query cache"""
+    return cache.stats() if cache is not None else {'enabled': False}
+
+
+@app.get("/health")
+async def health():
+    return {'status': 'ok'}
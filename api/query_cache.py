@@ -0,0 +1,195 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """
+    In-process LRU cache with a TTL backstop.
+
+    Every entry carries tags (e.g. "category:AI") and a tag index maps each
+    tag to its keys, so invalidating a tag removes exactly those entries.
+    Each tag also has a generation number, bumped on every invalidation.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, value, tags), least recently used first
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self.evictions = {'lru': 0, 'expired': 0, 'invalidated': 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self.evictions['expired'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: Any, tags: Iterable[str]):
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions['lru'] += 1
+
+    async def generations(self, tags: Iterable[str]) -> List[int]:
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+                removed += 1
+        self.evictions['invalidated'] += removed
+        return removed
+
+
+class RedisBackend:
+    """
+    Shared cache in Redis, so every API replica sees the same entries.
+
+    Entries are JSON strings with a TTL. Each tag is a Redis set of the keys
+    stored under it, plus a generation counter. Redis' own maxmemory policy
+    takes the place of the in-process LRU.
+    """
+
+    def __init__(self, url: str, ttl: float = 300.0, prefix: str = 'news-api:cache'):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self.evictions = {'lru': 0, 'expired': 0, 'invalidated': 0}
+
+    def __len__(self):
+        return 0  # Not tracked locally
+
+    def _entry(self, key: str) -> str:
+        return f"{self.prefix}:entry:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _generation(self, tag: str) -> str:
+        return f"{self.prefix}:gen:{tag}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.redis.get(self._entry(key))
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any, tags: Iterable[str]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._entry(key), json.dumps(value), ex=self.ttl)
+            for tag in tags:
+                pipe.sadd(self._tag(tag), key)
+                pipe.expire(self._tag(tag), self.ttl)
+            await pipe.execute()
+
+    async def generations(self, tags: Iterable[str]) -> List[int]:
+        values = await self.redis.mget([self._generation(tag) for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self._generation(tag))
+                pipe.smembers(self._tag(tag))
+                pipe.delete(self._tag(tag))
+            results = await pipe.execute()
+
+        keys = {key.decode('utf-8') for members in results[1::3] for key in members}
+        if not keys:
+            return 0
+        removed = await self.redis.delete(*[self._entry(key) for key in keys])
+        self.evictions['invalidated'] += removed
+        return removed
+
+
+class QueryCache:
+    """
+    Read-through cache for API query results, invalidated by tag.
+
+    Entries are tagged with what they depend on (a category, a source, or
+    "category:*" for queries across all categories). When a batch of
+    articles is stored, only the tags it touches are invalidated, so the TTL
+    is just a backstop for missed events and for time windows sliding
+    forward. Any stored article can change an all-category query, so
+    "category:*" entries last at most one sink flush (MONGO_FLUSH_INTERVAL
+    on the worker) while articles are flowing.
+
+    A result is stored only if none of its tags were invalidated while it
+    was being loaded, so a query racing an invalidation can't put a stale
+    page back into the cache.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stale_loads = 0
+        self.invalidation_events = 0
+
+    async def get_or_load(self, key: str, tags: List[str], loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        before = await self.backend.generations(tags)
+        value = await loader()
+        if await self.backend.generations(tags) == before:
+            await self.backend.set(key, value, tags)
+        else:
+            self.stale_loads += 1
+        return value
+
+    async def invalidate_stored(self, categories: Iterable[str], sources: Iterable[str]) -> int:
+        """Drop the entries a stored batch of articles with these categories and sources can change"""
+        self.invalidation_events += 1
+        tags = [f"category:{category}" for category in categories] + ['category:*']
+        tags += [f"source:{source}" for source in sources]
+        return await self.backend.invalidate(tags)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': dict(self.backend.evictions),
+            'stale_loads_not_cached': self.stale_loads,
+            'invalidation_events': self.invalidation_events,
+        }
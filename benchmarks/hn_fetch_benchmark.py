@@ -0,0 +1,127 @@
+"""
+Benchmark HackerNewsProducer fetching against a local stub of the HN API.
+
+The stub adds a fixed per-request latency to stand in for the network, and
+messages go to a NullKafkaProducer so only fetching is measured.
+
+Usage:
+    python benchmarks/hn_fetch_benchmark.py [--stories 500] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.stubs import NullKafkaProducer, StubHTTPServer  # noqa: E402
+from producers.hacker_news_producer import HackerNewsProducer  # noqa: E402
+
+
+def make_app(story_count, latency):
+    requests_served = [0]
+
+    @web.middleware
+    async def count_requests(request, handler):
+        requests_served[0] += 1
+        return await handler(request)
+
+    async def top_stories(request):
+        await asyncio.sleep(latency)
+        return web.json_response(list(range(1, story_count + 1)))
+
+    async def item(request):
+        await asyncio.sleep(latency)
+        story_id = int(request.match_info['story_id'])
+        return web.json_response({
+            'id': story_id,
+            'type': 'story',
+            'title': f'Synthetic story {story_id}',
+            'url': f'https://example.com/{story_id}',
+            'score': story_id % 500,
+            'by': 'bench',
+            'descendants': story_id % 100,
+        })
+
+    async def updates(request):
+        await asyncio.sleep(latency)
+        return web.json_response({'items': [], 'profiles': []})
+
+    app = web.Application(middlewares=[count_requests])
+    app['requests_served'] = requests_served
+    app.router.add_get('/v0/topstories.json', top_stories)
+    app.router.add_get('/v0/item/{story_id}.json', item)
+    app.router.add_get('/v0/updates.json', updates)
+    return app
+
+
+def run_incremental(server, stories):
+    """Run two back-to-back cycles with a fresh state store and report HTTP calls and messages"""
+    served = server.app['requests_served']
+    with tempfile.TemporaryDirectory() as tmp:
+        kafka = NullKafkaProducer()
+        producer = HackerNewsProducer(
+            top_stories_url=f"{server.url}/v0/topstories.json",
+            item_url=f"{server.url}/v0/item/{{}}.json",
+            updates_url=f"{server.url}/v0/updates.json",
+            state_path=os.path.join(tmp, 'hn_state.db'),
+            producer=kafka,
+        )
+        for cycle in (1, 2):
+            served[0], kafka.messages = 0, 0
+            producer.produce_stories_concurrent(limit=stories, concurrency=50, rate_limit=10_000)
+            print(f"  incremental cycle {cycle}:  {served[0]:>5} HTTP requests  {kafka.messages:>5} messages")
+        producer.state_store.close()
+
+
+def run(label, stories, fetch):
+    start = time.perf_counter()
+    produced = fetch()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22} {produced:>5} stories in {elapsed:6.2f}s  {produced / elapsed:>8,.1f} stories/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stories', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--sync-stories', type=int, default=50,
+                        help='stories for the sequential baseline (it sleeps 0.1s per story)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 5, 10, 20, 50, 100])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    with StubHTTPServer(make_app(args.stories, args.latency_ms / 1000)) as server:
+        producer = HackerNewsProducer(
+            top_stories_url=f"{server.url}/v0/topstories.json",
+            item_url=f"{server.url}/v0/item/{{}}.json",
+            state_path=None,
+            producer=NullKafkaProducer(),
+        )
+        # Every run re-fetches the same stories; count them all
+        producer.dedup = None
+
+        print(f"Stub latency {args.latency_ms:.0f} ms per request")
+        run('sequential (requests)', args.sync_stories, lambda: producer.produce_stories(limit=args.sync_stories))
+
+        for concurrency in args.concurrency:
+            run(
+                f'async concurrency={concurrency}',
+                args.stories,
+                # Rate limit set high so the semaphore is what's being measured
+                lambda: producer.produce_stories_concurrent(
+                    limit=args.stories, concurrency=concurrency, rate_limit=10_000
+                ),
+            )
+
+        run_incremental(server, args.stories)
+
+
+if __name__ == '__main__':
+    main()
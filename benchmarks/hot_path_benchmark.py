@@ -0,0 +1,145 @@
+"""
+Measure record construction and logging in the process_news hot path.
+
+Compares the original path (ProcessedArticle built field by field through
+its constructor, processed_at formatted per article, log messages always
+formatted) with the current one (ProcessedArticle.from_article, processed_at
+cached per second, log messages only built when INFO is enabled), with INFO
+logging switched off as in production. Reports microseconds per article
+(timeit) and bytes allocated per article (tracemalloc).
+
+Usage:
+    python benchmarks/hot_path_benchmark.py [--articles 20000]
+"""
+import argparse
+import logging
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'faust_worker'))
+
+# Measure construction and logging only, not near-duplicate detection
+os.environ.setdefault('NEAR_DUP_ENABLED', 'false')
+
+from models import NewsArticle, ProcessedArticle  # noqa: E402
+from news_processor import assign_cluster, build_processed_article  # noqa: E402
+
+logger = logging.getLogger('hot_path_benchmark')
+
+CATEGORIES = ['AI', 'Cybersecurity', 'Tech']
+KEYWORDS = ['ai', 'security', 'startup', 'cloud']
+RELEVANCE = 4.0
+
+
+def make_articles(count):
+    return [
+        NewsArticle(
+            source='Reddit - r/programming',
+            title=f'Why we moved our data pipeline from Python to Go, part {i}',
+            url=f'https://engineering.example.com/posts/python-to-go-{i}',
+            timestamp='2024-05-01T12:00:05Z',
+            score=1540,
+            author='throwaway_dev',
+            comments=412,
+            subreddit='programming',
+            post_id=f'1cheq{i}',
+            is_self_post=False,
+        )
+        for i in range(count)
+    ]
+
+
+def original_build(article, categories, keywords, relevance):
+    """build_processed_article as it was before from_article"""
+    return ProcessedArticle(
+        source=article.source,
+        title=article.title,
+        url=article.url,
+        timestamp=article.timestamp,
+        score=article.score,
+        author=article.author,
+        comments=article.comments,
+        story_id=article.story_id,
+        subreddit=article.subreddit,
+        post_id=article.post_id,
+        is_self_post=article.is_self_post,
+        published=article.published,
+        summary=article.summary,
+        categories=categories,
+        matched_keywords=keywords,
+        processed_at=datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        relevance_score=relevance,
+        cluster_id=assign_cluster(article)
+    )
+
+
+def original_path(articles):
+    for article in articles:
+        logger.info(f"Processing: {article.title[:50]}...")
+        record = original_build(article, CATEGORIES, KEYWORDS, RELEVANCE)
+        logger.info(
+            f"✓ Processed: {article.title[:50]} | "
+            f"Categories: {', '.join(CATEGORIES)} | "
+            f"Relevance: {RELEVANCE}"
+        )
+        yield record
+
+
+def current_path(articles):
+    for article in articles:
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            logger.info(f"Processing: {article.title[:50]}...")
+        record = build_processed_article(article, CATEGORIES, KEYWORDS, RELEVANCE)
+        if log_info:
+            logger.info(
+                f"✓ Processed: {article.title[:50]} | "
+                f"Categories: {', '.join(CATEGORIES)} | "
+                f"Relevance: {RELEVANCE}"
+            )
+        yield record
+
+
+def allocated_per_article(path, articles):
+    """Peak and retained bytes per article while building every record"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    records = list(path(articles))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return (current - before) / len(articles), (peak - before) / len(articles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=20_000)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)  # news_processor configures INFO
+    articles = make_articles(args.articles)
+
+    old = list(original_path(articles[:100]))
+    new = list(current_path(articles[:100]))
+    for a, b in zip(old, new):
+        assert {**a.asdict(), 'processed_at': None} == {**b.asdict(), 'processed_at': None}
+        assert a.to_representation().keys() == b.to_representation().keys()
+
+    print(f"{args.articles} articles, INFO logging disabled\n")
+    print(f"{'path':<10} {'us/article':>11} {'retained B/article':>19} {'peak B/article':>15}")
+    results = {}
+    for name, path in (('original', original_path), ('current', current_path)):
+        seconds = min(timeit.repeat(lambda: list(path(articles)), number=1, repeat=3))
+        retained, peak = allocated_per_article(path, articles)
+        results[name] = seconds
+        print(f"{name:<10} {seconds / args.articles * 1e6:>11.2f} {retained:>19.0f} {peak:>15.0f}")
+
+    print(f"\nSpeedup: {results['original'] / results['current']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark the legacy nested-loop categorizer against KeywordMatcher.
+
+Usage:
+    python benchmarks/keyword_matcher_benchmark.py [--articles 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'faust_worker'))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'te', 'su', 'no', 'vi', 'da', 'pe', 'zo', 'gu', 'an', 'el', 'or']
+FILLER = ['the', 'a', 'new', 'how', 'why', 'we', 'built', 'with', 'for', 'and', 'of', 'is', 'said', 'report']
+
+
+def make_word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_taxonomy(rng, keyword_count, category_count=20):
+    """Build a synthetic taxonomy with a mix of single- and multi-word keywords"""
+    keywords = set()
+    while len(keywords) < keyword_count:
+        words = [make_word(rng) for _ in range(rng.choice([1, 1, 1, 2, 3]))]
+        keywords.add(' '.join(words))
+
+    keywords = sorted(keywords)
+    rng.shuffle(keywords)
+    taxonomy = {f'Category {i}': [] for i in range(category_count)}
+    for i, keyword in enumerate(keywords):
+        taxonomy[f'Category {i % category_count}'].append(keyword)
+    return taxonomy
+
+
+def make_articles(rng, taxonomy, count):
+    """Build synthetic (title, summary) pairs that sometimes contain keywords"""
+    keywords = [k for ks in taxonomy.values() for k in ks]
+    articles = []
+    for _ in range(count):
+        title = [rng.choice(FILLER) if rng.random() < 0.6 else make_word(rng) for _ in range(rng.randint(6, 12))]
+        summary = [rng.choice(FILLER) if rng.random() < 0.6 else make_word(rng) for _ in range(rng.randint(20, 35))]
+        for _ in range(rng.randint(0, 3)):
+            target = title if rng.random() < 0.5 else summary
+            target.insert(rng.randint(0, len(target)), rng.choice(keywords))
+        articles.append((' '.join(title).capitalize(), ' '.join(summary)))
+    return articles
+
+
+def legacy_categorize(taxonomy, title, summary):
+    """The original nested-loop substring matcher from news_processor.py"""
+    text = title.lower()
+    if summary:
+        text += " " + summary.lower()
+
+    matched_categories = []
+    matched_keywords = []
+    keyword_matches = 0
+
+    for category, keywords in taxonomy.items():
+        category_matched = False
+
+        for keyword in keywords:
+            if keyword.lower() in text:
+                if not category_matched:
+                    matched_categories.append(category)
+                    category_matched = True
+
+                if keyword not in matched_keywords:
+                    matched_keywords.append(keyword)
+                    keyword_matches += 1
+
+    return matched_categories, matched_keywords, keyword_matches
+
+
+def run(label, articles, categorize):
+    start = time.perf_counter()
+    for title, summary in articles:
+        categorize(title, summary)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<16} {len(articles) / elapsed:>12,.0f} articles/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=10_000)
+    parser.add_argument('--keywords', type=int, nargs='+', default=[200, 5_000])
+    args = parser.parse_args()
+
+    for keyword_count in args.keywords:
+        rng = random.Random(keyword_count)
+        taxonomy = make_taxonomy(rng, keyword_count)
+        articles = make_articles(rng, taxonomy, args.articles)
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(taxonomy)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        def compiled(title, summary):
+            text = title.lower()
+            if summary:
+                text += " " + summary.lower()
+            return matcher.match(text)
+
+        print(f"\n{keyword_count} keywords, {len(articles)} articles (index built in {build_ms:.1f} ms)")
+        run('nested loop', articles, lambda t, s: legacy_categorize(taxonomy, t, s))
+        run('KeywordMatcher', articles, compiled)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark MinHash/LSH near-duplicate lookups and index memory.
+
+The worker keeps band keys in a windowed Faust table; here a plain dict
+stands in for one window of that table so latency and memory can be
+measured in isolation.
+
+Usage:
+    python benchmarks/near_duplicate_benchmark.py [--articles 1000000]
+"""
+import argparse
+import itertools
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'faust_worker'))
+
+from near_duplicates import LSHIndex, MinHasher, cluster_id_for  # noqa: E402
+
+def make_vocabulary(rng, size=30_000):
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+
+
+def make_titles(rng, count, duplicate_rate=0.2):
+    """Synthetic titles where some are lightly edited copies of earlier ones"""
+    vocabulary = make_vocabulary(rng)
+    # Zipf-like word frequencies, so common words are shared as in real headlines
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    titles = []
+    for i in range(count):
+        if titles and rng.random() < duplicate_rate:
+            words = rng.choice(titles[-5000:]).split()
+            edit = rng.random()
+            if edit < 0.3:
+                words.insert(0, 'Show HN:')
+            elif edit < 0.6:
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            else:
+                words.append(f'({rng.randint(2000, 2030)})')
+            titles.append(' '.join(words))
+        else:
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(6, 12))
+            titles.append(' '.join(words).capitalize())
+    return titles
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=1_000_000)
+    parser.add_argument('--num-perm', type=int, default=64)
+    parser.add_argument('--bands', type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    titles = make_titles(rng, args.articles)
+    urls = [f'https://example.com/story/{i}' for i in range(args.articles)]
+
+    hasher = MinHasher(num_perm=args.num_perm, bands=args.bands)
+    bands, signatures = {}, {}
+    index = LSHIndex(hasher, bands, signatures)
+
+    latencies = []
+    clustered = 0
+    start = time.perf_counter()
+    for title, url in zip(titles, urls):
+        t0 = time.perf_counter()
+        new_id = cluster_id_for(url)
+        if index.assign(title, new_id) != new_id:
+            clustered += 1
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    # Both dicts, their int keys, cluster ID strings and stored signatures
+    index_bytes = (
+        sys.getsizeof(bands)
+        + sum(sys.getsizeof(key) for key in bands)
+        + sys.getsizeof(signatures)
+        + sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in signatures.items())
+    )
+
+    latencies.sort()
+    print(f"{args.articles:,} articles, {args.num_perm} perms / {args.bands} bands")
+    print(f"  throughput:   {args.articles / elapsed:,.0f} lookups/sec")
+    print(f"  latency p50:  {percentile(latencies, 50) * 1e6:.1f} us")
+    print(f"  latency p99:  {percentile(latencies, 99) * 1e6:.1f} us")
+    print(f"  clustered:    {clustered:,} articles joined an existing cluster "
+          f"(~{int(args.articles * 0.2):,} near-duplicates generated)")
+    print(f"  band keys:    {len(bands):,}")
+    print(f"  clusters:     {len(signatures):,}")
+    print(f"  index memory: {index_bytes / 1024 ** 2:,.0f} MiB ({index_bytes / args.articles:,.0f} bytes/article)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Push synthetic articles through NewsProducer with each producer profile.
+
+By default this uses librdkafka's built-in mock cluster, so no broker is
+needed. Pass --bootstrap to run against a real broker instead. Bytes on the
+wire are the producer's own tx_bytes statistic, measured after compression
+and batching.
+
+Usage:
+    python benchmarks/producer_profile_benchmark.py [--messages 100000] [--bootstrap localhost:9092]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+from confluent_kafka import Producer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from producers.config import PRODUCER_PROFILES  # noqa: E402
+from producers.kafka_producer import NewsProducer  # noqa: E402
+
+WORDS = ('kafka rust python release security startup model open source cloud outage '
+         'study climate data breach chip google apple launches raises funding').split()
+
+
+def make_articles(count):
+    rng = random.Random(7)
+    return [
+        {
+            'source': rng.choice(['Hacker News', 'Reddit - r/programming', 'RSS - The Verge']),
+            'title': ' '.join(rng.choices(WORDS, k=rng.randint(6, 12))).capitalize(),
+            'url': f'https://example.com/{rng.choice(WORDS)}/{i}',
+            'score': rng.randint(0, 2000),
+            'author': f'user{rng.randint(0, 5000)}',
+            'comments': rng.randint(0, 500),
+            'summary': ' '.join(rng.choices(WORDS, k=30))[:200],
+        }
+        for i in range(count)
+    ]
+
+
+def run_profile(name, settings, serializer, articles, bootstrap, topic):
+    stats = []
+    config = {
+        'bootstrap.servers': bootstrap or 'mock',
+        'client.id': f'bench-{name}',
+        'statistics.interval.ms': 200,
+        'stats_cb': lambda raw: stats.append(json.loads(raw)),
+        **settings,
+    }
+    if not bootstrap:
+        config['test.mock.num.brokers'] = 1
+
+    producer = NewsProducer(topic=topic, producer=Producer(config), serializer=serializer)
+    producer.dedup = None
+
+    start = time.perf_counter()
+    for article in articles:
+        message = producer.create_message(**article)
+        producer.send_message(message)
+    remaining = producer.producer.flush(60)
+    elapsed = time.perf_counter() - start
+
+    # Wait for a statistics report covering everything that was sent
+    deadline = time.time() + 5
+    while time.time() < deadline and (not stats or stats[-1]['txmsgs'] < len(articles) - remaining):
+        producer.producer.poll(0.1)
+
+    tx_bytes = stats[-1]['tx_bytes'] if stats else 0
+    payload = producer.metrics.bytes
+    print(
+        f"  {name:<11} {serializer:<8} {len(articles) / elapsed:>10,.0f} msgs/sec   "
+        f"payload {payload / 1024 ** 2:7.1f} MiB   wire {tx_bytes / 1024 ** 2:7.1f} MiB   "
+        f"({tx_bytes / max(len(articles), 1):.0f} B/msg)"
+    )
+    producer.metrics.bytes = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--bootstrap', default=None, help='real broker; default is the librdkafka mock cluster')
+    parser.add_argument('--topic', default='bench-news-articles')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    articles = make_articles(args.messages)
+
+    print(f"{args.messages:,} messages")
+    for name, settings in PRODUCER_PROFILES.items():
+        for serializer in ('json', 'orjson'):
+            run_profile(name, settings, serializer, articles, args.bootstrap, args.topic)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark relevance scoring against the unique-keyword-count heuristic.
+
+Every article is matched against a synthetic taxonomy, as in the worker:
+
+- keyword count:  KeywordMatcher.match(), relevance = unique keywords matched
+- BM25 per article: match_terms() + RelevanceScorer.score() (per-message mode)
+- BM25 batch:     match_terms() + RelevanceScorer.score_batch() over
+                  --batch-size articles (batch mode; NumPy if installed)
+
+Articles carry Hacker News-style score/comments or an RSS publish date, so
+the engagement and age weighting are included. Also reports the scoring
+cost alone, without matching, in microseconds per article.
+
+Usage:
+    python benchmarks/relevance_benchmark.py [--articles 20000] [--keywords 200 5000] [--batch-size 500]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'faust_worker'))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+from relevance import RelevanceScorer, np  # noqa: E402
+from keyword_matcher_benchmark import make_articles, make_taxonomy  # noqa: E402
+
+
+def with_signals(rng, pairs):
+    """Article stand-ins: a third from HN/Reddit (score, comments), a third from RSS (published)"""
+    articles = []
+    for i, (title, summary) in enumerate(pairs):
+        article = SimpleNamespace(title=title, summary=summary, score=None, comments=None,
+                                  published=None, timestamp='2024-05-02T12:00:00Z')
+        if i % 3 == 0:
+            article.score, article.comments = rng.randint(0, 2000), rng.randint(0, 800)
+        elif i % 3 == 1:
+            article.published = f'Thu, 02 May 2024 {rng.randint(0, 11):02d}:{rng.randint(0, 59):02d}:00 GMT'
+        articles.append(article)
+    return articles
+
+
+def text_of(article):
+    text = article.title.lower()
+    if article.summary:
+        text += " " + article.summary.lower()
+    return text
+
+
+def report(label, count, elapsed, baseline=None):
+    rate = count / elapsed
+    relative = f"  ({rate / baseline:.2f}x keyword count)" if baseline else ''
+    print(f"  {label:<18} {rate:>12,.0f} articles/sec{relative}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=20_000)
+    parser.add_argument('--keywords', type=int, nargs='+', default=[200, 5_000])
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"NumPy {'available' if np is not None else 'not installed, batches are scored per article'}")
+    for keyword_count in args.keywords:
+        rng = random.Random(keyword_count)
+        taxonomy = make_taxonomy(rng, keyword_count)
+        articles = with_signals(rng, make_articles(rng, taxonomy, args.articles))
+        matcher = KeywordMatcher(taxonomy)
+        live = SimpleNamespace(version=0, categories=taxonomy)  # What the scorer reads from LiveKeywordMatcher
+        texts = [text_of(article) for article in articles]
+        batches = [range(i, min(i + args.batch_size, len(articles)))
+                   for i in range(0, len(articles), args.batch_size)]
+
+        print(f"\n{keyword_count} keywords, {len(articles)} articles, batches of {args.batch_size}")
+
+        start = time.perf_counter()
+        for text in texts:
+            matcher.match(text)
+        baseline = report('keyword count', len(texts), time.perf_counter() - start)
+
+        scorer = RelevanceScorer(live)
+        start = time.perf_counter()
+        for article, text in zip(articles, texts):
+            match = matcher.match_terms(text)
+            scorer.observe((match,))
+            scorer.score(article, match)
+        report('BM25 per article', len(texts), time.perf_counter() - start, baseline)
+
+        scorer = RelevanceScorer(live)
+        start = time.perf_counter()
+        for batch in batches:
+            matches = [matcher.match_terms(texts[i]) for i in batch]
+            scorer.observe(matches)
+            scorer.score_batch([articles[i] for i in batch], matches)
+        report('BM25 batch', len(texts), time.perf_counter() - start, baseline)
+
+        # Scoring alone, with the statistics already warm
+        matches = [matcher.match_terms(text) for text in texts]
+        start = time.perf_counter()
+        for article, match in zip(articles, matches):
+            scorer.score(article, match)
+        per_article = (time.perf_counter() - start) / len(texts) * 1e6
+        start = time.perf_counter()
+        for batch in batches:
+            scorer.observe([matches[i] for i in batch])
+            scorer.score_batch([articles[i] for i in batch], [matches[i] for i in batch])
+        batched = (time.perf_counter() - start) / len(texts) * 1e6
+        print(f"  scoring only:      {per_article:.2f} us/article per article, {batched:.2f} us/article batched")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Compare feedparser with the streaming feed parser on large local feeds.
+
+Writes RSS 2.0 and Atom fixture feeds (--entries entries each, with
+HTML descriptions and full-content bodies as aggregate feeds have) to a
+temporary directory, then parses each one in a fresh subprocess per
+parser, so peak memory is measured in isolation:
+
+- feedparser:  feedparser.parse() on the whole document (the old path)
+- streaming:   parse_feed_stream() over 64 KiB chunks, every entry
+- incremental: parse_feed_stream() stopping at the entry seen last time,
+               with --new-entries new entries at the top of the feed
+
+Reports entries/sec and peak RSS (ru_maxrss), both total and above the
+process's size after imports.
+
+Usage:
+    python benchmarks/rss_parse_benchmark.py [--entries 5000] [--new-entries 20]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+CHUNK_SIZE = 65536
+WORDS = ('release model open source cloud chip outage security study launch funding data users '
+         'team report faster update world first new year million'.split())
+
+
+def paragraph(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+
+def write_rss(path, entries, seed=5):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/" '
+                'xmlns:content="http://purl.org/rss/1.0/modules/content/">\n'
+                '<channel><title>Aggregate Fixture</title><link>https://example.com/</link>\n')
+        for i in range(entries):
+            body = ''.join(f'<p>{paragraph(rng, 60)}</p>' for _ in range(6))
+            f.write(
+                f'<item><title>{paragraph(rng, 10).capitalize()} {i}</title>'
+                f'<link>https://example.com/story/{i}</link><guid>https://example.com/story/{i}</guid>'
+                f'<pubDate>Wed, 01 May 2024 12:{i % 60:02d}:00 GMT</pubDate>'
+                f'<dc:creator>author{i % 97}</dc:creator>'
+                f'<description><![CDATA[<p>{paragraph(rng, 80)}</p>]]></description>'
+                f'<content:encoded><![CDATA[{body}]]></content:encoded></item>\n'
+            )
+        f.write('</channel></rss>\n')
+
+
+def write_atom(path, entries, seed=7):
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<feed xmlns="http://www.w3.org/2005/Atom"><title>Atom Fixture</title>\n')
+        for i in range(entries):
+            body = ''.join(f'&lt;p&gt;{paragraph(rng, 60)}&lt;/p&gt;' for _ in range(6))
+            f.write(
+                f'<entry><title>{paragraph(rng, 10).capitalize()} {i}</title>'
+                f'<link rel="alternate" href="https://example.org/post/{i}"/><id>tag:example.org,2024:{i}</id>'
+                f'<published>2024-05-01T12:{i % 60:02d}:00Z</published>'
+                f'<author><name>author{i % 97}</name></author>'
+                f'<summary>{paragraph(rng, 80)}</summary>'
+                f'<content type="html">{body}</content></entry>\n'
+            )
+        f.write('</feed>\n')
+
+
+def max_rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+
+def file_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def worker(method, path, last_seen):
+    """Parse one feed in this process and print JSON results"""
+    import feedparser
+    from producers.feed_stream import parse_feed_stream
+
+    baseline = max_rss_kib()
+    started = time.perf_counter()
+    if method == 'feedparser':
+        feed = feedparser.parse(path)
+        # The fields RSSProducer reads, so lazily built values are counted
+        entries = [
+            (e.get('title'), e.get('link'), e.get('published'), e.get('author'), (e.get('summary') or '')[:200])
+            for e in feed.entries
+        ]
+    else:
+        _, entries, _ = parse_feed_stream(file_chunks(path), last_seen=last_seen if method == 'incremental' else None)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        'entries': len(entries),
+        'seconds': elapsed,
+        'peak_kib': max_rss_kib(),
+        'baseline_kib': baseline,
+    }))
+
+
+def run(method, path, last_seen):
+    output = subprocess.run(
+        [sys.executable, __file__, '--worker', method, path, last_seen],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--new-entries', type=int, default=20,
+                        help='Entries above the last-seen one in the incremental run')
+    parser.add_argument('--worker', nargs=3, metavar=('METHOD', 'PATH', 'LAST_SEEN'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = {
+            'RSS 2.0': (os.path.join(tmp, 'feed.rss'), write_rss,
+                        f'https://example.com/story/{args.new_entries}'),
+            'Atom': (os.path.join(tmp, 'feed.atom'), write_atom, f'tag:example.org,2024:{args.new_entries}'),
+        }
+        for name, (path, write, last_seen) in fixtures.items():
+            write(path, args.entries)
+            size_mib = os.path.getsize(path) / 2 ** 20
+            print(f"\n{name}: {args.entries} entries, {size_mib:.1f} MiB")
+            print(f"{'parser':<12} {'entries':>8} {'seconds':>8} {'entries/s':>10} {'peak RSS':>10} {'above base':>11}")
+
+            for method in ('feedparser', 'streaming', 'incremental'):
+                result = run(method, path, last_seen)
+                rate = result['entries'] / result['seconds'] if result['seconds'] else float('inf')
+                print(
+                    f"{method:<12} {result['entries']:>8} {result['seconds']:>8.3f} {rate:>10,.0f} "
+                    f"{result['peak_kib'] / 1024:>7.1f} MiB {(result['peak_kib'] - result['baseline_kib']) / 1024:>7.1f} MiB"
+                )
+
+
+if __name__ == '__main__':
+    main()
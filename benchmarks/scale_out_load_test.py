@@ -0,0 +1,185 @@
+"""
+Throughput of the Faust worker as workers are added to one consumer group.
+
+Needs a Kafka broker (e.g. `docker-compose up -d kafka`, reachable at
+localhost:9092). For each worker count this creates fresh input and output
+topics with --partitions partitions, starts that many `faust worker`
+processes, waits until they have split the partitions between them, then
+produces --articles synthetic articles through NewsProducer (with its
+partitioner) and times how long it takes for all of them to come out on the
+output topic. The Mongo sink and trending are switched off so runs only
+measure process_news. Workers are local processes, so scaling stops at the
+number of CPU cores.
+
+Usage:
+    python benchmarks/scale_out_load_test.py [--workers 1 2 4] [--articles 50000] [--partitions 8]
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from confluent_kafka import Consumer, ConsumerGroupState, Producer
+from confluent_kafka.admin import AdminClient, NewTopic
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from producers.config import PRODUCER_CONFIG  # noqa: E402
+from producers.kafka_producer import NewsProducer  # noqa: E402
+
+# One keyword per title guarantees a category match, so every article is published
+KEYWORDS = ['python', 'rust', 'kubernetes', 'security breach', 'machine learning', 'startup',
+            'bitcoin', 'nasa', 'data pipeline', 'football']
+WORDS = ('new release study launches raises funding open source cloud outage model chip '
+         'report update team users faster first years world data report million').split()
+
+
+def make_articles(count, seed=11):
+    rng = random.Random(seed)
+    return [
+        {
+            'source': rng.choice(['Hacker News', 'Reddit - r/programming', 'RSS - The Verge']),
+            'title': ' '.join(rng.choices(WORDS, k=rng.randint(5, 10)) + [rng.choice(KEYWORDS)]).capitalize(),
+            'url': f'https://example{i % 50}.com/story/{i}',
+            'score': rng.randint(0, 2000),
+            'summary': ' '.join(rng.choices(WORDS, k=30)),
+        }
+        for i in range(count)
+    ]
+
+
+def create_topics(admin, names, partitions):
+    futures = admin.create_topics([NewTopic(name, num_partitions=partitions, replication_factor=1)
+                                   for name in names])
+    for future in futures.values():
+        future.result()
+
+
+def delete_topics(admin, prefix, names):
+    existing = admin.list_topics(timeout=10).topics
+    doomed = [name for name in existing if name in names or name.startswith(prefix)]
+    if doomed:
+        for future in admin.delete_topics(doomed).values():
+            future.result()
+
+
+def start_workers(count, env, datadir):
+    workers = []
+    for i in range(count):
+        workers.append(subprocess.Popen(
+            ['faust', '-A', 'news_processor', '--datadir', os.path.join(datadir, str(i)),
+             'worker', '-l', 'warn', '--web-port', str(16066 + i)],
+            cwd=os.path.join(ROOT, 'faust_worker'),
+            env=env,
+        ))
+    return workers
+
+
+def stop_workers(workers):
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+def wait_for_group(admin, group, members, timeout):
+    """Block until the consumer group is stable with every worker holding partitions"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        description = admin.describe_consumer_groups([group])[group].result()
+        assigned = [m for m in description.members if m.assignment and m.assignment.topic_partitions]
+        if description.state == ConsumerGroupState.STABLE and len(assigned) == members:
+            return
+        time.sleep(1)
+    raise TimeoutError(f"{members} workers did not join consumer group {group} within {timeout}s")
+
+
+def run(workers, args, articles):
+    run_id = uuid.uuid4().hex[:8]
+    app_id = f'loadtest-{run_id}'
+    input_topic = f'{app_id}-articles'
+    output_topic = f'{app_id}-processed'
+    admin = AdminClient({'bootstrap.servers': args.bootstrap})
+    create_topics(admin, [input_topic, output_topic], args.partitions)
+
+    env = dict(
+        os.environ,
+        KAFKA_BOOTSTRAP_SERVERS=args.bootstrap,
+        FAUST_APP_ID=app_id,
+        INPUT_TOPIC=input_topic,
+        OUTPUT_TOPIC=output_topic,
+        TOPIC_PARTITIONS=str(args.partitions),
+        MONGO_SINK_ENABLED='false',
+        TRENDING_ENABLED='false',
+    )
+    datadir = tempfile.mkdtemp(prefix=app_id)
+    processes = start_workers(workers, env, datadir)
+    consumer = Consumer({
+        'bootstrap.servers': args.bootstrap,
+        'group.id': f'{app_id}-counter',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+    })
+    try:
+        wait_for_group(admin, app_id, workers, args.startup_timeout)
+        consumer.subscribe([output_topic])
+
+        producer = NewsProducer(topic=input_topic, producer=Producer({
+            **PRODUCER_CONFIG, 'bootstrap.servers': args.bootstrap
+        }))
+        producer.dedup = None
+
+        started = time.monotonic()
+        for article in articles:
+            producer.send_message(article)
+        producer.flush()
+
+        received = 0
+        deadline = started + args.timeout
+        while received < len(articles) and time.monotonic() < deadline:
+            received += len(consumer.consume(num_messages=1000, timeout=1.0))
+        elapsed = time.monotonic() - started
+    finally:
+        consumer.close()
+        stop_workers(processes)
+        shutil.rmtree(datadir, ignore_errors=True)
+        delete_topics(admin, app_id, [input_topic, output_topic])
+
+    return received, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--articles', type=int, default=50_000)
+    parser.add_argument('--partitions', type=int, default=8)
+    parser.add_argument('--bootstrap', default='localhost:9092')
+    parser.add_argument('--startup-timeout', type=float, default=120.0)
+    parser.add_argument('--timeout', type=float, default=600.0, help='Seconds to wait for all output per run')
+    args = parser.parse_args()
+
+    logging.getLogger('producers').setLevel(logging.WARNING)
+    articles = make_articles(args.articles)
+    print(f"{args.articles} articles, {args.partitions} partitions, {os.cpu_count()} CPUs\n")
+    print(f"{'workers':>7} {'received':>9} {'seconds':>8} {'articles/s':>11} {'speedup':>8}")
+
+    baseline = None
+    for workers in args.workers:
+        received, elapsed = run(workers, args, articles)
+        throughput = received / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>7} {received:>9} {elapsed:>8.1f} {throughput:>11.0f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Shared stand-ins for benchmarks that must run without Kafka or the internet."""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from aiohttp import web
+
+
+class NullKafkaProducer:
+    """Mimics the confluent_kafka.Producer calls NewsProducer makes, delivering instantly"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    def produce(self, topic, value=None, key=None, callback=None, **kwargs):
+        self.messages += 1
+        self.bytes += len(value or b'') + len(key or b'')
+
+    def poll(self, timeout=0):
+        return 0
+
+    def flush(self, timeout=None):
+        return 0
+
+    def __len__(self):
+        return 0
+
+    def list_topics(self, topic=None, timeout=-1):
+        return SimpleNamespace(topics={topic: SimpleNamespace(partitions={0: None})})
+
+
+class StubHTTPServer:
+    """Runs an aiohttp.web application on a background thread at http://127.0.0.1:<port>"""
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,123 @@
+"""
+Compare the JSON and binary wire formats for news-articles and processed-news.
+
+Reports bytes per message and encode/decode CPU time per message for
+representative Hacker News, Reddit and RSS payloads, both as produced and
+after processing (ProcessedArticle copies every input field).
+
+Usage:
+    python benchmarks/wire_format_benchmark.py [--iterations 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'faust_worker'))
+
+from wire_format import NEWS_ARTICLE, PROCESSED_ARTICLE, decode, encode  # noqa: E402
+
+ARTICLE_FIELDS = ('score', 'author', 'comments', 'story_id', 'subreddit', 'post_id',
+                  'is_self_post', 'published', 'summary')
+
+ARTICLES = {
+    'hacker_news': {
+        'source': 'Hacker News',
+        'title': 'Show HN: A fast, embeddable key-value store written in Rust',
+        'url': 'https://github.com/example/kvstore',
+        'timestamp': '2024-05-01T12:00:00Z',
+        'score': 312,
+        'author': 'pg_fan_42',
+        'comments': 87,
+        'story_id': 40212345,
+    },
+    'reddit': {
+        'source': 'Reddit - r/programming',
+        'title': 'Why we moved our data pipeline from Python to Go',
+        'url': 'https://engineering.example.com/posts/python-to-go',
+        'timestamp': '2024-05-01T12:00:05Z',
+        'score': 1540,
+        'author': 'throwaway_dev',
+        'comments': 412,
+        'subreddit': 'programming',
+        'post_id': '1cheq9x',
+        'is_self_post': False,
+    },
+    'rss': {
+        'source': 'RSS - TechCrunch',
+        'title': 'AI startup raises $50M to build developer tools for cloud security',
+        'url': 'https://techcrunch.com/2024/05/01/ai-startup-raises-50m/',
+        'timestamp': '2024-05-01T12:00:09Z',
+        'published': 'Wed, 01 May 2024 11:45:00 +0000',
+        'summary': ('The company says its platform uses machine learning to find misconfigured '
+                    'cloud resources and vulnerable dependencies before they reach production. '
+                    'The round was led by a major venture capital firm.'),
+    },
+}
+
+
+def as_news_article(message):
+    """JSON the way Faust writes a NewsArticle record: every field plus metadata"""
+    record = dict(message)
+    for field in ARTICLE_FIELDS:
+        record.setdefault(field, None)
+    record['__faust'] = {'ns': 'models.NewsArticle'}
+    return record
+
+
+def as_processed_article(message):
+    record = as_news_article(message)
+    record.update({
+        'categories': ['AI', 'Cybersecurity', 'Tech'],
+        'matched_keywords': ['ai', 'security', 'startup', 'cloud'],
+        'processed_at': '2024-05-01T12:00:10Z',
+        'relevance_score': 4.0,
+        'cluster_id': '9f86d081884c7d65',
+        '__faust': {'ns': 'models.ProcessedArticle'},
+    })
+    return record
+
+
+def per_message_us(fn, iterations):
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20_000)
+    args = parser.parse_args()
+
+    cases = []
+    for name, message in ARTICLES.items():
+        cases.append((f"{name} (produced)", message, as_news_article(message), NEWS_ARTICLE))
+        cases.append((f"{name} (processed)", message, as_processed_article(message), PROCESSED_ARTICLE))
+
+    print(f"{'message':<26} {'json B':>7} {'binary B':>9} {'saved':>6}   "
+          f"{'json enc/dec us':>16} {'binary enc/dec us':>18}")
+    totals = [0, 0]
+    for label, producer_message, record, schema in cases:
+        # Producers send the bare dict; Faust records carry every field
+        json_message = record if schema == PROCESSED_ARTICLE else producer_message
+        json_bytes = json.dumps(json_message).encode('utf-8')
+        binary_bytes = encode(record, schema)
+        assert decode(binary_bytes) == {
+            k: v for k, v in record.items() if v is not None and k != '__faust'
+        }
+
+        json_enc = per_message_us(lambda: json.dumps(json_message).encode('utf-8'), args.iterations)
+        json_dec = per_message_us(lambda: json.loads(json_bytes), args.iterations)
+        bin_enc = per_message_us(lambda: encode(record, schema), args.iterations)
+        bin_dec = per_message_us(lambda: decode(binary_bytes), args.iterations)
+
+        totals[0] += len(json_bytes)
+        totals[1] += len(binary_bytes)
+        print(f"{label:<26} {len(json_bytes):>7} {len(binary_bytes):>9} "
+              f"{1 - len(binary_bytes) / len(json_bytes):>6.0%}   "
+              f"{json_enc:>7.2f} / {json_dec:<6.2f} {bin_enc:>9.2f} / {bin_dec:<6.2f}")
+
+    print(f"\nTotal: {totals[0]} B as JSON, {totals[1]} B binary ({1 - totals[1] / totals[0]:.0%} smaller)")
+
+
+if __name__ == '__main__':
+    main()
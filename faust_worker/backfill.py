@@ -0,0 +1,521 @@
+"""
+Re-categorize historical articles in bulk, outside the running worker.
+
+Reads raw articles from news-articles (an offset range, or a time range) or
+from a JSONL/Parquet archive, categorizes them in large batches with the
+live taxonomy, and writes the processed records to a separate topic and/or
+straight into MongoDB. Relevance is scored as in the worker, with document
+frequencies counted over the articles backfilled so far. Nothing is logged per article; progress, rate and
+ETA are logged every few seconds instead.
+
+With --checkpoint, the read position is saved after each batch has been
+written, and rerunning the same command resumes from there. Writes are
+keyed on the canonical URL, so a batch repeated after a crash is harmless.
+
+Usage (from faust_worker/, or /app in the worker image):
+    python backfill.py --from-time 2024-05-01T00:00:00Z --output-topic processed-news-backfill
+    python backfill.py --from-offset 0 --store --workers 4 --checkpoint backfill.json
+    python backfill.py --archive articles.jsonl --store --categories new_taxonomy.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from confluent_kafka import Consumer, KafkaError, Producer, TopicPartition
+
+from models import NewsArticle, ProcessedArticle
+from wire_format import decode
+from taxonomy import LiveKeywordMatcher, build_taxonomy, read_taxonomy
+from categorizer_pool import CategorizerPool
+from relevance import RelevanceScorer
+from near_duplicates import LSHIndex, MinHasher, cluster_id_for
+from mongo_sink import TIMESTAMP_FORMAT, MongoSink, to_document
+from faust_config import (
+    KAFKA_BOOTSTRAP_SERVERS,
+    INPUT_TOPIC,
+    CATEGORIES,
+    CATEGORY_CONFIG_TOPIC,
+    MIN_SCORE,
+    CATEGORIZER_WORKERS,
+    CATEGORIZER_CHUNK_SIZE,
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_WINDOW_SECONDS,
+    NEAR_DUP_NUM_PERM,
+    NEAR_DUP_BANDS,
+    NEAR_DUP_THRESHOLD,
+    MONGO_URI,
+    MONGO_DATABASE,
+    MONGO_COLLECTION,
+    MONGO_POOL_SIZE,
+    RELEVANCE_SCORER,
+    RELEVANCE_K1,
+    RELEVANCE_B,
+    RELEVANCE_ENGAGEMENT_WEIGHT,
+    RELEVANCE_COMMENT_WEIGHT,
+    RELEVANCE_HALF_LIFE_HOURS
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('backfill')
+
+ARTICLE_FIELDS = tuple(NewsArticle._options.fields)
+
+
+def parse_time(value: str) -> int:
+    """ISO-8601 UTC time -> Kafka timestamp (ms)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+class KafkaSource:
+    """
+    Reads a topic's partitions directly (no consumer group, nothing
+    committed) between per-partition start and end offsets. The end is fixed
+    when the backfill starts, so articles arriving meanwhile are left to the
+    worker.
+    """
+
+    def __init__(self, bootstrap_servers: str, topic: str, from_offset: Optional[int] = None,
+                 to_offset: Optional[int] = None, from_time: Optional[str] = None,
+                 to_time: Optional[str] = None, resume: Optional[Dict[str, int]] = None):
+        self.topic = topic
+        self.consumer = Consumer({
+            'bootstrap.servers': bootstrap_servers,
+            'group.id': 'news-backfill',
+            'enable.auto.commit': False,
+            'fetch.max.bytes': 52428800,
+        })
+        metadata = self.consumer.list_topics(topic, timeout=10).topics[topic]
+        if metadata.error is not None:
+            raise SystemExit(f"Cannot read topic {topic}: {metadata.error}")
+
+        self.next_offsets: Dict[int, int] = {}
+        self.end_offsets: Dict[int, int] = {}
+        for partition in sorted(metadata.partitions):
+            low, high = self.consumer.get_watermark_offsets(TopicPartition(topic, partition), timeout=10)
+            start = max(low, from_offset if from_offset is not None else low)
+            end = min(high, to_offset if to_offset is not None else high)
+            if from_time:
+                start = max(start, self._offset_for_time(partition, parse_time(from_time), high))
+            if to_time:
+                end = min(end, self._offset_for_time(partition, parse_time(to_time), high))
+            if resume and str(partition) in resume:
+                start = max(start, resume[str(partition)])
+            self.next_offsets[partition] = start
+            self.end_offsets[partition] = end
+
+        self.total = sum(max(0, self.end_offsets[p] - self.next_offsets[p]) for p in self.next_offsets)
+        self.undecodable = 0
+
+    def _offset_for_time(self, partition: int, timestamp_ms: int, high: int) -> int:
+        """First offset at or after the timestamp (the end offset if there is none)"""
+        found = self.consumer.offsets_for_times([TopicPartition(self.topic, partition, timestamp_ms)], timeout=10)
+        return found[0].offset if found[0].offset >= 0 else high
+
+    def position(self) -> Dict[str, int]:
+        return {str(partition): offset for partition, offset in self.next_offsets.items()}
+
+    def batches(self, batch_size: int) -> Iterator[List[Tuple[Optional[str], Dict[str, Any]]]]:
+        pending = {p for p in self.next_offsets if self.next_offsets[p] < self.end_offsets[p]}
+        self.consumer.assign([TopicPartition(self.topic, p, self.next_offsets[p]) for p in pending])
+        try:
+            while pending:
+                batch = []
+                for msg in self.consumer.consume(num_messages=batch_size, timeout=1.0):
+                    if msg.error():
+                        if msg.error().code() != KafkaError._PARTITION_EOF:
+                            raise RuntimeError(f"Error reading {self.topic}: {msg.error()}")
+                        continue
+                    partition = msg.partition()
+                    if partition not in pending or msg.offset() >= self.end_offsets[partition]:
+                        continue
+                    self.next_offsets[partition] = msg.offset() + 1
+                    try:
+                        value = decode(msg.value())
+                    except ValueError:
+                        self.undecodable += 1
+                        continue
+                    key = msg.key().decode('utf-8') if msg.key() else None
+                    batch.append((key, value))
+
+                # The fetch position also moves past compacted gaps and transaction markers
+                done = [
+                    tp for tp in self.consumer.position([TopicPartition(self.topic, p) for p in pending])
+                    if tp.offset >= self.end_offsets[tp.partition]
+                ]
+                if done:
+                    pending.difference_update(tp.partition for tp in done)
+                    self.consumer.incremental_unassign(done)
+                if batch:
+                    yield batch
+        finally:
+            self.consumer.close()
+
+
+class ArchiveSource:
+    """Reads articles from a JSONL file (one JSON object per line) or a Parquet file"""
+
+    def __init__(self, path: str, resume: Optional[Dict[str, int]] = None):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.row = (resume or {}).get('row', 0)
+        if self.parquet:
+            import pyarrow.parquet as pq  # Optional dependency, only needed for Parquet archives
+
+            self._file = pq.ParquetFile(path)
+            rows = self._file.metadata.num_rows
+        else:
+            with open(path, 'rb') as f:
+                rows = sum(1 for line in f if line.strip())
+        self.total = max(0, rows - self.row)
+        self.undecodable = 0
+
+    def position(self) -> Dict[str, int]:
+        return {'row': self.row}
+
+    def _records(self, batch_size: int) -> Iterator[Any]:
+        if self.parquet:
+            for record_batch in self._file.iter_batches(batch_size=batch_size):
+                yield from record_batch.to_pylist()
+        else:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        yield line
+
+    def batches(self, batch_size: int) -> Iterator[List[Tuple[Optional[str], Dict[str, Any]]]]:
+        skip = self.row
+        batch = []
+        for record in self._records(batch_size):
+            if skip:
+                skip -= 1
+                continue
+            self.row += 1
+            if not self.parquet:
+                try:
+                    record = json.loads(record)
+                except ValueError:
+                    self.undecodable += 1
+                    continue
+            # MongoDB exports carry the canonical URL as _id
+            key = record.get('_id')
+            batch.append((key if isinstance(key, str) else None, record))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class WindowStore:
+    """
+    Mapping for LSHIndex that keeps the current and the previous window of
+    article time, approximating the worker's hopping-window tables while
+    weeks of history are replayed in one run.
+    """
+
+    def __init__(self):
+        self.current: Dict[Any, Any] = {}
+        self.previous: Dict[Any, Any] = {}
+
+    def rotate(self):
+        self.previous, self.current = self.current, {}
+
+    def get(self, key):
+        value = self.current.get(key)
+        return value if value is not None else self.previous.get(key)
+
+    def __setitem__(self, key, value):
+        self.current[key] = value
+
+
+class ClusterAssigner:
+    """Near-duplicate clusters for replayed articles, with windows driven by article timestamps"""
+
+    def __init__(self, window_seconds: float):
+        self.step = window_seconds / 2
+        self.bands = WindowStore()
+        self.signatures = WindowStore()
+        self.index = LSHIndex(
+            MinHasher(num_perm=NEAR_DUP_NUM_PERM, bands=NEAR_DUP_BANDS),
+            self.bands, self.signatures, threshold=NEAR_DUP_THRESHOLD
+        )
+        self.window: Optional[int] = None
+
+    def assign(self, article: NewsArticle) -> str:
+        try:
+            seconds = datetime.strptime(article.timestamp, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+            window = int(seconds // self.step)
+        except (TypeError, ValueError):
+            window = self.window
+        if window is not None and (self.window is None or window > self.window):
+            # Moving on by two or more windows forgets everything
+            for _ in range(min(2, window - self.window) if self.window is not None else 0):
+                self.bands.rotate()
+                self.signatures.rotate()
+            self.window = window
+        return self.index.assign(article.title, cluster_id_for(article.url))
+
+
+class TopicSink:
+    """Produces processed records to a topic, in the same format the worker writes"""
+
+    def __init__(self, bootstrap_servers: str, topic: str):
+        self.topic = topic
+        self.producer = Producer({
+            'bootstrap.servers': bootstrap_servers,
+            'client.id': 'news-backfill',
+            'enable.idempotence': True,
+            'linger.ms': 50,
+            'batch.size': 1048576,
+            'compression.type': 'zstd',
+            'queue.buffering.max.messages': 500000,
+            # Same key -> partition mapping as the worker's (Java-compatible) producer
+            'partitioner': 'murmur2_random',
+        })
+        self.errors = 0
+
+    def _on_delivery(self, err, msg):
+        if err:
+            self.errors += 1
+
+    def write(self, records: List[Tuple[str, ProcessedArticle]]):
+        for key, record in records:
+            while True:
+                try:
+                    self.producer.produce(self.topic, key=key.encode('utf-8'), value=record.dumps(),
+                                          on_delivery=self._on_delivery)
+                    break
+                except BufferError:
+                    self.producer.poll(0.5)  # Local queue full: wait for deliveries
+        self.producer.poll(0)
+
+    def flush(self):
+        if self.producer.flush(timeout=60) > 0 or self.errors:
+            raise RuntimeError(f"{self.errors} records were not delivered to {self.topic}")
+
+
+class Checkpoint:
+    """Read position and counters, saved after every written batch"""
+
+    def __init__(self, path: Optional[str], source: Dict[str, Any]):
+        self.path = path
+        self.source = source
+        self.state: Dict[str, Any] = {'source': source, 'position': None, 'read': 0, 'published': 0}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('source') != source:
+                raise SystemExit(f"Checkpoint {path} is for a different backfill ({saved.get('source')}); "
+                                 f"delete it or pass another --checkpoint")
+            self.state = saved
+            logger.info(f"Resuming from {path}: {saved['read']:,} articles already read")
+
+    def save(self, position: Dict[str, int], read: int, published: int):
+        if not self.path:
+            return
+        self.state.update(position=position, read=read, published=published)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def load_categories(args) -> Dict[str, List[str]]:
+    if args.categories:
+        with open(args.categories) as f:
+            return build_taxonomy(json.load(f).items())
+    return read_taxonomy(args.bootstrap, CATEGORY_CONFIG_TOPIC) or CATEGORIES
+
+
+def to_article(value: Dict[str, Any]) -> Optional[NewsArticle]:
+    if not value.get('title') or not value.get('url'):
+        return None
+    return NewsArticle(**{field: value.get(field) for field in ARTICLE_FIELDS})
+
+
+async def categorize(articles: List[NewsArticle], matcher: LiveKeywordMatcher, pool: Optional[CategorizerPool],
+                     scorer: Optional[RelevanceScorer]) -> List[Tuple[List[str], List[str], float]]:
+    if pool is not None:
+        matches = await pool.categorize(articles)
+    else:
+        matches = []
+        for article in articles:
+            text = article.title.lower()
+            if article.summary:
+                text += " " + article.summary.lower()
+            matches.append(matcher.match_terms(text))
+
+    # The pool returns None for articles it could not match; they get no categories
+    kept = [i for i, match in enumerate(matches) if match is not None]
+    if len(kept) < len(matches):
+        logger.warning(f"Skipping {len(matches) - len(kept)} articles that could not be categorized")
+    results = [([], [], 0.0)] * len(matches)
+    articles = [articles[i] for i in kept]
+    matches = [matches[i] for i in kept]
+
+    if scorer is None:
+        relevances = [float(len(match.keywords)) for match in matches]
+    else:
+        scorer.observe(matches)
+        relevances = scorer.score_batch(articles, matches)
+    for i, match, relevance in zip(kept, matches, relevances):
+        results[i] = (match.categories, match.keywords, relevance)
+    return results
+
+
+async def run(args):
+    if args.archive:
+        source_spec = {'archive': os.path.abspath(args.archive)}
+    else:
+        source_spec = {'topic': args.topic, 'from_offset': args.from_offset, 'to_offset': args.to_offset,
+                       'from_time': args.from_time, 'to_time': args.to_time}
+    checkpoint = Checkpoint(args.checkpoint, source_spec)
+    resume = checkpoint.state['position']
+
+    if args.archive:
+        source = ArchiveSource(args.archive, resume=resume)
+    else:
+        source = KafkaSource(args.bootstrap, args.topic, args.from_offset, args.to_offset,
+                             args.from_time, args.to_time, resume=resume)
+
+    matcher = LiveKeywordMatcher(load_categories(args))
+    scorer = None
+    if RELEVANCE_SCORER == 'bm25':
+        scorer = RelevanceScorer(
+            matcher,
+            k1=RELEVANCE_K1,
+            b=RELEVANCE_B,
+            engagement_weight=RELEVANCE_ENGAGEMENT_WEIGHT,
+            comment_weight=RELEVANCE_COMMENT_WEIGHT,
+            half_life_hours=RELEVANCE_HALF_LIFE_HOURS
+        )
+    clusters = ClusterAssigner(NEAR_DUP_WINDOW_SECONDS) if NEAR_DUP_ENABLED else None
+    pool = CategorizerPool(matcher, workers=args.workers, chunk_size=args.chunk_size) if args.workers else None
+    topic_sink = TopicSink(args.bootstrap, args.output_topic) if args.output_topic else None
+    store = MongoSink(MONGO_URI, MONGO_DATABASE, MONGO_COLLECTION, pool_size=MONGO_POOL_SIZE) if args.store else None
+
+    logger.info(
+        f"Backfilling {source.total:,} articles from {args.archive or args.topic} with "
+        f"{len(matcher.categories)} categories -> "
+        f"{', '.join(filter(None, [args.output_topic, 'MongoDB' if store else None]))}"
+    )
+
+    read = checkpoint.state['read']
+    published = checkpoint.state['published']
+    started = time.monotonic()
+    read_at_start = read
+    last_report = started
+    if pool is not None:
+        await pool.start()
+    if store is not None:
+        await store.start()
+    try:
+        for batch in source.batches(args.batch_size):
+            keyed = []
+            for key, value in batch:
+                article = to_article(value)
+                if article is None or (article.score is not None and article.score < MIN_SCORE):
+                    continue
+                keyed.append((key or article.url, article))
+
+            results = await categorize([article for _, article in keyed], matcher, pool, scorer)
+            processed_at = time.strftime(TIMESTAMP_FORMAT, time.gmtime())
+            records = [
+                (key, ProcessedArticle.from_article(
+                    article,
+                    categories=categories,
+                    matched_keywords=keywords,
+                    processed_at=processed_at,
+                    relevance_score=relevance,
+                    cluster_id=clusters.assign(article) if clusters is not None else None
+                ))
+                for (key, article), (categories, keywords, relevance) in zip(keyed, results)
+                if categories
+            ]
+
+            if topic_sink is not None:
+                topic_sink.write(records)
+                topic_sink.flush()
+            if store is not None and records:
+                await store.write([(key, to_document(record)) for key, record in records])
+
+            read += len(batch)
+            published += len(records)
+            checkpoint.save(source.position(), read, published)
+
+            now = time.monotonic()
+            if now - last_report >= args.progress_interval:
+                last_report = now
+                rate = (read - read_at_start) / (now - started)
+                remaining = source.total - (read - read_at_start)
+                logger.info(
+                    f"Backfill: {read - read_at_start:,}/{source.total:,} "
+                    f"({(read - read_at_start) / max(source.total, 1):.1%}) | "
+                    f"{rate:,.0f} articles/s | Published: {published:,} | "
+                    f"ETA {format_eta(remaining / rate) if rate else '-'}"
+                )
+    finally:
+        if pool is not None:
+            await pool.stop()
+        if store is not None:
+            await store.stop()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"✓ Backfill done: {read - read_at_start:,} articles read in {format_eta(elapsed)} "
+        f"({(read - read_at_start) / max(elapsed, 1e-9):,.0f}/s) | Published: {published:,} | "
+        f"Undecodable: {source.undecodable}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_argument_group('source (a topic by default, or --archive)')
+    source.add_argument('--topic', default=INPUT_TOPIC)
+    source.add_argument('--from-offset', type=int, help='First offset to read, in every partition')
+    source.add_argument('--to-offset', type=int, help='Stop before this offset, in every partition')
+    source.add_argument('--from-time', help='Start at this time, e.g. 2024-05-01T00:00:00Z')
+    source.add_argument('--to-time', help='Stop at this time')
+    source.add_argument('--archive', help='JSONL or .parquet file of articles instead of a topic')
+
+    output = parser.add_argument_group('output (at least one)')
+    output.add_argument('--output-topic', help='Topic for the processed records')
+    output.add_argument('--store', action='store_true', help='Upsert the processed records into MongoDB')
+
+    parser.add_argument('--categories', help='JSON taxonomy file (default: the live category-config taxonomy)')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=CATEGORIZER_WORKERS,
+                        help='Categorizer processes (0 = categorize in this process)')
+    parser.add_argument('--chunk-size', type=int, default=CATEGORIZER_CHUNK_SIZE)
+    parser.add_argument('--checkpoint', help='File to save progress to and resume from')
+    parser.add_argument('--progress-interval', type=float, default=5.0)
+    parser.add_argument('--bootstrap', default=KAFKA_BOOTSTRAP_SERVERS)
+    args = parser.parse_args()
+
+    if not args.output_topic and not args.store:
+        parser.error('choose an output: --output-topic and/or --store')
+    if args.output_topic == args.topic and not args.archive:
+        parser.error('--output-topic must differ from the topic being replayed')
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
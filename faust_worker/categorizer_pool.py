@@ -0,0 +1,169 @@
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import mode
+
+from keyword_matcher import KeywordMatch, KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Keyword index owned by each pool process, built once by the initializer
+_worker_matcher: Optional[KeywordMatcher] = None
+
+
+def _init_worker(categories: Dict[str, List[str]]):
+    """Build the keyword index once per pool process"""
+    global _worker_matcher
+    _worker_matcher = KeywordMatcher(categories)
+
+
+def _match_texts(matcher, texts: List[Tuple[str, Optional[str]]]) -> List[Optional[KeywordMatch]]:
+    results = []
+    for title, summary in texts:
+        try:
+            text = title.lower()
+            if summary:
+                text += " " + summary.lower()
+            results.append(matcher.match_terms(text))
+        except Exception:
+            # A malformed article costs only itself, not the rest of its chunk
+            results.append(None)
+    return results
+
+
+def _ready() -> bool:
+    """No-op run on every process of a new pool, so it is spawned and initialized before use"""
+    return _worker_matcher is not None
+
+
+def _categorize_chunk(texts: List[Tuple[str, Optional[str]]]) -> List[Optional[KeywordMatch]]:
+    """Categorize (title, summary) pairs inside a pool process; None for pairs that failed"""
+    return _match_texts(_worker_matcher, texts)
+
+
+class CategorizerPool(mode.Service):
+    """
+    Runs CPU-bound keyword matching in a ProcessPoolExecutor so the Faust
+    event loop keeps consuming while batches are categorized on other cores.
+
+    Only (title, summary) pairs cross the process boundary per chunk. The
+    taxonomy comes from a LiveKeywordMatcher and is sent once, to the
+    initializer of each pool process. When its version changes, reload()
+    starts a pool with the new taxonomy in the background and swaps it in
+    once all its processes are up; batches keep running on the old pool
+    until then, and chunks already on it finish. A batch is split into
+    chunks that run in parallel, and results come back in input order, so
+    ordering within each partition is preserved.
+
+    If a pool process dies, the pool is replaced and the batch retried once;
+    if that fails too, the batch is matched in the event loop instead.
+    """
+
+    def __init__(self, taxonomy, workers: int, chunk_size: int = 100, **kwargs):
+        self.taxonomy = taxonomy
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._version = None  # Taxonomy version the current executor was started with
+        self._reloading = False
+        super().__init__(**kwargs)
+
+    def _new_executor(self, categories: Dict[str, List[str]]) -> ProcessPoolExecutor:
+        # spawn: forking a process that owns an event loop and Kafka client threads is unsafe
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(categories,),
+        )
+
+    def _start_executor(self):
+        version, categories = self.taxonomy.version, self.taxonomy.categories
+        self._executor = self._new_executor(categories)
+        self._version = version
+
+    async def reload(self) -> None:
+        """
+        Replace the pool with one for the current taxonomy, without blocking
+        categorize(): the new processes are spawned and initialized first,
+        then swapped in. Call after the taxonomy has changed.
+        """
+        if self._executor is None or self._reloading:
+            return
+        self._reloading = True
+        try:
+            # Repeat if the taxonomy changed again while the new pool was starting
+            while self._executor is not None and self.taxonomy.version != self._version:
+                version, categories = self.taxonomy.version, self.taxonomy.categories
+                started = time.monotonic()
+                executor = self._new_executor(categories)
+                loop = asyncio.get_running_loop()
+                try:
+                    await asyncio.gather(*[loop.run_in_executor(executor, _ready) for _ in range(self.workers)])
+                except Exception as e:
+                    executor.shutdown(wait=False)
+                    logger.error(f"Could not start a categorizer pool for taxonomy v{version}, keeping v{self._version}: {e}")
+                    return
+                previous, self._executor, self._version = self._executor, executor, version
+                # Chunks already submitted to the old pool still run to completion
+                previous.shutdown(wait=False)
+                logger.info(
+                    f"Categorizer pool switched to taxonomy v{version} "
+                    f"after {(time.monotonic() - started) * 1000:.0f} ms in the background"
+                )
+        finally:
+            self._reloading = False
+
+    async def on_start(self) -> None:
+        self._start_executor()
+        logger.info(f"Categorizer pool started with {self.workers} worker processes")
+
+    async def on_stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        logger.info("Categorizer pool stopped")
+
+    async def categorize(self, articles: Sequence) -> List[Optional[KeywordMatch]]:
+        """
+        Match a batch of NewsArticle payloads; results match the input order,
+        with None for articles that could not be matched, and are scored by
+        the caller.
+        """
+        if not articles:
+            return []
+
+        texts = [(article.title, article.summary) for article in articles]
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+
+        if self.taxonomy.version != self._version and not self._reloading:
+            # Normally started by the taxonomy reload already; this batch still uses the current pool
+            asyncio.ensure_future(self.reload())
+
+        executor = self._executor
+        try:
+            chunk_results = await self._run_chunks(executor, chunks)
+        except BrokenProcessPool as e:
+            logger.warning(f"Categorizer pool is broken ({e}), restarting it and retrying the batch")
+            if self._executor is executor:
+                # Not already replaced by a concurrent batch that hit the same failure
+                self._start_executor()
+                executor.shutdown(wait=False)
+            try:
+                chunk_results = await self._run_chunks(self._executor, chunks)
+            except BrokenProcessPool as e:
+                logger.error(f"Categorizer pool failed again ({e}), matching the batch in the event loop")
+                return _match_texts(self.taxonomy, texts)
+        return [result for chunk in chunk_results for result in chunk]
+
+    async def _run_chunks(self, executor: ProcessPoolExecutor, chunks: List[List[Tuple[str, Optional[str]]]]):
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[
+            loop.run_in_executor(executor, _categorize_chunk, chunk)
+            for chunk in chunks
+        ])
@@ -0,0 +1,157 @@
+import re
+from typing import Dict, List, NamedTuple, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """Match result with the term statistics relevance scoring needs"""
+    categories: List[str]
+    keywords: List[str]
+    term_counts: Dict[str, int]  # Lowercased keyword -> occurrences in the text
+    length: int  # Words in the text
+
+
+class KeywordMatcher:
+    """
+    Keyword index built once from a category taxonomy.
+
+    All keywords are compiled into a single prefix-factored regex, so an
+    article is matched in one pass over its text instead of one substring
+    scan per keyword. Keywords only match on word boundaries ('go' does not
+    match "google", 'ai' does not match "said").
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = categories
+
+        # Lowercased keyword -> original spelling / owning categories / taxonomy position
+        self._spelling: Dict[str, str] = {}
+        self._keyword_categories: Dict[str, List[str]] = {}
+        self._keyword_order: Dict[str, int] = {}
+        self._category_order = {category: i for i, category in enumerate(categories)}
+
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                key = keyword.lower()
+                if key not in self._spelling:
+                    self._spelling[key] = keyword
+                    self._keyword_order[key] = len(self._keyword_order)
+                    self._keyword_categories[key] = []
+                if category not in self._keyword_categories[key]:
+                    self._keyword_categories[key].append(category)
+
+        # The regex reports only the longest keyword starting at each position,
+        # so remember the shorter keywords it implies ('cloud computing' -> 'cloud')
+        self._implied: Dict[str, List[str]] = {
+            key: [prefix for prefix in _word_prefixes(key) if prefix in self._spelling]
+            for key in self._spelling
+        }
+
+        self._pattern = self._compile(list(self._spelling))
+
+    @property
+    def keyword_count(self) -> int:
+        return len(self._spelling)
+
+    @staticmethod
+    def _compile(keywords: List[str]):
+        """Compile keywords into one boundary-aware, overlapping-match regex"""
+        if not keywords:
+            return None
+
+        trie: dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        # Zero-width lookahead lets matches overlap ('generative ai' and 'ai')
+        return re.compile(r'(?<!\w)(?=(' + _trie_to_regex(trie) + r')(?!\w))')
+
+    def match(self, text: str) -> Tuple[List[str], List[str], float]:
+        """
+        Match lowercased text against the taxonomy.
+
+        Returns:
+            (categories, matched_keywords, relevance_score)
+        """
+        if self._pattern is None:
+            return [], [], 0
+
+        found = set()
+        for m in self._pattern.finditer(text):
+            key = m.group(1)
+            if key not in found:
+                found.add(key)
+                found.update(self._implied[key])
+
+        if not found:
+            return [], [], 0
+
+        matched_categories, matched_keywords = self._resolve(found)
+
+        # Relevance score is the number of unique keywords matched
+        return matched_categories, matched_keywords, len(matched_keywords)
+
+    def match_terms(self, text: str) -> KeywordMatch:
+        """Like match(), but counting every occurrence of each keyword instead of scoring"""
+        length = text.count(' ') + 1 if text else 0
+        if self._pattern is None:
+            return KeywordMatch([], [], {}, length)
+
+        counts: Dict[str, int] = {}
+        for m in self._pattern.finditer(text):
+            key = m.group(1)
+            counts[key] = counts.get(key, 0) + 1
+            for implied in self._implied[key]:
+                counts[implied] = counts.get(implied, 0) + 1
+
+        if not counts:
+            return KeywordMatch([], [], counts, length)
+
+        matched_categories, matched_keywords = self._resolve(counts)
+        return KeywordMatch(matched_categories, matched_keywords, counts, length)
+
+    def _resolve(self, found) -> Tuple[List[str], List[str]]:
+        """Categories and original keyword spellings, in taxonomy order, for lowercased keywords"""
+        keys = sorted(found, key=self._keyword_order.__getitem__)
+
+        categories = set()
+        for key in keys:
+            categories.update(self._keyword_categories[key])
+
+        matched_categories = sorted(categories, key=self._category_order.__getitem__)
+        matched_keywords = [self._spelling[key] for key in keys]
+        return matched_categories, matched_keywords
+
+
+def _word_prefixes(keyword: str) -> List[str]:
+    """Prefixes of `keyword` that end on a word boundary ('cloud computing' -> 'cloud')"""
+    return [
+        keyword[:i]
+        for i in range(1, len(keyword))
+        if not (keyword[i].isalnum() or keyword[i] == '_')
+    ]
+
+
+def _trie_to_regex(node: dict) -> str:
+    """Turn a character trie into a regex with shared prefixes factored out"""
+    terminal = '' in node
+    branches = [
+        re.escape(char) + _trie_to_regex(child)
+        for char, child in sorted(node.items())
+        if char != ''
+    ]
+
+    if not branches:
+        return ''
+
+    if len(branches) == 1:
+        body = branches[0]
+        if terminal:
+            # Greedy optional: try the longer keyword first, then fall back
+            return f'(?:{body})?' if len(body) > 1 else f'{body}?'
+        return body
+
+    body = '(?:' + '|'.join(branches) + ')'
+    return body + '?' if terminal else body
@@ -1,9 +1,43 @@
+import time
 import faust
-from typing import Optional, List
+from typing import Any, Optional, List
 from datetime import datetime
 from dataclasses import field 
+from faust.serializers import codecs
+from faust_config import WIRE_FORMAT
+from wire_format import SCHEMA_BY_MODEL, decode, encode
+from worker_metrics import worker_metrics
 
-class NewsArticle(faust.Record, serializer='json'):
+
+class NewsWireCodec(codecs.Codec):
+    """
+    Reads both the binary wire format and JSON; writes WIRE_FORMAT
+    ('json' or 'binary'). Records without a binary schema are written as JSON.
+    """
+
+    def __init__(self, **kwargs: Any):
+        self.json = codecs.get_codec('json')
+        super().__init__(**kwargs)
+
+    def _dumps(self, obj: Any) -> bytes:
+        if WIRE_FORMAT == 'binary':
+            model = obj.get('__faust', {}).get('ns', '').rpartition('.')[2]
+            schema = SCHEMA_BY_MODEL.get(model)
+            if schema is not None:
+                return encode(obj, schema)
+        return self.json.dumps(obj)
+
+    def _loads(self, s: bytes) -> Any:
+        started = time.perf_counter()
+        message = decode(s)
+        worker_metrics.observe_stage('deserialize', time.perf_counter() - started)
+        return message
+
+
+codecs.register('news-wire', NewsWireCodec())
+
+
+class NewsArticle(faust.Record, serializer='news-wire'):
     """Input news article from producers"""
     source: str
     title: str
@@ -22,7 +56,7 @@ class NewsArticle(faust.Record, serializer='json'):
     summary: Optional[str] = None
 
 
-class ProcessedArticle(faust.Record, serializer='json'):
+class ProcessedArticle(faust.Record, serializer='news-wire'):
     """Processed article with categories"""
 
     # --- Required (non-default) fields first ---
@@ -45,4 +79,62 @@ class ProcessedArticle(faust.Record, serializer='json'):
     post_id: Optional[str] = None
     is_self_post: Optional[bool] = None
     published: Optional[str] = None
-    summary: Optional[str] = None
\ No newline at end of file
+    summary: Optional[str] = None
+
+    # Shared by near-duplicate copies of the same story from different sources
+    cluster_id: Optional[str] = None
+
+    @classmethod
+    def from_article(cls, article: NewsArticle, **fields: Any) -> 'ProcessedArticle':
+        """
+        Derive a processed record from a parsed NewsArticle, reusing its field
+        values as they are instead of passing them through the generated
+        __init__ one by one. `fields` must set every processing field.
+        Attributes the article picked up from newer producers (fields this
+        worker's NewsArticle doesn't know) are not carried over.
+
+        This skips per-field preparation, which is a no-op while neither model
+        coerces or validates; if that changes, the regular constructor is used.
+        """
+        if cls._options.coerce or cls._options.validation:
+            return cls(**article.asdict(), **fields)
+
+        record = object.__new__(cls)
+        data = record.__dict__
+        data.update(article.__dict__)
+        data.update(fields)
+        data['__evaluated_fields__'] = set()
+        if len(data) != len(_PROCESSED_ARTICLE_KEYS) or data.keys() != _PROCESSED_ARTICLE_KEYS:
+            missing = _PROCESSED_ARTICLE_KEYS - data.keys()
+            if missing:
+                unexpected = data.keys() - _PROCESSED_ARTICLE_KEYS
+                raise TypeError(
+                    f"ProcessedArticle.from_article() missing fields: {', '.join(sorted(missing))}"
+                    + (f"; unexpected fields: {', '.join(sorted(unexpected))}" if unexpected else '')
+                )
+            for key in data.keys() - _PROCESSED_ARTICLE_KEYS:
+                del data[key]
+        return record
+
+
+# Fields plus the bookkeeping attribute Faust keeps on every record
+_PROCESSED_ARTICLE_KEYS = ProcessedArticle._options.fields.keys() | {'__evaluated_fields__'}
+
+
+class StoredArticles(faust.Record, serializer='json'):
+    """Categories and sources of a batch the MongoDB sink has just written"""
+    categories: List[str]
+    sources: List[str]
+    count: int
+
+
+class TrendingTopic(faust.Record, serializer='json'):
+    """A category, keyword or source that is above its usual rate in a window"""
+    dimension: str
+    name: str
+    window: str
+    count: int
+    baseline_window: str
+    baseline_count: int
+    score: float
+    computed_at: str
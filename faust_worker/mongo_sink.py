@@ -0,0 +1,161 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import mode
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult
+
+logger = logging.getLogger(__name__)
+
+# Per-document write error codes worth retrying: failovers, interrupted
+# operations and upsert races. Anything else (document too large, failed
+# validation, ...) fails the same way every time.
+TRANSIENT_WRITE_ERRORS = {
+    6,      # HostUnreachable
+    7,      # HostNotFound
+    50,     # MaxTimeMSExpired
+    89,     # NetworkTimeout
+    91,     # ShutdownInProgress
+    112,    # WriteConflict
+    189,    # PrimarySteppedDown
+    262,    # ExceededTimeLimit
+    9001,   # SocketException
+    10107,  # NotWritablePrimary
+    11000,  # DuplicateKey: two upserts of one new _id racing across workers
+    11600,  # InterruptedAtShutdown
+    11602,  # InterruptedDueToReplStateChange
+    13435,  # NotPrimaryNoSecondaryOk
+    13436,  # NotPrimaryOrSecondary
+}
+
+# Format of the timestamp / processed_at strings written by the producers and the worker
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def to_document(record) -> Dict[str, Any]:
+    """
+    MongoDB document for a ProcessedArticle. timestamp and processed_at are
+    stored as BSON dates so they can back range queries and a TTL index.
+    """
+    document = record.asdict()
+    for field in ('timestamp', 'processed_at'):
+        try:
+            document[field] = datetime.strptime(document[field], TIMESTAMP_FORMAT)
+        except (TypeError, ValueError):
+            if field == 'processed_at':
+                document[field] = datetime.utcnow()
+    return document
+
+
+def build_upserts(documents: Sequence[Tuple[str, Dict[str, Any]]]) -> List[UpdateOne]:
+    """
+    One upsert per article, keyed on its canonical URL. If a batch holds
+    several versions of the same article (e.g. an HN story re-sent after its
+    score changed) only the last one is written. Two upserts for one _id in
+    the same unordered bulk could race and fail with a duplicate key error.
+    """
+    latest = {}
+    for key, document in documents:
+        latest[key] = document
+    return [
+        UpdateOne({'_id': key}, {'$set': document}, upsert=True)
+        for key, document in latest.items()
+    ]
+
+
+class MongoSink(mode.Service):
+    """
+    Writes processed articles to MongoDB with unordered bulk upserts.
+
+    Upserting on the canonical URL makes the write idempotent: replaying a
+    batch after a crash or a failed write leaves the collection unchanged.
+    With ordered=False the server applies the whole batch in one round trip
+    and keeps going past individual failures instead of stopping at the
+    first one. Documents that fail permanently are logged and counted as
+    rejected; only transient failures make the write raise and be retried.
+    """
+
+    def __init__(self, uri: str, database: str, collection: str,
+                 pool_size: int = 10, **kwargs):
+        self.uri = uri
+        self.database_name = database
+        self.collection_name = collection
+        self.pool_size = pool_size
+        self.client = None
+        self.collection = None
+        self.batches = 0
+        self.documents = 0
+        self.upserted = 0
+        self.modified = 0
+        self.failures = 0
+        self.rejected = 0  # Documents skipped after a permanent write error
+        super().__init__(**kwargs)
+
+    async def on_start(self) -> None:
+        self.client = AsyncIOMotorClient(self.uri, maxPoolSize=self.pool_size)
+        self.collection = self.client[self.database_name][self.collection_name]
+        logger.info(
+            f"MongoDB sink started: {self.database_name}.{self.collection_name} "
+            f"(pool size {self.pool_size})"
+        )
+
+    async def on_stop(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        logger.info("MongoDB sink stopped")
+
+    async def write(self, documents: Sequence[Tuple[str, Dict[str, Any]]]) -> Optional[Any]:
+        """Upsert (canonical URL, document) pairs in one unordered bulk write"""
+        requests = build_upserts(documents)
+        if not requests:
+            return None
+        try:
+            result = await self.collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            result = self._partial_result(e)
+        except Exception:
+            self.failures += 1
+            raise
+
+        self.batches += 1
+        self.documents += len(requests)
+        self.upserted += result.upserted_count
+        self.modified += result.modified_count
+        return result
+
+    def _partial_result(self, error: BulkWriteError) -> BulkWriteResult:
+        """
+        Result of a bulk write where some documents failed. The rest of the
+        batch is written either way. Raises again if any failure is
+        transient, so the caller retries the batch (the upserts make that
+        idempotent); documents that can never be written are logged and
+        skipped rather than retried forever.
+        """
+        details = error.details
+        write_errors = details.get('writeErrors', [])
+        if details.get('writeConcernErrors') or any(
+            write_error.get('code') in TRANSIENT_WRITE_ERRORS for write_error in write_errors
+        ):
+            self.failures += 1
+            raise error
+
+        for write_error in write_errors:
+            _id = write_error.get('op', {}).get('q', {}).get('_id')
+            logger.error(f"Skipping article {_id} that MongoDB rejected: {write_error.get('errmsg')} "
+                         f"(code {write_error.get('code')})")
+        self.rejected += len(write_errors)
+        return BulkWriteResult(details, True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'batches': self.batches,
+            'documents': self.documents,
+            'upserted': self.upserted,
+            'modified': self.modified,
+            'failures': self.failures,
+            'rejected': self.rejected,
+        }
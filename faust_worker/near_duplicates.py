@@ -0,0 +1,165 @@
+import re
+import zlib
+import random
+import hashlib
+from array import array
+from typing import List, Optional
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Largest value a 32-bit shingle hash can take once its bin bits are shifted off
+_EMPTY_BIN = 1 << 32
+
+
+class MinHasher:
+    """
+    MinHash signatures and LSH band keys for near-duplicate detection.
+
+    Uses one-permutation hashing: every character shingle is hashed once and
+    lands in one of `num_perm` bins, keeping the minimum per bin, so the cost
+    is linear in text length rather than text length x permutations. Empty
+    bins (common for short titles) are filled by optimal densification: each
+    bin probes other bins in its own fixed pseudo-random order and copies the
+    first filled one, which keeps neighbouring bins uncorrelated.
+
+    With `bands` bands of num_perm / bands rows, two texts share at least one
+    band key with high probability once their shingle Jaccard similarity is
+    above roughly (1 / bands) ** (bands / num_perm).
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Fixed per-bin probe orders; seeded so every worker produces identical signatures
+        rng = random.Random(num_perm)
+        self._probes = []
+        for b in range(num_perm):
+            others = [o for o in range(num_perm) if o != b]
+            rng.shuffle(others)
+            self._probes.append(others)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+    def signature(self, text: str) -> List[int]:
+        """MinHash signature of a text's character shingles"""
+        data = self.normalize(text).encode('utf-8')
+        size = self.shingle_size
+        num_perm = self.num_perm
+
+        bins = [_EMPTY_BIN] * num_perm
+        # crc32 is stable across processes, unlike hash() on str/bytes
+        for i in range(max(1, len(data) - size + 1)):
+            h = zlib.crc32(data[i:i + size])
+            b = h % num_perm
+            v = h // num_perm
+            if v < bins[b]:
+                bins[b] = v
+
+        # Densify from the original (pre-densification) bins only
+        if _EMPTY_BIN in bins:
+            filled = list(bins)
+            for b in range(num_perm):
+                if filled[b] == _EMPTY_BIN:
+                    for source in self._probes[b]:
+                        if filled[source] != _EMPTY_BIN:
+                            bins[b] = filled[source]
+                            break
+
+        return bins
+
+    def band_keys(self, signature: List[int]) -> List[int]:
+        """One 64-bit key per band; texts that share any key are near-duplicate candidates"""
+        data = array('Q', signature).tobytes()
+        width = self.rows * 8
+        return [
+            int.from_bytes(
+                hashlib.blake2b(data[band * width:(band + 1) * width], digest_size=8,
+                                salt=band.to_bytes(16, 'big')).digest(),
+                'big'
+            )
+            for band in range(self.bands)
+        ]
+
+
+class LSHIndex:
+    """
+    Assigns articles to near-duplicate clusters.
+
+    `bands` maps LSH band keys to cluster IDs and `signatures` maps cluster
+    IDs to the compact signature of the cluster's first article. Both can be
+    any mapping-like store: dicts in benchmarks, windowed Faust table adapters
+    in the worker. Band matches are only candidates. A candidate cluster is
+    joined only if its stored signature agrees on at least `threshold` of its
+    positions (estimated Jaccard similarity), which removes chance band
+    collisions in large windows.
+    """
+
+    def __init__(self, hasher: MinHasher, bands, signatures, threshold: float = 0.5):
+        self.hasher = hasher
+        self.bands = bands
+        self.signatures = signatures
+        self.threshold = threshold
+
+    def assign(self, text: str, new_cluster_id: str) -> str:
+        """
+        Return the cluster of an earlier near-duplicate of `text`, or register
+        `text` under `new_cluster_id` if there is none.
+        """
+        signature = self.hasher.signature(text)
+        compact = compact_signature(signature)
+        keys = self.hasher.band_keys(signature)
+
+        candidates = []
+        missing = []
+        for key in keys:
+            found = self.bands.get(key)
+            if found is None:
+                missing.append(key)
+            elif found not in candidates:
+                candidates.append(found)
+
+        cluster_id: Optional[str] = None
+        best = self.threshold
+        for candidate in candidates:
+            stored = self.signatures.get(candidate)
+            if stored is None:
+                continue
+            similarity = signature_similarity(compact, stored)
+            if similarity >= best:
+                cluster_id, best = candidate, similarity
+
+        if cluster_id is None:
+            cluster_id = new_cluster_id
+            self.signatures[cluster_id] = compact
+
+        # Only fill empty buckets so each band keeps pointing at the first story seen
+        for key in missing:
+            self.bands[key] = cluster_id
+
+        return cluster_id
+
+
+def compact_signature(signature: List[int]) -> str:
+    """Keep the low 16 bits of each position (b-bit MinHash), hex-encoded for table storage"""
+    return array('H', [v & 0xFFFF for v in signature]).tobytes().hex()
+
+
+def signature_similarity(a: str, b: str) -> float:
+    """Fraction of agreeing positions between two compact signatures"""
+    left = array('H', bytes.fromhex(a))
+    right = array('H', bytes.fromhex(b))
+    if len(left) != len(right) or not left:
+        return 0.0
+    return sum(x == y for x, y in zip(left, right)) / len(left)
+
+
+def cluster_id_for(url: str) -> str:
+    """Stable cluster ID derived from the first article's URL"""
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).hexdigest()
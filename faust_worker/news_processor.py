@@ -1,15 +1,70 @@
+import asyncio
 import faust
+import json
 import logging
+import time
+from collections import deque
 from datetime import datetime
-from typing import List, Tuple, Dict
-from models import NewsArticle, ProcessedArticle
+from functools import partial
+from typing import Any, List, Optional, Sequence, Set, Tuple, Dict
+from aiokafka.errors import KafkaError, KafkaTimeoutError
+from faust.cli import option
+from models import NewsArticle, ProcessedArticle, StoredArticles, TrendingTopic
+from keyword_matcher import KeywordMatch
+from taxonomy import LiveKeywordMatcher, build_taxonomy, read_taxonomy
+from categorizer_pool import CategorizerPool
+from near_duplicates import LSHIndex, MinHasher, cluster_id_for
+from mongo_sink import MongoSink, to_document
+from relevance import RelevanceScorer
+from trending import BASELINES, WINDOWS, dimension_keys, top_trending
+from worker_metrics import worker_metrics
 from faust_config import (
+    KAFKA_BOOTSTRAP_SERVERS,
     FAUST_APP_ID,
     FAUST_BROKER,
     INPUT_TOPIC,
     OUTPUT_TOPIC,
+    TOPIC_PARTITIONS,
+    TOPIC_REPLICATION_FACTOR,
+    PROCESSING_CONCURRENCY,
     CATEGORIES,
-    MIN_SCORE
+    CATEGORY_CONFIG_TOPIC,
+    TAXONOMY_CHECK_INTERVAL,
+    MIN_SCORE,
+    BATCH_MODE,
+    MAX_BATCH_SIZE,
+    BATCH_WITHIN_SECONDS,
+    CATEGORIZER_WORKERS,
+    CATEGORIZER_CHUNK_SIZE,
+    NEAR_DUP_ENABLED,
+    NEAR_DUP_WINDOW_SECONDS,
+    NEAR_DUP_NUM_PERM,
+    NEAR_DUP_BANDS,
+    NEAR_DUP_THRESHOLD,
+    MONGO_SINK_ENABLED,
+    MONGO_URI,
+    MONGO_DATABASE,
+    MONGO_COLLECTION,
+    MONGO_BATCH_SIZE,
+    MONGO_FLUSH_INTERVAL,
+    MONGO_POOL_SIZE,
+    STORED_TOPIC,
+    TRENDING_ENABLED,
+    TRENDING_EVENTS_TOPIC,
+    TRENDING_TOPIC,
+    TRENDING_HOPS,
+    TRENDING_PUBLISH_INTERVAL,
+    TRENDING_TOP_N,
+    TRENDING_MIN_COUNT,
+    RELEVANCE_SCORER,
+    RELEVANCE_K1,
+    RELEVANCE_B,
+    RELEVANCE_ENGAGEMENT_WEIGHT,
+    RELEVANCE_COMMENT_WEIGHT,
+    RELEVANCE_HALF_LIFE_HOURS,
+    RELEVANCE_SYNC_INTERVAL,
+    DOCUMENT_FREQUENCY_TOPIC,
+    METRICS_SUMMARY_INTERVAL
 )
 
 logging.basicConfig(
@@ -23,11 +78,218 @@ app = faust.App(
     FAUST_APP_ID,
     broker=FAUST_BROKER,
     value_serializer='json',
+    topic_partitions=TOPIC_PARTITIONS,
+    topic_replication_factor=TOPIC_REPLICATION_FACTOR,
 )
 
-# Define topics
-input_topic = app.topic(INPUT_TOPIC, value_type=NewsArticle)
-output_topic = app.topic(OUTPUT_TOPIC, value_type=ProcessedArticle)
+# Define topics. internal=True makes Faust create a topic (with
+# TOPIC_PARTITIONS partitions) before subscribing to it, rather than leaving
+# it to broker auto-creation and the broker's default partition count.
+# Topics the worker only writes to are created by declare_topics() below.
+input_topic = app.topic(
+    INPUT_TOPIC, value_type=NewsArticle, value_serializer='news-wire',
+    partitions=TOPIC_PARTITIONS, internal=True
+)
+output_topic = app.topic(
+    OUTPUT_TOPIC, value_type=ProcessedArticle, value_serializer='news-wire',
+    partitions=TOPIC_PARTITIONS, internal=True
+)
+# Written by the MongoDB sink after each bulk write, for the read API's cache
+stored_topic = app.topic(STORED_TOPIC, value_type=StoredArticles, partitions=1, internal=True)
+
+# Keyword index, starting from the default taxonomy and rebuilt whenever
+# category-config changes
+keyword_matcher = LiveKeywordMatcher(CATEGORIES)
+
+# The taxonomy lives in a compacted topic used directly as the changelog of a
+# global table, so every worker holds all of it. One partition and unbuffered
+# recovery, as Faust recommends for global tables; updates are rare.
+category_config_topic = app.topic(
+    CATEGORY_CONFIG_TOPIC, key_type=str, key_serializer='raw', value_serializer='json',
+    partitions=1, compacting=True, internal=True
+)
+category_table = app.GlobalTable(
+    'category-config',
+    key_type=str,
+    changelog_topic=category_config_topic,
+    partitions=1,
+    recovery_buffer_size=1,
+)
+
+
+@category_table.on_recover
+async def reload_taxonomy():
+    """
+    Rebuild the keyword index if category-config has changed. Also runs when
+    the table has been recovered, before the agents resume, so a restarted
+    worker starts with the stored taxonomy rather than the defaults.
+    """
+    try:
+        started = time.monotonic()
+        if await keyword_matcher.reload(build_taxonomy(category_table.items())):
+            logger.info(
+                f"Taxonomy v{keyword_matcher.version} loaded: "
+                f"{len(keyword_matcher.categories)} categories, "
+                f"{keyword_matcher.matcher.keyword_count} keywords "
+                f"in {(time.monotonic() - started) * 1000:.1f} ms"
+            )
+            if categorizer_pool is not None:
+                # Warms a pool for the new taxonomy while batches keep using the old one
+                await categorizer_pool.reload()
+    except Exception as e:
+        logger.error(f"Taxonomy reload failed, keeping v{keyword_matcher.version}: {e}", exc_info=True)
+
+
+@app.timer(interval=TAXONOMY_CHECK_INTERVAL)
+async def check_taxonomy():
+    """
+    Pick up category-config updates. The rebuild runs on a thread while the
+    agents keep matching with the current index until the new one is swapped in.
+    """
+    await reload_taxonomy()
+
+
+# Relevance scoring. Keyword document frequencies live in a global table so
+# every worker scores with the same statistics. Workers publish what they
+# counted as deltas to a one-partition topic, and the one agent consuming it
+# applies them, so the table has a single writer.
+relevance_scorer = None
+if RELEVANCE_SCORER == 'bm25':
+    relevance_scorer = RelevanceScorer(
+        keyword_matcher,
+        k1=RELEVANCE_K1,
+        b=RELEVANCE_B,
+        engagement_weight=RELEVANCE_ENGAGEMENT_WEIGHT,
+        comment_weight=RELEVANCE_COMMENT_WEIGHT,
+        half_life_hours=RELEVANCE_HALF_LIFE_HOURS
+    )
+
+document_frequency_topic = app.topic(
+    DOCUMENT_FREQUENCY_TOPIC, value_serializer='json', partitions=1, internal=True
+)
+document_frequency_table = app.GlobalTable(
+    'keyword-document-frequency',
+    default=int,
+    key_type=str,
+    value_type=int,
+    partitions=1,
+    recovery_buffer_size=1,
+)
+
+
+@document_frequency_table.on_recover
+async def load_document_frequencies():
+    """Start scoring with the stored statistics rather than from nothing"""
+    if relevance_scorer is not None:
+        relevance_scorer.load(document_frequency_table.items())
+        logger.info(f"Relevance statistics loaded: {relevance_scorer.documents} documents")
+
+
+@app.agent(document_frequency_topic)
+async def count_document_frequencies(deltas):
+    """Add every worker's document-frequency deltas to the shared table"""
+    async for delta in deltas:
+        for key, count in delta.items():
+            document_frequency_table[key] += count
+
+
+@app.timer(interval=RELEVANCE_SYNC_INTERVAL)
+async def sync_document_frequencies():
+    """Read back the shared statistics, and publish what this worker counted since the last sync"""
+    if relevance_scorer is None:
+        return
+    relevance_scorer.load(document_frequency_table.items())
+    delta = relevance_scorer.take_pending()
+    if delta:
+        await document_frequency_topic.send(value=delta)
+
+
+# Optional process pool that takes categorization off the event loop in batch mode
+categorizer_pool = None
+if CATEGORIZER_WORKERS > 0:
+    categorizer_pool = app.service(
+        CategorizerPool(keyword_matcher, workers=CATEGORIZER_WORKERS, chunk_size=CATEGORIZER_CHUNK_SIZE)
+    )
+
+# Near-duplicate clustering state. Hopping windows with step = half the size:
+# every article is written to the two windows open at the time, and reads go
+# to the older of them (see live_window()), which holds between a half and a
+# whole window of history. Old windows expire so state stays bounded. Both
+# tables are changelog-backed.
+near_dup_bands_table = app.Table(
+    'near-duplicate-bands', default=str, key_type=str, value_type=str
+).hopping(
+    NEAR_DUP_WINDOW_SECONDS, NEAR_DUP_WINDOW_SECONDS / 2, expires=NEAR_DUP_WINDOW_SECONDS
+).relative_to_now()
+
+near_dup_signatures_table = app.Table(
+    'near-duplicate-signatures', default=str, key_type=str, value_type=str
+).hopping(
+    NEAR_DUP_WINDOW_SECONDS, NEAR_DUP_WINDOW_SECONDS / 2, expires=NEAR_DUP_WINDOW_SECONDS
+).relative_to_now()
+
+
+def live_window(table) -> Tuple[float, float]:
+    """
+    Range of the oldest window of a hopping table that contains now, the
+    one holding the most history. Read explicitly rather than through
+    WindowSet.now(), which in some Faust versions reads the newest window,
+    open for at most one step.
+    """
+    return table.table.window.earliest(table.get_timestamp())
+
+
+class WindowedTableStore:
+    """Mapping view of a windowed table for LSHIndex, reading the oldest window open now"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, key):
+        return self.table[str(key)][live_window(self.table)] or None
+
+    def __setitem__(self, key, value):
+        self.table[str(key)] = value
+
+
+near_duplicate_index = None
+if NEAR_DUP_ENABLED:
+    near_duplicate_index = LSHIndex(
+        MinHasher(num_perm=NEAR_DUP_NUM_PERM, bands=NEAR_DUP_BANDS),
+        WindowedTableStore(near_dup_bands_table),
+        WindowedTableStore(near_dup_signatures_table),
+        threshold=NEAR_DUP_THRESHOLD
+    )
+
+
+# Trending topics. process_news sends one message per counted key (category,
+# keyword, source) to an internal topic keyed by that key, so each key's
+# counts live in exactly one partition however many workers there are.
+# Each table counts one window size; hopping windows expire, and keys are
+# bounded by the taxonomy and the set of sources, so state stays bounded.
+trending_events_topic = app.topic(TRENDING_EVENTS_TOPIC, key_type=str, value_type=int, internal=True)
+trending_topic = app.topic(
+    TRENDING_TOPIC, value_type=TrendingTopic, partitions=TOPIC_PARTITIONS, internal=True
+)
+
+trending_tables = {}
+if TRENDING_ENABLED:
+    trending_tables = {
+        window: app.Table(
+            f'trending-{window}', default=int, key_type=str, value_type=int
+        ).hopping(
+            size, size / TRENDING_HOPS, expires=size, key_index=True
+        ).relative_to_now()
+        for window, size in WINDOWS.items()
+    }
+
+
+def article_text(article: NewsArticle) -> str:
+    """Title and summary, lowercased for matching"""
+    text = article.title.lower()
+    if article.summary:
+        text += " " + article.summary.lower()
+    return text
 
 
 def categorize_article(article: NewsArticle) -> Tuple[List[str], List[str], float]:
@@ -37,33 +299,34 @@ def categorize_article(article: NewsArticle) -> Tuple[List[str], List[str], floa
     Returns:
         (categories, matched_keywords, relevance_score)
     """
-    # Combine title and summary for matching
-    text = article.title.lower()
-    if article.summary:
-        text += " " + article.summary.lower()
-    
-    matched_categories = []
-    matched_keywords = []
-    keyword_matches = 0
-    
-    # Check each category
-    for category, keywords in CATEGORIES.items():
-        category_matched = False
-        
-        for keyword in keywords:
-            if keyword.lower() in text:
-                if not category_matched:
-                    matched_categories.append(category)
-                    category_matched = True
-                
-                if keyword not in matched_keywords:
-                    matched_keywords.append(keyword)
-                    keyword_matches += 1
+    if relevance_scorer is None:
+        return keyword_matcher.match(article_text(article))
     
-    # Calculate relevance score (number of unique keywords matched)
-    relevance_score = keyword_matches
-    
-    return matched_categories, matched_keywords, relevance_score
+    match = keyword_matcher.match_terms(article_text(article))
+    relevance_scorer.observe((match,))
+    return match.categories, match.keywords, relevance_scorer.score(article, match)
+
+
+def score_matches(articles: Sequence[NewsArticle], matches: Sequence[KeywordMatch]) -> List[float]:
+    """Relevance of a batch of matched articles, counting them into the statistics first"""
+    if relevance_scorer is None:
+        return [float(len(match.keywords)) for match in matches]
+    relevance_scorer.observe(matches)
+    try:
+        return relevance_scorer.score_batch(articles, matches)
+    except Exception as e:
+        # One bad engagement field fails the vectorized pass; score one at a time instead
+        logger.warning(f"Batch scoring failed, scoring articles one at a time: {e}")
+        return [score_one(article, match) for article, match in zip(articles, matches)]
+
+
+def score_one(article: NewsArticle, match: KeywordMatch) -> float:
+    """Relevance of one already observed article, 0 if its fields can't be scored"""
+    try:
+        return relevance_scorer.score(article, match)
+    except Exception as e:
+        logger.error(f"Error scoring article: {e}", exc_info=True)
+        return 0.0
 
 
 def should_process_article(article: NewsArticle) -> bool:
@@ -77,85 +340,569 @@ def should_process_article(article: NewsArticle) -> bool:
     return True
 
 
-@app.agent(input_topic)
+def assign_cluster(article: NewsArticle) -> Optional[str]:
+    """
+    Return the near-duplicate cluster for an article. Titles only: summaries
+    exist for RSS entries but not HN/Reddit posts, so including them would
+    make cross-source copies of a story look dissimilar.
+    """
+    if near_duplicate_index is None:
+        return None
+    return near_duplicate_index.assign(article.title, cluster_id_for(article.url))
+
+
+class SecondClock:
+    """UTC timestamp string, formatted once per second rather than once per article"""
+
+    __slots__ = ('_second', '_text')
+
+    def __init__(self):
+        self._second = -1
+        self._text = ''
+
+    def now(self) -> str:
+        second = int(time.time())
+        if second != self._second:
+            self._second = second
+            self._text = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(second))
+        return self._text
+
+
+processed_clock = SecondClock()
+
+
+def build_processed_article(article: NewsArticle, categories: List[str],
+                            keywords: List[str], relevance: float) -> ProcessedArticle:
+    """Create the processed-news record for a categorized article"""
+    return ProcessedArticle.from_article(
+        article,
+        categories=categories,
+        matched_keywords=keywords,
+        processed_at=processed_clock.now(),
+        relevance_score=relevance,
+        cluster_id=assign_cluster(article)
+    )
+
+
+async def process_batch(
+    items: List[Tuple[Any, NewsArticle]]
+) -> List[Tuple[Any, ProcessedArticle]]:
+    """
+    Filter and categorize a whole batch of (event, article) pairs, keeping only
+    articles that matched a category. Each record stays paired with its input
+    event, for its key and its Kafka timestamp. A malformed article is logged,
+    counted in batch_stats.errors and dropped without failing the batch.
+    """
+    started = time.perf_counter()
+    candidates = []
+    for event, article in items:
+        try:
+            if should_process_article(article):
+                candidates.append((event, article))
+        except Exception as e:
+            batch_stats.errors += 1
+            logger.error(f"Error processing article: {e}", exc_info=True)
+    filtered = time.perf_counter()
+    worker_metrics.observe_stage('filter', filtered - started)
+
+    if categorizer_pool is not None:
+        # None for articles the pool processes could not match
+        matches = await categorizer_pool.categorize([article for _, article in candidates])
+    else:
+        matches = []
+        for _, article in candidates:
+            try:
+                matches.append(keyword_matcher.match_terms(article_text(article)))
+            except Exception as e:
+                logger.error(f"Error categorizing article: {e}", exc_info=True)
+                matches.append(None)
+    matched = [(pair, match) for pair, match in zip(candidates, matches) if match is not None]
+    batch_stats.errors += len(candidates) - len(matched)
+    relevances = score_matches([article for (_, article), _ in matched], [match for _, match in matched])
+    worker_metrics.observe_stage('categorize', time.perf_counter() - filtered)
+
+    processed = []
+    for ((event, article), match), relevance in zip(matched, relevances):
+        if not match.categories:
+            continue
+        try:
+            processed.append((event, build_processed_article(article, match.categories, match.keywords, relevance)))
+        except Exception as e:
+            batch_stats.errors += 1
+            logger.error(f"Error processing article: {e}", exc_info=True)
+
+    return processed
+
+
+def is_permanent_send_error(error: BaseException) -> bool:
+    """
+    Whether resending can't help: the record could not be encoded, or Kafka
+    refuses it (e.g. larger than message.max.bytes). Connection, leadership
+    and timeout errors are worth retrying.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return False
+    cause = error.__cause__ if isinstance(error.__cause__, KafkaError) else error
+    if isinstance(cause, KafkaError):
+        return not cause.retriable and not isinstance(cause, KafkaTimeoutError)
+    # Raised by send() itself while encoding the key or value
+    return True
+
+
+async def publish_batch(records: List[Tuple[Any, ProcessedArticle]]) -> List[int]:
+    """
+    Send a batch with pipelined sends and wait until the broker acknowledges
+    all of it, retrying until it does. take_events() acks a batch even when
+    the loop body raises, so giving up would commit offsets for articles
+    that were never published. A record that fails permanently (see
+    is_permanent_send_error()) is logged and dropped instead, or it would
+    block the partition forever. Retries resend the whole rest of the batch,
+    keeping per-key order; records that did arrive are resent with the same
+    key, so downstream upserts absorb them.
+
+    Returns the indexes of the dropped records.
+    """
+    dropped: Set[int] = set()
+    remaining = list(range(len(records)))
+    attempt = 0
+    while remaining:
+        error = None  # Last retriable failure
+        # Enqueue every send first, then wait for all broker acks together
+        pending = []
+        for i in remaining:
+            key, record = records[i]
+            try:
+                pending.append((i, await output_topic.send(key=key, value=record, force=True)))
+            except Exception as e:
+                if not is_permanent_send_error(e):
+                    error = e
+                    break
+                logger.error(f"Dropping record {key!r} that can't be published: {e!r}")
+                dropped.add(i)
+        results = await asyncio.gather(*[future for _, future in pending], return_exceptions=True)
+        for (i, _), result in zip(pending, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if not isinstance(result, BaseException):
+                continue
+            if is_permanent_send_error(result):
+                logger.error(f"Dropping record {records[i][0]!r} that the broker rejected: {result!r}")
+                dropped.add(i)
+            else:
+                error = result
+
+        if error is None:
+            break
+        remaining = [i for i in remaining if i not in dropped]
+        attempt += 1
+        delay = min(2 ** attempt, 60)
+        logger.warning(
+            f"Batch publish failed (attempt {attempt}), retrying {len(remaining)} records in {delay}s: {error!r}"
+        )
+        await asyncio.sleep(delay)
+    return sorted(dropped)
+
+
+async def emit_trending(record: ProcessedArticle):
+    """Queue one count per category, matched keyword and source of a published article"""
+    if not trending_tables:
+        return
+    for key in dimension_keys(record.categories, record.matched_keywords, record.source):
+        await trending_events_topic.send(key=key, value=1)
+
+
+class BatchStats:
+    """Rolling per-batch size and latency figures for batch mode"""
+
+    def __init__(self, window: int = 100):
+        self.batches = 0
+        self.articles = 0
+        self.published = 0
+        self.errors = 0  # Articles dropped because they could not be processed
+        self.sizes = deque(maxlen=window)
+        self.latencies_ms = deque(maxlen=window)
+
+    def record(self, size: int, published: int, latency_ms: float):
+        self.batches += 1
+        self.articles += size
+        self.published += published
+        self.sizes.append(size)
+        self.latencies_ms.append(latency_ms)
+
+    def as_dict(self) -> Dict[str, float]:
+        recent = len(self.sizes) or 1
+        return {
+            'batches': self.batches,
+            'articles': self.articles,
+            'published': self.published,
+            'errors': self.errors,
+            'last_batch_size': self.sizes[-1] if self.sizes else 0,
+            'last_batch_latency_ms': round(self.latencies_ms[-1], 2) if self.latencies_ms else 0.0,
+            'avg_batch_size': round(sum(self.sizes) / recent, 2),
+            'avg_batch_latency_ms': round(sum(self.latencies_ms) / recent, 2),
+            'max_batch_latency_ms': round(max(self.latencies_ms, default=0.0), 2),
+        }
+
+
+batch_stats = BatchStats()
+
+
+async def process_news_batches(articles):
+    """
+    Batch mode: categorize up to MAX_BATCH_SIZE articles at once and publish
+    them with pipelined sends. stream.take_events() acks the batch once this
+    loop body finishes, even if it raises, so publish_batch() blocks until
+    every send is acknowledged rather than giving up.
+    """
+    async for batch in articles.take_events(MAX_BATCH_SIZE, within=BATCH_WITHIN_SECONDS):
+        started = time.monotonic()
+        for event in batch:
+            worker_metrics.observe_consumed(event.message)
+        processed = await process_batch([(event, event.value) for event in batch])
+        processed_at = time.time()
+        for event, _ in processed:
+            worker_metrics.observe_processed(event.message.timestamp, processed_at)
+
+        # Blocks until the broker acks every record, holding back this batch's offsets
+        send_started = time.perf_counter()
+        dropped = set(await publish_batch([(event.key, record) for event, record in processed]))
+        if dropped:
+            batch_stats.errors += len(dropped)
+            processed = [item for i, item in enumerate(processed) if i not in dropped]
+        worker_metrics.observe_stage('send', time.perf_counter() - send_started)
+        acked_at = time.time()
+        for event, _ in processed:
+            worker_metrics.observe_acked(event.message.timestamp, acked_at)
+        for _, record in processed:
+            await emit_trending(record)
+
+        latency_ms = (time.monotonic() - started) * 1000
+        batch_stats.record(len(batch), len(processed), latency_ms)
+        logger.info(
+            f"✓ Batch: {len(batch)} articles | "
+            f"Published: {len(processed)} | "
+            f"Latency: {latency_ms:.1f} ms"
+        )
+
+
+def record_ack(produced_at: Optional[float], fut):
+    """Send callback: end-to-end latency until processed-news acknowledged the record"""
+    worker_metrics.observe_acked(produced_at, time.time())
+
+
+@app.task
+async def declare_topics():
+    """Create the topics this worker writes to, unless they already exist"""
+    topics = [input_topic, output_topic, trending_topic]
+    if MONGO_SINK_ENABLED:
+        topics.append(stored_topic)
+    for topic in topics:
+        await topic.maybe_declare()
+
+
+@app.agent(input_topic, concurrency=PROCESSING_CONCURRENCY)
 async def process_news(articles):
     """
     Main processing agent that consumes from news-articles
-    and produces to processed-news.
+    and produces to processed-news. Records keep the input key (the
+    canonical URL set by the producers) so downstream consumers can use it.
     """
-    async for article in articles:
+    if BATCH_MODE:
+        await process_news_batches(articles)
+        return
+
+    async for key, article in articles.items():
         try:
-            logger.info(f"Processing: {article.title[:50]}...")
+            message = articles.current_event.message
+            worker_metrics.observe_consumed(message)
+
+            # Only build log messages that will actually be emitted
+            log_info = logger.isEnabledFor(logging.INFO)
+            if log_info:
+                logger.info(f"Processing: {article.title[:50]}...")
             
             # Apply filters
-            if not should_process_article(article):
-                logger.info(f"Skipped (low score): {article.title[:50]}")
+            started = time.perf_counter()
+            keep = should_process_article(article)
+            filtered = time.perf_counter()
+            worker_metrics.observe_stage('filter', filtered - started)
+            if not keep:
+                if log_info:
+                    logger.info(f"Skipped (low score): {article.title[:50]}")
                 continue
             
             # Categorize
             categories, keywords, relevance = categorize_article(article)
+            worker_metrics.observe_stage('categorize', time.perf_counter() - filtered)
             
             # Only process if at least one category matched
             if not categories:
-                logger.info(f"No categories matched: {article.title[:50]}")
+                if log_info:
+                    logger.info(f"No categories matched: {article.title[:50]}")
                 continue
             
             # Create processed article
-            processed = ProcessedArticle(
-                # Original fields
-                source=article.source,
-                title=article.title,
-                url=article.url,
-                timestamp=article.timestamp,
-                score=article.score,
-                author=article.author,
-                comments=article.comments,
-                story_id=article.story_id,
-                subreddit=article.subreddit,
-                post_id=article.post_id,
-                is_self_post=article.is_self_post,
-                published=article.published,
-                summary=article.summary,
-                # Processing metadata
-                categories=categories,
-                matched_keywords=keywords,
-                processed_at=datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-                relevance_score=relevance
-            )
+            processed = build_processed_article(article, categories, keywords, relevance)
+            worker_metrics.observe_processed(message.timestamp, time.time())
             
-            # Send to output topic
-            await output_topic.send(value=processed)
-            
-            logger.info(
-                f"✓ Processed: {article.title[:50]} | "
-                f"Categories: {', '.join(categories)} | "
-                f"Relevance: {relevance}"
+            # Send to output topic; the callback runs when the broker acks
+            send_started = time.perf_counter()
+            await output_topic.send(
+                key=key, value=processed,
+                callback=partial(record_ack, message.timestamp)
             )
+            worker_metrics.observe_stage('send', time.perf_counter() - send_started)
+            await emit_trending(processed)
+            
+            if log_info:
+                logger.info(
+                    f"✓ Processed: {article.title[:50]} | "
+                    f"Categories: {', '.join(categories)} | "
+                    f"Relevance: {relevance}"
+                )
             
         except Exception as e:
             logger.error(f"Error processing article: {e}", exc_info=True)
 
 
-@app.timer(interval=60.0)
+def article_id(key: Any, article: ProcessedArticle) -> str:
+    """Canonical URL from the message key, or the raw URL for unkeyed messages"""
+    if isinstance(key, bytes):
+        key = key.decode('utf-8')
+    return key or article.url
+
+
+async def write_batch_to_mongo(documents: List[Tuple[str, Dict[str, Any]]]):
+    """
+    Retry a bulk upsert until it succeeds. take_events() acks a batch even
+    when the loop body raises, so giving up here would commit offsets for
+    articles that were never stored. Blocking instead holds back this agent
+    (and its offsets) until MongoDB is reachable again. MongoSink.write()
+    raises only for transient failures; documents MongoDB rejects outright
+    are skipped there, so they can't stall the sink.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await mongo_sink.write(documents)
+        except Exception as e:
+            attempt += 1
+            delay = min(2 ** attempt, 60)
+            logger.warning(f"MongoDB bulk write failed (attempt {attempt}), retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+
+
+async def announce_stored(records: List[ProcessedArticle]):
+    """
+    Tell the read API which categories and sources a written batch touched.
+    Sent only after the bulk write, so a query that misses the cache after
+    the invalidation sees the new articles. Best effort: a lost message
+    leaves those cache entries to their TTL.
+    """
+    categories = sorted({category for record in records for category in record.categories})
+    sources = sorted({record.source for record in records if record.source})
+    try:
+        await stored_topic.send(
+            value=StoredArticles(categories=categories, sources=sources, count=len(records))
+        )
+    except Exception as e:
+        logger.warning(f"Could not announce {len(records)} stored records: {e}")
+
+
+async def store_processed_news(records):
+    """
+    Sink agent: buffers processed-news records and upserts them into MongoDB
+    in bulk, up to MONGO_BATCH_SIZE at a time or every MONGO_FLUSH_INTERVAL
+    seconds. Offsets are acked only after the write succeeds, so delivery is
+    at-least-once and replays are absorbed by the upserts.
+    """
+    async for batch in records.take_events(MONGO_BATCH_SIZE, within=MONGO_FLUSH_INTERVAL):
+        started = time.monotonic()
+        documents = [(article_id(event.key, event.value), to_document(event.value)) for event in batch]
+        result = await write_batch_to_mongo(documents)
+        await announce_stored([event.value for event in batch])
+
+        logger.info(
+            f"✓ Stored: {len(batch)} records | "
+            f"Upserted: {result.upserted_count if result else 0} | "
+            f"Modified: {result.modified_count if result else 0} | "
+            f"Latency: {(time.monotonic() - started) * 1000:.1f} ms"
+        )
+
+
+mongo_sink = None
+if MONGO_SINK_ENABLED:
+    mongo_sink = app.service(
+        MongoSink(MONGO_URI, MONGO_DATABASE, MONGO_COLLECTION, pool_size=MONGO_POOL_SIZE)
+    )
+    app.agent(output_topic)(store_processed_news)
+
+
+async def count_trending(events):
+    """
+    Count each key in every window size. O(1) per event: one increment per
+    table, applied to the TRENDING_HOPS hopping windows the event falls in.
+    """
+    async for key, _ in events.items():
+        for table in trending_tables.values():
+            table[key] += 1
+
+
+def current_trending(window: str) -> Dict[str, List[Dict]]:
+    """Top trending categories, keywords and sources in `window` against its baseline"""
+    table = trending_tables[window]
+    baseline_table = trending_tables[BASELINES[window]]
+    # The oldest open window of each size, scored by how long it has been open:
+    # between (1 - 1 / TRENDING_HOPS) and all of its size
+    span, baseline_span = live_window(table), live_window(baseline_table)
+    now = table.get_timestamp()
+    rows = ((key, table[key][span], baseline_table[key][baseline_span]) for key in table.keys())
+    return top_trending(rows, window, top_n=TRENDING_TOP_N, min_count=TRENDING_MIN_COUNT,
+                        window_seconds=now - span[0], baseline_seconds=now - baseline_span[0])
+
+
+async def publish_trending():
+    """Publish the current top trending topics of every scored window"""
+    computed_at = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    for window, baseline in BASELINES.items():
+        for dimension, entries in current_trending(window).items():
+            for entry in entries:
+                await trending_topic.send(
+                    key=f"{dimension}:{entry['name']}|{window}",
+                    value=TrendingTopic(
+                        dimension=dimension,
+                        name=entry['name'],
+                        window=window,
+                        count=entry['count'],
+                        baseline_window=baseline,
+                        baseline_count=entry['baseline_count'],
+                        score=entry['score'],
+                        computed_at=computed_at
+                    )
+                )
+
+
+async def get_trending(web, request):
+    """Trending topics for ?window=5m|1h (default: all scored windows)"""
+    window = request.query.get('window')
+    if window is not None and window not in BASELINES:
+        return web.json({'error': f"window must be one of {', '.join(BASELINES)}"}, status=400)
+    windows = [window] if window else list(BASELINES)
+    return web.json({name: current_trending(name) for name in windows})
+
+
+if TRENDING_ENABLED:
+    app.agent(trending_events_topic)(count_trending)
+    app.timer(interval=TRENDING_PUBLISH_INTERVAL)(publish_trending)
+    app.page('/trending/')(get_trending)
+
+
 async def print_stats():
     """Print processing stats every minute"""
     logger.info("=" * 50)
     logger.info("Faust worker is running and processing news articles...")
     logger.info(f"Input topic: {INPUT_TOPIC}")
     logger.info(f"Output topic: {OUTPUT_TOPIC}")
-    logger.info(f"Categories: {len(CATEGORIES)}")
+    logger.info(f"Categories: {len(keyword_matcher.categories)} (taxonomy v{keyword_matcher.version})")
+    if BATCH_MODE:
+        logger.info(f"Batch stats: {batch_stats.as_dict()}")
+    if mongo_sink is not None:
+        logger.info(f"MongoDB sink stats: {mongo_sink.stats()}")
+    if trending_tables:
+        for dimension, entries in current_trending('5m').items():
+            top = ', '.join(f"{entry['name']} ({entry['count']}, score {entry['score']})" for entry in entries[:3])
+            logger.info(f"Trending {dimension}s (5m): {top or '-'}")
     logger.info("=" * 50)
 
 
-@app.command()
-async def show_categories():
-    """Show configured categories and keywords"""
-    print("\n=== Configured Categories ===\n")
-    for category, keywords in CATEGORIES.items():
+def consumer_lag() -> Dict[Tuple[str, int], int]:
+    """Per-partition news-articles lag of this worker (empty until it has an assignment)"""
+    try:
+        return worker_metrics.lag(app.consumer, INPUT_TOPIC, app.monitor.tp_committed_offsets)
+    except Exception as e:
+        # The consumer is not started yet, or partitions are being rebalanced
+        logger.debug(f"Consumer lag unavailable: {e}")
+        return {}
+
+
+async def log_metrics_summary():
+    """Log end-to-end latency, stage timings and consumer lag"""
+    worker_metrics.log_summary(consumer_lag())
+    if BATCH_MODE:
+        logger.info(f"Batch stats: {batch_stats.as_dict()}")
+    if mongo_sink is not None:
+        logger.info(f"MongoDB sink stats: {mongo_sink.stats()}")
+
+
+if METRICS_SUMMARY_INTERVAL > 0:
+    app.timer(interval=METRICS_SUMMARY_INTERVAL)(log_metrics_summary)
+else:
+    app.timer(interval=60.0)(print_stats)
+
+
+@app.page('/metrics/')
+async def get_metrics(web, request):
+    """Latency histograms and consumer lag: Prometheus text, or ?format=json"""
+    lag = consumer_lag()
+    if request.query.get('format') == 'json':
+        return web.json(worker_metrics.as_dict(lag))
+    return web.text(worker_metrics.render_prometheus(lag), content_type='text/plain; version=0.0.4')
+
+
+@app.page('/batch-stats/')
+async def get_batch_stats(web, request):
+    """Per-batch size and latency figures for batch mode"""
+    return web.json(batch_stats.as_dict())
+
+
+def print_taxonomy(categories: Dict[str, List[str]]):
+    for category, keywords in categories.items():
         print(f"{category}:")
         print(f"  Keywords: {', '.join(keywords[:5])}{'...' if len(keywords) > 5 else ''}")
         print(f"  Total: {len(keywords)} keywords\n")
 
 
+@app.command()
+async def show_categories():
+    """Show the live categories and keywords from the category-config topic"""
+    categories = read_taxonomy(KAFKA_BOOTSTRAP_SERVERS, CATEGORY_CONFIG_TOPIC)
+    if categories:
+        print(f"\n=== Configured Categories ({CATEGORY_CONFIG_TOPIC}) ===\n")
+        print_taxonomy(categories)
+    else:
+        print(f"\n=== Default Categories ({CATEGORY_CONFIG_TOPIC} is empty) ===\n")
+        print_taxonomy(CATEGORIES)
+
+
+@app.command(
+    option('--file', type=str, default=None,
+           help='JSON object of category -> keyword list (default: CATEGORIES in faust_config.py)'),
+)
+async def publish_categories(self, file: Optional[str]):
+    """Replace the live taxonomy; running workers pick it up without a restart"""
+    if file:
+        with open(file) as f:
+            categories = build_taxonomy(json.load(f).items())
+    else:
+        categories = CATEGORIES
+
+    current = read_taxonomy(KAFKA_BOOTSTRAP_SERVERS, CATEGORY_CONFIG_TOPIC)
+    await self.app.maybe_start_producer()
+    for category, keywords in categories.items():
+        if current.get(category) != keywords:
+            await category_config_topic.send(key=category, value=keywords)
+    # Tombstones, so compaction eventually drops removed categories
+    for category in current.keys() - categories.keys():
+        await self.app.producer.send(
+            CATEGORY_CONFIG_TOPIC, key=category.encode('utf-8'), value=None,
+            partition=None, timestamp=None, headers=None
+        )
+    await self.app.producer.flush()
+
+    removed = len(current.keys() - categories.keys())
+    changed = sum(current.get(category) != keywords for category, keywords in categories.items())
+    print(f"Published {changed} changed and {removed} removed categories to {CATEGORY_CONFIG_TOPIC}")
+
+
 if __name__ == '__main__':
     app.main()
\ No newline at end of file
@@ -0,0 +1,250 @@
+import math
+from collections import Counter
+from functools import lru_cache
+from itertools import repeat
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from keyword_matcher import KeywordMatch
+
+try:
+    import numpy as np
+except ImportError:  # Optional: without NumPy batches are scored one article at a time
+    np = None
+
+# Keys of the collection totals in the document-frequency statistics, next to
+# one key per lowercased keyword
+DOCUMENTS_KEY = '__documents__'
+TOKENS_KEY = '__tokens__'
+
+
+@lru_cache(maxsize=65536)
+def parse_published(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of an RSS (RFC 822) or Atom / producer (ISO 8601) date, or None"""
+    if not value:
+        return None
+    try:
+        if value[:4].isdigit():
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        else:
+            parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def age_hours(article: Any) -> float:
+    """
+    How old an article was when its producer fetched it: from `published`
+    (an RSS entry's date, or a Hacker News / Reddit post's creation time) to
+    the message `timestamp`. Relative to the fetch rather than to now, so
+    replays and backfills score an article the same way. Messages without
+    `published`, such as HN / Reddit history from older producers, count as
+    fresh.
+    """
+    if not article.published:
+        return 0.0
+    published = parse_published(article.published)
+    fetched = parse_published(article.timestamp)
+    if published is None or fetched is None:
+        return 0.0
+    return max(fetched - published, 0.0) / 3600
+
+
+class RelevanceScorer:
+    """
+    BM25 relevance of an article to the categories it matched, weighted by
+    the source's engagement signals and decayed by age.
+
+    A category's score is the sum of the BM25 weights of its keywords found
+    in the article's title and summary; the article's relevance is its best
+    category's score, times 1 + engagement_weight * log(1 + score +
+    comment_weight * comments), times 0.5 ** (age / half_life_hours).
+
+    Document frequencies are incremental: observe() counts each article into
+    the local statistics and into a pending delta, which the worker publishes
+    to a table shared by all workers and reads back with load(). `taxonomy`
+    (a LiveKeywordMatcher) says which categories each keyword belongs to.
+    """
+
+    def __init__(self, taxonomy, k1: float = 1.2, b: float = 0.75, engagement_weight: float = 0.1,
+                 comment_weight: float = 2.0, half_life_hours: float = 24.0):
+        self.taxonomy = taxonomy
+        self.k1 = k1
+        self.b = b
+        self.engagement_weight = engagement_weight
+        self.comment_weight = comment_weight
+        self.half_life_hours = half_life_hours
+
+        self.documents = 0
+        self.tokens = 0
+        self.document_frequency: Dict[str, int] = {}
+        self.pending: Counter = Counter()
+
+        # Lowercased keyword -> its categories, rebuilt when the taxonomy changes
+        self._taxonomy_version = None
+        self._keyword_categories: Dict[str, List[str]] = {}
+        # Vocabulary, keyword x category membership and idf arrays for score_batch()
+        self._vocabulary: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._membership = None
+        self._idf = None
+        self._stats_version = 0
+        self._idf_version = -1
+
+    def observe(self, matches: Iterable[KeywordMatch]):
+        """Count articles into the statistics (and the pending delta), before scoring them"""
+        counts: Counter = Counter()
+        documents = tokens = 0
+        for match in matches:
+            documents += 1
+            tokens += match.length
+            counts.update(match.term_counts.keys())
+        if not documents:
+            return
+
+        frequency = self.document_frequency
+        for key, count in counts.items():
+            frequency[key] = frequency.get(key, 0) + count
+        counts[DOCUMENTS_KEY] = documents
+        counts[TOKENS_KEY] = tokens
+        self.pending.update(counts)
+        self.documents += documents
+        self.tokens += tokens
+        self._stats_version += 1
+
+    def take_pending(self) -> Dict[str, int]:
+        """Counts observed since the last call, to publish to the shared statistics"""
+        pending, self.pending = self.pending, Counter()
+        return dict(pending)
+
+    def load(self, items: Iterable[Tuple[str, int]]):
+        """Replace the statistics with the shared ones, plus what is still pending here"""
+        frequency = dict(items)
+        for key, count in self.pending.items():
+            frequency[key] = frequency.get(key, 0) + count
+        self.documents = frequency.pop(DOCUMENTS_KEY, 0)
+        self.tokens = frequency.pop(TOKENS_KEY, 0)
+        self.document_frequency = frequency
+        self._stats_version += 1
+
+    def idf(self, key: str) -> float:
+        frequency = self.document_frequency.get(key, 0)
+        documents = max(self.documents, frequency)
+        return math.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+
+    def _average_length(self, fallback: float) -> float:
+        return self.tokens / self.documents if self.documents else max(fallback, 1.0)
+
+    def _refresh_taxonomy(self):
+        if self.taxonomy.version == self._taxonomy_version:
+            return
+        keyword_categories: Dict[str, List[str]] = {}
+        for category, keywords in self.taxonomy.categories.items():
+            for keyword in keywords:
+                owners = keyword_categories.setdefault(keyword.lower(), [])
+                if category not in owners:
+                    owners.append(category)
+        self._keyword_categories = keyword_categories
+        self._vocabulary = list(keyword_categories)
+        self._index = {key: i for i, key in enumerate(self._vocabulary)}
+        self._membership = None
+        self._idf_version = -1
+        self._taxonomy_version = self.taxonomy.version
+
+    def signal(self, article: Any) -> float:
+        """Engagement boost times age decay"""
+        engagement = max(article.score or 0, 0) + self.comment_weight * max(article.comments or 0, 0)
+        boost = 1 + self.engagement_weight * math.log1p(engagement)
+        age = age_hours(article)
+        return boost * 0.5 ** (age / self.half_life_hours) if age else boost
+
+    def category_scores(self, match: KeywordMatch) -> Dict[str, float]:
+        """BM25 score of the article for each category it matched"""
+        self._refresh_taxonomy()
+        k1 = self.k1
+        norm = k1 * (1 - self.b + self.b * match.length / self._average_length(match.length))
+        scores: Dict[str, float] = {}
+        for key, tf in match.term_counts.items():
+            weight = self.idf(key) * tf * (k1 + 1) / (tf + norm)
+            for category in self._keyword_categories.get(key, ()):
+                scores[category] = scores.get(category, 0.0) + weight
+        return scores
+
+    def score(self, article: Any, match: KeywordMatch) -> float:
+        """Relevance of one article, in pure Python (the per-message path of the worker)"""
+        if not match.categories:
+            return 0.0
+        best = max(self.category_scores(match).values(), default=0.0)
+        return round(best * self.signal(article), 4)
+
+    def score_batch(self, articles: Sequence[Any], matches: Sequence[KeywordMatch]) -> List[float]:
+        """
+        Relevance of a batch of articles, vectorized with NumPy: the matched
+        terms form a sparse keyword x article matrix of BM25 weights, which is
+        summed per category through a keyword x category membership matrix.
+        """
+        if np is None:
+            return [self.score(article, match) for article, match in zip(articles, matches)]
+
+        self._refresh_taxonomy()
+        count = len(matches)
+        scored = [j for j, match in enumerate(matches) if match.categories]
+        if not scored:
+            return [0.0] * count
+
+        # Matched terms as (keyword, article, tf) triplets, article by article
+        keys = [key for j in scored for key in matches[j].term_counts]
+        row = np.array(list(map(self._index.get, keys, repeat(-1))), dtype=np.intp)
+        col = np.repeat(np.array(scored, dtype=np.intp), [len(matches[j].term_counts) for j in scored])
+        tf = np.array([tf for j in scored for tf in matches[j].term_counts.values()], dtype=np.float64)
+        # Keywords the taxonomy dropped since the article was matched
+        known = row >= 0
+        if not known.all():
+            row, col, tf = row[known], col[known], tf[known]
+            if not len(row):
+                return [0.0] * count
+
+        membership, idf = self._arrays()
+        lengths = np.fromiter((match.length for match in matches), dtype=np.float64, count=count)
+
+        k1 = self.k1
+        norm = k1 * (1 - self.b + self.b * lengths / self._average_length(lengths.mean()))
+        weights = idf[row] * tf * (k1 + 1) / (tf + norm[col])
+
+        # Entries are grouped by article, so each article's rows are one reduceat segment
+        starts = np.flatnonzero(np.r_[True, col[1:] != col[:-1]])
+        per_category = np.add.reduceat(weights[:, None] * membership[row], starts, axis=0)
+        best = np.zeros(count)
+        best[col[starts]] = per_category.max(axis=1)
+
+        return np.round(best * self._signals(articles), 4).tolist()
+
+    def _arrays(self):
+        """Membership and idf arrays for the current taxonomy and statistics"""
+        if self._membership is None:
+            categories = {category: i for i, category in enumerate(self.taxonomy.categories)}
+            membership = np.zeros((len(self._index), len(categories)))
+            for key, i in self._index.items():
+                for category in self._keyword_categories[key]:
+                    membership[i, categories[category]] = 1.0
+            self._membership = membership
+
+        if self._idf_version != self._stats_version:
+            vocabulary = self._vocabulary
+            df = np.array(list(map(self.document_frequency.get, vocabulary, repeat(0))), dtype=np.float64)
+            documents = np.maximum(self.documents, df)
+            self._idf = np.log1p((documents - df + 0.5) / (df + 0.5))
+            self._idf_version = self._stats_version
+        return self._membership, self._idf
+
+    def _signals(self, articles: Sequence[Any]):
+        count = len(articles)
+        scores = np.fromiter((article.score or 0 for article in articles), dtype=np.float64, count=count)
+        comments = np.fromiter((article.comments or 0 for article in articles), dtype=np.float64, count=count)
+        engagement = np.maximum(scores, 0) + self.comment_weight * np.maximum(comments, 0)
+        ages = np.fromiter((age_hours(article) for article in articles), dtype=np.float64, count=count)
+        return (1 + self.engagement_weight * np.log1p(engagement)) * 0.5 ** (ages / self.half_life_hours)
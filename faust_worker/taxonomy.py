@@ -0,0 +1,111 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from confluent_kafka import Consumer, TopicPartition
+
+from keyword_matcher import KeywordMatch, KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class LiveKeywordMatcher:
+    """
+    KeywordMatcher whose taxonomy can change while the worker runs.
+
+    A new index is built on a thread and swapped in with a single attribute
+    assignment, so match() never waits for a rebuild and never sees a
+    half-built index. `version` counts the swaps, which lets the categorizer
+    pool processes tell when their own copy is out of date.
+    """
+
+    def __init__(self, default_categories: Dict[str, List[str]]):
+        self.default_categories = default_categories
+        self.matcher = KeywordMatcher(default_categories)
+        self.version = 0
+
+    @property
+    def categories(self) -> Dict[str, List[str]]:
+        return self.matcher.categories
+
+    def match(self, text: str) -> Tuple[List[str], List[str], float]:
+        return self.matcher.match(text)
+
+    def match_terms(self, text: str) -> KeywordMatch:
+        return self.matcher.match_terms(text)
+
+    async def reload(self, categories: Dict[str, List[str]]) -> bool:
+        """
+        Switch to `categories` (the defaults if empty). Returns False when
+        the taxonomy is unchanged and nothing was rebuilt.
+        """
+        categories = categories or self.default_categories
+        if categories == self.matcher.categories:
+            return False
+
+        loop = asyncio.get_running_loop()
+        self.matcher = await loop.run_in_executor(None, KeywordMatcher, categories)
+        self.version += 1
+        return True
+
+
+def parse_keywords(category: str, value: Any) -> Optional[List[str]]:
+    """Keyword list from a category-config value, or None for deleted or malformed entries"""
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(keyword, str) for keyword in value):
+        logger.warning(f"Ignoring category {category!r}: expected a list of keywords, got {value!r}")
+        return None
+    return value
+
+
+def build_taxonomy(items: Iterable[Tuple[str, Any]]) -> Dict[str, List[str]]:
+    """Taxonomy from (category, keywords) pairs, e.g. the category-config table"""
+    taxonomy = {}
+    for category, value in items:
+        keywords = parse_keywords(category, value)
+        if keywords:
+            taxonomy[category] = keywords
+    return taxonomy
+
+
+def read_taxonomy(bootstrap_servers: str, topic: str, timeout: float = 10.0) -> Dict[str, List[str]]:
+    """
+    Read the category-config topic from the beginning up to its current end,
+    outside of a worker. Keys are category names, values JSON keyword lists;
+    a null value deletes the category.
+    """
+    consumer = Consumer({
+        'bootstrap.servers': bootstrap_servers,
+        'group.id': f'{topic}-reader',
+        'enable.auto.commit': False,
+    })
+    try:
+        metadata = consumer.list_topics(topic, timeout=timeout).topics[topic]
+        if metadata.error is not None:
+            return {}
+
+        values: Dict[str, Any] = {}
+        for partition in metadata.partitions:
+            low, high = consumer.get_watermark_offsets(TopicPartition(topic, partition), timeout=timeout)
+            if high <= low:
+                continue
+            consumer.assign([TopicPartition(topic, partition, low)])
+            position = low
+            while position < high:
+                msg = consumer.poll(timeout)
+                if msg is None:
+                    raise TimeoutError(f"Timed out reading {topic} at offset {position}")
+                if msg.error():
+                    raise RuntimeError(f"Error reading {topic}: {msg.error()}")
+                category = msg.key().decode('utf-8')
+                if msg.value() is None:
+                    values.pop(category, None)
+                else:
+                    values[category] = json.loads(msg.value())
+                position = msg.offset() + 1
+
+        return build_taxonomy(values.items())
+    finally:
+        consumer.close()
@@ -0,0 +1,69 @@
+import math
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Window name -> size in seconds
+WINDOWS = {'5m': 300, '1h': 3600, '24h': 86400}
+
+# Each window is scored against the rate in the next longer window
+BASELINES = {'5m': '1h', '1h': '24h'}
+
+DIMENSIONS = ('category', 'keyword', 'source')
+
+
+def dimension_keys(categories: Iterable[str], keywords: Iterable[str], source: str) -> List[str]:
+    """Table keys an article counts towards, e.g. 'category:AI' or 'keyword:rust'"""
+    keys = [f"category:{category}" for category in categories]
+    keys += [f"keyword:{keyword}" for keyword in keywords]
+    keys.append(f"source:{source}")
+    return keys
+
+
+def split_key(key: str) -> Tuple[str, str]:
+    dimension, _, name = key.partition(':')
+    return dimension, name
+
+
+def trending_score(count: int, baseline_count: int, window_seconds: float,
+                   baseline_seconds: float) -> float:
+    """
+    How far a window's count is above what the baseline rate predicts, in
+    (Poisson) standard deviations. A topic that keeps its usual pace scores
+    about 0; a burst scores high even for topics that are usually quiet.
+    The seconds are how much time each count covers, which for a hopping
+    window still filling up is less than its size.
+    """
+    expected = baseline_count * window_seconds / max(baseline_seconds, 1.0)
+    return (count - expected) / math.sqrt(expected + 1)
+
+
+def top_trending(rows: Iterable[Tuple[str, int, int]], window: str, top_n: int = 10,
+                 min_count: int = 3, window_seconds: Optional[float] = None,
+                 baseline_seconds: Optional[float] = None) -> Dict[str, List[Dict]]:
+    """
+    Rank (key, count, baseline_count) rows per dimension by trending score.
+    Rows with fewer than `min_count` articles in the window are skipped as noise.
+    `window_seconds` / `baseline_seconds` are the time the counts cover,
+    the full window sizes by default.
+    """
+    baseline = BASELINES[window]
+    window_seconds = window_seconds or WINDOWS[window]
+    baseline_seconds = baseline_seconds or WINDOWS[baseline]
+    ranked: Dict[str, List[Tuple[float, str, int, int]]] = {dimension: [] for dimension in DIMENSIONS}
+    for key, count, baseline_count in rows:
+        if count < min_count:
+            continue
+        dimension, name = split_key(key)
+        if dimension not in ranked:
+            continue
+        score = trending_score(count, baseline_count, window_seconds, baseline_seconds)
+        ranked[dimension].append((score, name, count, baseline_count))
+
+    return {
+        dimension: [
+            {'name': name, 'count': count, 'baseline_count': baseline_count, 'score': round(score, 3)}
+            for score, name, count, baseline_count in heapq.nlargest(top_n, entries)
+        ]
+        for dimension, entries in ranked.items()
+    }
+
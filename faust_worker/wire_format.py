@@ -0,0 +1,91 @@
+"""
+Compact binary wire format for news-articles and processed-news.
+
+A message is a 3-byte header followed by a msgpack array of field values in
+schema order:
+
+    0xC1 | schema id | schema version | msgpack [value, value, ..., {extras}]
+
+Field names are never sent. Trailing None values are dropped, and fields not
+in the schema travel in a final map, so nothing is lost. 0xC1 is a byte
+msgpack never uses and JSON can't start with, so decode() tells the two
+formats apart and JSON messages keep working during a rollout.
+
+Schema evolution: fields are only ever appended, each change is a new
+version, and every version stays in SCHEMAS, so readers decode messages
+written with any earlier version.
+"""
+import json
+from typing import Any, Dict, Tuple
+
+import msgpack
+
+MAGIC = 0xC1
+
+NEWS_ARTICLE = 1
+PROCESSED_ARTICLE = 2
+
+_ARTICLE_FIELDS_V1 = (
+    'source', 'title', 'url', 'timestamp',
+    'score', 'author', 'comments', 'story_id', 'subreddit', 'post_id',
+    'is_self_post', 'published', 'summary',
+)
+
+# (schema id, version) -> field names in wire order
+SCHEMAS: Dict[Tuple[int, int], Tuple[str, ...]] = {
+    (NEWS_ARTICLE, 1): _ARTICLE_FIELDS_V1,
+    (PROCESSED_ARTICLE, 1): _ARTICLE_FIELDS_V1 + (
+        'categories', 'matched_keywords', 'processed_at', 'relevance_score', 'cluster_id',
+    ),
+}
+
+_FIELD_SETS = {key: frozenset(fields) | {'__faust'} for key, fields in SCHEMAS.items()}
+
+# Version written for each schema
+CURRENT_VERSIONS = {NEWS_ARTICLE: 1, PROCESSED_ARTICLE: 1}
+
+# Faust record namespace -> schema id
+SCHEMA_BY_MODEL = {'NewsArticle': NEWS_ARTICLE, 'ProcessedArticle': PROCESSED_ARTICLE}
+
+
+class WireFormatError(ValueError):
+    """Raised for messages with an unknown schema or version"""
+
+
+def encode(message: Dict[str, Any], schema: int) -> bytes:
+    version = CURRENT_VERSIONS[schema]
+    fields = SCHEMAS[(schema, version)]
+    known = _FIELD_SETS[(schema, version)]
+
+    get = message.get
+    values = [get(field) for field in fields]
+    while values and values[-1] is None:
+        values.pop()
+
+    extras = {key: value for key, value in message.items() if key not in known and value is not None}
+    if extras:
+        values += [None] * (len(fields) - len(values))
+        values.append(extras)
+
+    return bytes((MAGIC, schema, version)) + msgpack.packb(values, use_bin_type=True)
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """Decode a binary message, or a legacy JSON one"""
+    if not data or data[0] != MAGIC:
+        return json.loads(data)
+
+    fields = SCHEMAS.get((data[1], data[2]))
+    if fields is None:
+        raise WireFormatError(f"Unknown schema {data[1]} version {data[2]}")
+
+    values = msgpack.unpackb(data[3:], raw=False)
+    message = {}
+    if len(values) > len(fields):
+        message.update(values.pop())
+    message.update((field, value) for field, value in zip(fields, values) if value is not None)
+    return message
+
+
+def encode_news_article(message: Dict[str, Any]) -> bytes:
+    return encode(message, NEWS_ARTICLE)
@@ -0,0 +1,180 @@
+import time
+import logging
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# End-to-end latency bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Per-stage timing bucket upper bounds, in seconds (a stage is microseconds
+# per article, or milliseconds for a whole batch)
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+STAGES = ('deserialize', 'filter', 'categorize', 'send')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: the upper bound of the bucket holding it"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+    def render(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else bound
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class WorkerMetrics:
+    """
+    Latency and lag instrumentation for the Faust worker.
+
+    End-to-end latency runs from the Kafka timestamp of the news-articles
+    message (stamped by the producer client at produce time, in milliseconds,
+    unlike the whole-second `timestamp` field) to the moment the worker built
+    the processed record, and to the moment the broker acknowledged it on
+    processed-news. Producer and worker clocks are assumed to be in sync;
+    negative differences count as zero.
+
+    Consumer lag is the partition's high watermark minus the next offset the
+    worker will process, computed when metrics are read rather than per message.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.produced_to_processed = Histogram(LATENCY_BUCKETS)
+        self.produced_to_acked = Histogram(LATENCY_BUCKETS)
+        self.stages = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+        self.consumed = 0
+        self.published = 0
+        self.next_offsets: Dict[Tuple[str, int], int] = {}
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stages[stage].observe(seconds)
+
+    def observe_consumed(self, message: Any):
+        """Record the offset of a news-articles message the worker has taken"""
+        self.consumed += 1
+        self.next_offsets[(message.topic, message.partition)] = message.offset + 1
+
+    def observe_processed(self, produced_at: Optional[float], now: float):
+        if produced_at:
+            self.produced_to_processed.observe(max(now - produced_at, 0.0))
+
+    def observe_acked(self, produced_at: Optional[float], now: float):
+        self.published += 1
+        if produced_at:
+            self.produced_to_acked.observe(max(now - produced_at, 0.0))
+
+    def lag(self, consumer: Any, topic: str, committed: Dict[Any, int]) -> Dict[Tuple[str, int], int]:
+        """
+        Messages behind the high watermark for each assigned `topic` partition.
+        Partitions this worker hasn't processed anything from yet fall back to
+        the committed offset.
+        """
+        lag = {}
+        for tp in consumer.assignment():
+            if tp.topic != topic:
+                continue
+            highwater = consumer.highwater(tp)
+            position = self.next_offsets.get((tp.topic, tp.partition), committed.get(tp))
+            if highwater is None or position is None:
+                continue
+            lag[(tp.topic, tp.partition)] = max(highwater - position, 0)
+        return lag
+
+    def as_dict(self, lag: Dict[Tuple[str, int], int]) -> Dict[str, Any]:
+        return {
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'consumed': self.consumed,
+            'published': self.published,
+            'latency_seconds': {
+                'produced_to_processed': self.produced_to_processed.summary(),
+                'produced_to_acked': self.produced_to_acked.summary(),
+            },
+            'stage_seconds': {stage: histogram.summary() for stage, histogram in self.stages.items()},
+            'consumer_lag': {f"{topic}[{partition}]": value for (topic, partition), value in sorted(lag.items())},
+            'total_lag': sum(lag.values()),
+        }
+
+    def render_prometheus(self, lag: Dict[Tuple[str, int], int]) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = [
+            "# TYPE news_worker_articles_consumed_total counter",
+            f"news_worker_articles_consumed_total {self.consumed}",
+            "# TYPE news_worker_articles_published_total counter",
+            f"news_worker_articles_published_total {self.published}",
+        ]
+
+        lines.append("# TYPE news_worker_end_to_end_latency_seconds histogram")
+        lines += self.produced_to_processed.render('news_worker_end_to_end_latency_seconds', 'until="processed"')
+        lines += self.produced_to_acked.render('news_worker_end_to_end_latency_seconds', 'until="acked"')
+
+        lines.append("# TYPE news_worker_stage_seconds histogram")
+        for stage, histogram in self.stages.items():
+            lines += histogram.render('news_worker_stage_seconds', f'stage="{stage}"')
+
+        lines.append("# TYPE news_worker_consumer_lag gauge")
+        for (topic, partition), value in sorted(lag.items()):
+            lines.append(f'news_worker_consumer_lag{{topic="{topic}",partition="{partition}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def log_summary(self, lag: Dict[Tuple[str, int], int]):
+        processed = self.produced_to_processed
+        acked = self.produced_to_acked
+        stages = ', '.join(
+            f"{stage} p50<={histogram.quantile(0.5) * 1000:g}ms p99<={histogram.quantile(0.99) * 1000:g}ms"
+            for stage, histogram in self.stages.items() if histogram.count
+        )
+        behind = ', '.join(f"{partition}:{value}" for (_, partition), value in sorted(lag.items()))
+        logger.info(
+            f"Worker stats: {self.consumed} consumed, {self.published} published | "
+            f"end-to-end processed p50<={processed.quantile(0.5)}s p99<={processed.quantile(0.99)}s, "
+            f"acked p50<={acked.quantile(0.5)}s p99<={acked.quantile(0.99)}s"
+        )
+        logger.info(f"Stage timings: {stages or '-'}")
+        logger.info(f"Consumer lag: {sum(lag.values())} total ({behind or 'no partitions assigned'})")
+
+
+# Process-wide instance, shared by the codec (deserialize timings) and the agents
+worker_metrics = WorkerMetrics()
@@ -8,21 +8,124 @@ load_dotenv()
 KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092')
 KAFKA_TOPIC = os.getenv('KAFKA_TOPIC', 'news-articles')
 
+# Producer profiles: librdkafka settings layered over the connection settings
+PRODUCER_PROFILES = {
+    # Every message fully replicated before it counts as sent
+    'durable': {
+        'acks': 'all',  # Wait for all replicas to acknowledge
+        'retries': 3,
+        'compression.type': 'gzip'
+    },
+    # Large, briefly delayed batches with cheap compression; idempotence keeps
+    # retries from duplicating or reordering messages
+    'throughput': {
+        'acks': 'all',
+        'enable.idempotence': True,
+        'linger.ms': 50,
+        'batch.size': 1048576,
+        'batch.num.messages': 10000,
+        'compression.type': 'zstd',
+        'queue.buffering.max.messages': 500000
+    }
+}
+PRODUCER_PROFILE = os.getenv('PRODUCER_PROFILE', 'durable')
+
 # Producer configuration
 PRODUCER_CONFIG = {
     'bootstrap.servers': KAFKA_BOOTSTRAP_SERVERS,
     'client.id': 'news-producer',
-    'acks': 'all',  # Wait for all replicas to acknowledge
-    'retries': 3,
-    'compression.type': 'gzip'
+    **PRODUCER_PROFILES[PRODUCER_PROFILE]
 }
 
+# Message serializer: 'json' (stdlib), the optional 'orjson' / 'msgspec', or
+# 'binary' (schema-based msgpack, see faust_worker/wire_format.py). Switch to
+# 'binary' only once the Faust worker in use reads the binary format.
+PRODUCER_SERIALIZER = os.getenv(
+    'PRODUCER_SERIALIZER', 'orjson' if PRODUCER_PROFILE == 'throughput' else 'json'
+)
+
+# How messages are spread over news-articles partitions (see partitioner.py):
+# 'story' puts near-duplicate copies of a story together with probability
+# equal to their title similarity (copies split across partitions are not
+# clustered together), 'host' keeps each site together, 'key' hashes the
+# canonical URL (librdkafka's default)
+PARTITION_STRATEGY = os.getenv('PARTITION_STRATEGY', 'story')
+
+# Cross-cycle deduplication of (source, canonical URL) before producing
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() == 'true'
+DEDUP_CAPACITY = int(os.getenv('DEDUP_CAPACITY', 200000))  # URLs per generation
+DEDUP_ERROR_RATE = float(os.getenv('DEDUP_ERROR_RATE', 0.001))  # False-positive rate per generation
+DEDUP_ROTATION_HOURS = float(os.getenv('DEDUP_ROTATION_HOURS', 24))
+DEDUP_GENERATIONS = int(os.getenv('DEDUP_GENERATIONS', 7))  # URLs are remembered ~6-7 days
+DEDUP_STATE_PATH = os.getenv('DEDUP_STATE_PATH', 'dedup_state.bin')
+
+# Durable spool: messages librdkafka can't take (queue full) or couldn't
+# deliver are appended to segment files under SPOOL_PATH and produced again,
+# in order, once the broker keeps up (empty SPOOL_PATH = no spool, such
+# messages are dropped)
+SPOOL_PATH = os.getenv('SPOOL_PATH', 'producer_spool')
+SPOOL_SEGMENT_BYTES = int(os.getenv('SPOOL_SEGMENT_BYTES', 64 * 1024 ** 2))
+SPOOL_MAX_BYTES = int(os.getenv('SPOOL_MAX_BYTES', 1024 ** 3))  # Messages are dropped once the spool holds this much
+SPOOL_FSYNC_INTERVAL = float(os.getenv('SPOOL_FSYNC_INTERVAL', 1.0))  # Seconds between fsyncs, 0 = every message
+SPOOL_DRAIN_BATCH = int(os.getenv('SPOOL_DRAIN_BATCH', 1000))  # Messages produced from the spool per batch
+SPOOL_RETRY_DELAY = float(os.getenv('SPOOL_RETRY_DELAY', 1.0))  # First retry after a failed batch, doubled per failure
+
+# Producer metrics (periodic summaries instead of per-message logs)
+METRICS_LOG_INTERVAL = float(os.getenv('METRICS_LOG_INTERVAL', 60))  # Seconds between summaries
+METRICS_POLL_EVERY = int(os.getenv('METRICS_POLL_EVERY', 50))  # Messages between producer.poll(0) calls
+METRICS_PROMETHEUS_PORT = int(os.getenv('METRICS_PROMETHEUS_PORT', 0))  # 0 = no /metrics endpoint
+METRICS_STATSD_HOST = os.getenv('METRICS_STATSD_HOST', '')  # Empty = no statsd export
+METRICS_STATSD_PORT = int(os.getenv('METRICS_STATSD_PORT', 8125))
+
 # API endpoints
 HACKER_NEWS_TOP_STORIES_URL = 'https://hacker-news.firebaseio.com/v0/topstories.json'
 HACKER_NEWS_ITEM_URL = 'https://hacker-news.firebaseio.com/v0/item/{}.json'
 
+# Hacker News async fetching
+HN_CONCURRENCY = int(os.getenv('HN_CONCURRENCY', 20))  # Max in-flight item requests
+HN_RATE_LIMIT = float(os.getenv('HN_RATE_LIMIT', 50))  # Requests per second
+HN_MAX_RETRIES = int(os.getenv('HN_MAX_RETRIES', 3))
+HN_RETRY_BACKOFF = float(os.getenv('HN_RETRY_BACKOFF', 0.5))  # Seconds, doubled per attempt
+
+# Hacker News incremental ingestion (empty HN_STATE_PATH = fetch and emit everything)
+HACKER_NEWS_UPDATES_URL = 'https://hacker-news.firebaseio.com/v0/updates.json'
+HN_STATE_PATH = os.getenv('HN_STATE_PATH', 'hn_state.db')
+HN_REFETCH_TTL = int(os.getenv('HN_REFETCH_TTL', 900))  # Seconds before a seen story is re-fetched
+HN_MIN_SCORE_DELTA = int(os.getenv('HN_MIN_SCORE_DELTA', 10))  # Score change that triggers a re-emit
+HN_MIN_COMMENTS_DELTA = int(os.getenv('HN_MIN_COMMENTS_DELTA', 10))  # Comment change that triggers a re-emit
+HN_STATE_RETENTION = int(os.getenv('HN_STATE_RETENTION', 7 * 24 * 3600))  # Forget stories unseen this long
+HN_USE_UPDATES = os.getenv('HN_USE_UPDATES', 'true').lower() == 'true'  # Re-fetch items in updates.json early
+
 # Reddit (no auth required for public feeds)
 REDDIT_SUBREDDIT_URL = 'https://www.reddit.com/r/{}/hot.json?limit={}'
+REDDIT_NEW_URL = 'https://www.reddit.com/r/{}/new.json'  # {} = sub1+sub2+... (a multireddit)
+REDDIT_MULTI_SIZE = int(os.getenv('REDDIT_MULTI_SIZE', 50))  # Subreddits combined per request
+REDDIT_PAGE_LIMIT = int(os.getenv('REDDIT_PAGE_LIMIT', 100))  # Posts per page (Reddit's maximum)
+REDDIT_MAX_PAGES = int(os.getenv('REDDIT_MAX_PAGES', 10))  # Pages followed per run before giving up on the watermark
+REDDIT_MIN_INTERVAL = float(os.getenv('REDDIT_MIN_INTERVAL', 1.0))  # Seconds between requests, at least
+REDDIT_STATE_PATH = os.getenv('REDDIT_STATE_PATH', 'reddit_state.json')  # Newest post seen per multireddit
+
+# RSS polling
+RSS_MAX_WORKERS = int(os.getenv('RSS_MAX_WORKERS', 16))  # Feeds fetched in parallel
+RSS_CACHE_PATH = os.getenv('RSS_CACHE_PATH', 'rss_cache.json')  # ETag/Last-Modified per feed
+RSS_STREAMING = os.getenv('RSS_STREAMING', 'true').lower() == 'true'  # Streaming parser, feedparser only for malformed feeds
+RSS_CHUNK_SIZE = int(os.getenv('RSS_CHUNK_SIZE', 65536))  # Bytes read from the response at a time
+RSS_SUMMARY_LENGTH = int(os.getenv('RSS_SUMMARY_LENGTH', 200))  # Summaries are truncated to this many characters
+
+# Scheduler (`python -m producers.run_all_producers --continuous`): every
+# feed and every group of up to REDDIT_MULTI_SIZE subreddits is its own
+# source, polled on its own interval
+HN_POLL_INTERVAL = float(os.getenv('HN_POLL_INTERVAL', 120))  # Seconds between runs
+HN_STORY_LIMIT = int(os.getenv('HN_STORY_LIMIT', 15))  # Top stories per run
+REDDIT_POLL_INTERVAL = float(os.getenv('REDDIT_POLL_INTERVAL', 300))
+REDDIT_SUBREDDITS = [s for s in os.getenv('REDDIT_SUBREDDITS', 'technology,programming,worldnews').split(',') if s]
+RSS_POLL_INTERVAL = float(os.getenv('RSS_POLL_INTERVAL', 600))
+RSS_RATE_LIMIT = float(os.getenv('RSS_RATE_LIMIT', 2))  # Feed fetches per second, across all feeds
+SCHEDULE_JITTER = float(os.getenv('SCHEDULE_JITTER', 0.1))  # Intervals vary by +/- this fraction
+SCHEDULE_RETRY_DELAY = float(os.getenv('SCHEDULE_RETRY_DELAY', 30))  # First retry after a failed run, doubled per failure
+SCHEDULE_MAX_BACKOFF = float(os.getenv('SCHEDULE_MAX_BACKOFF', 1800))
+SCHEDULE_WORKERS = int(os.getenv('SCHEDULE_WORKERS', 8))  # Threads for blocking (requests/feedparser) sources
+SCHEDULE_DRAIN_TIMEOUT = float(os.getenv('SCHEDULE_DRAIN_TIMEOUT', 30))  # Seconds to let running sources finish on shutdown
 
 # RSS Feeds (examples)
 RSS_FEEDS = [
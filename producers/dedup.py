@@ -0,0 +1,191 @@
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'ref_url', 'cmpid', 'smid', 'ncid'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so the same article compares equal across cycles:
+    http/https and www. are folded together, the host is lowercased, default
+    ports, fragments, tracking parameters and trailing slashes are dropped, and
+    the remaining query parameters are sorted.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip('/')
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for `capacity` items at `error_rate`"""
+
+    def __init__(self, capacity, error_rate, bits=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+class RotatingBloomFilter:
+    """
+    Time-decaying set membership built from a ring of Bloom filters.
+
+    New items go into the newest generation; lookups check every generation.
+    Every `rotation_seconds` the oldest generation is dropped and a fresh one
+    started, so an item is remembered for between (generations - 1) and
+    `generations` rotation periods and memory stays constant.
+    """
+
+    def __init__(self, capacity, error_rate, rotation_seconds, generations, path=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rotation_seconds = rotation_seconds
+        self.generations = generations
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        # Producers running on several threads share one filter
+        self._lock = threading.RLock()
+
+        self._filters = []  # (created_at, BloomFilter), oldest first
+        if path and os.path.exists(path):
+            self._load()
+        if not self._filters:
+            self._filters.append((time.time(), BloomFilter(capacity, error_rate)))
+
+    @property
+    def effective_error_rate(self):
+        """False-positive rate across all generations combined"""
+        return 1 - (1 - self.error_rate) ** len(self._filters)
+
+    @property
+    def memory_bytes(self):
+        return sum(len(bloom.bits) for _, bloom in self._filters)
+
+    def _rotate_if_due(self):
+        created_at, current = self._filters[-1]
+        now = time.time()
+        # Also rotate early if the current generation is full, to hold the error rate
+        if now - created_at >= self.rotation_seconds or current.count >= self.capacity:
+            self._filters.append((now, BloomFilter(self.capacity, self.error_rate)))
+            del self._filters[:-self.generations]
+            self.save()
+
+    def check_and_add(self, item):
+        """Return True if `item` was (probably) seen before; otherwise remember it"""
+        with self._lock:
+            self._rotate_if_due()
+
+            if any(item in bloom for _, bloom in self._filters):
+                self.hits += 1
+                return True
+
+            self._filters[-1][1].add(item)
+            self.misses += 1
+            return False
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'generations': len(self._filters),
+            'configured_error_rate': self.error_rate,
+            'effective_error_rate': round(self.effective_error_rate, 6),
+            'memory_bytes': self.memory_bytes,
+        }
+
+    def save(self):
+        """Persist all generations: a JSON header line followed by the raw bit arrays"""
+        if not self.path:
+            return
+        with self._lock:
+            header = {
+                'capacity': self.capacity,
+                'error_rate': self.error_rate,
+                'filters': [(created_at, bloom.count) for created_at, bloom in self._filters],
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                for _, bloom in self._filters:
+                    f.write(bloom.bits)
+            os.replace(tmp_path, self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header['capacity'] != self.capacity or header['error_rate'] != self.error_rate:
+                    logger.warning("Dedup filter settings changed, starting with an empty filter")
+                    return
+
+                size = len(BloomFilter(self.capacity, self.error_rate).bits)
+                for created_at, count in header['filters']:
+                    bits = f.read(size)
+                    if len(bits) != size:
+                        raise ValueError("truncated filter data")
+                    bloom = BloomFilter(self.capacity, self.error_rate, bytearray(bits))
+                    bloom.count = count
+                    self._filters.append((created_at, bloom))
+                del self._filters[:-self.generations]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable dedup state {self.path}: {e}")
+            self._filters = []
@@ -0,0 +1,75 @@
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCache:
+    """
+    Per-feed ETag / Last-Modified validators, persisted as JSON.
+
+    Sent back as If-None-Match / If-Modified-Since so unchanged feeds answer
+    304 Not Modified and are neither downloaded nor parsed again. Also keeps
+    the id of each feed's newest entry, where the streaming parser stops.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False  # Changed since the last save
+
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable feed cache {path}: {e}")
+
+    def get(self, feed_url):
+        """Return (etag, modified) for a feed, either may be None"""
+        with self._lock:
+            entry = self._entries.get(feed_url, {})
+        return entry.get('etag'), entry.get('modified')
+
+    def update(self, feed_url, etag=None, modified=None):
+        """Remember the validators returned with a feed's latest full response"""
+        self._set(feed_url, etag=etag, modified=modified)
+
+    def get_last_seen(self, feed_url):
+        """Id of the newest entry in the feed's last full response, or None"""
+        with self._lock:
+            return self._entries.get(feed_url, {}).get('last_seen')
+
+    def set_last_seen(self, feed_url, entry_id):
+        self._set(feed_url, last_seen=entry_id)
+
+    def _set(self, feed_url, **values):
+        with self._lock:
+            entry = {**self._entries.get(feed_url, {}), **values}
+            entry = {key: value for key, value in entry.items() if value}
+            if entry != self._entries.get(feed_url, {}):
+                self._dirty = True
+            if entry:
+                self._entries[feed_url] = entry
+            else:
+                self._entries.pop(feed_url, None)
+
+    def save(self):
+        """
+        Write the cache to disk atomically, if it changed since the last save.
+        The lock is held through the write, so concurrent saves from several
+        threads don't share the temporary file.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
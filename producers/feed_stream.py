@@ -0,0 +1,126 @@
+"""
+Streaming RSS / Atom parser.
+
+Feeds are parsed incrementally as chunks of the HTTP body arrive, with
+xml.etree's pull parser. Only the fields the producer sends are kept
+(title, link, published, author, summary), and each entry's elements are
+dropped as soon as it has been read, so memory stays bounded however large
+the document is. Parsing stops at the first entry seen in the previous
+fetch, and the rest of the body is never downloaded.
+
+Anything expat rejects (HTML entities such as &nbsp;, broken markup, a
+wrong encoding) raises xml.etree.ElementTree.ParseError, and the caller
+falls back to feedparser.
+"""
+from xml.etree.ElementTree import XMLPullParser
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+DC = '{http://purl.org/dc/elements/1.1/}'
+CONTENT = '{http://purl.org/rss/1.0/modules/content/}'
+
+# RSS 1.0 puts its elements in a namespace, so RSS tags are matched by
+# local name (see _local)
+_ENTRY_TAGS = {'item', ATOM + 'entry'}
+_FEED_TAGS = {'channel', ATOM + 'feed'}
+_TITLE_TAGS = {'title', ATOM + 'title'}
+
+# Entry field -> candidate child tags, in order of preference
+_FIELDS = {
+    'title': ('title', ATOM + 'title'),
+    'published': ('pubDate', ATOM + 'published'),
+    'author': ('author', DC + 'creator', ATOM + 'author'),
+    'summary': ('description', ATOM + 'summary', CONTENT + 'encoded', ATOM + 'content'),
+    'id': ('guid', ATOM + 'id'),
+}
+
+
+def _local(tag):
+    """RSS tags without their namespace (RSS 1.0 has one); Atom and module tags keep theirs"""
+    if tag.startswith('{') and not tag.startswith((ATOM, DC, CONTENT)):
+        return tag.rpartition('}')[2]
+    return tag
+
+
+def _text(element):
+    """Text of an element, including any child elements (Atom xhtml content)"""
+    if len(element):
+        return ''.join(element.itertext()).strip()
+    return (element.text or '').strip()
+
+
+def _atom_link(entry):
+    for link in entry.findall(ATOM + 'link'):
+        if link.get('rel', 'alternate') == 'alternate' and link.get('href'):
+            return link.get('href')
+    return None
+
+
+def _read_entry(entry, summary_length):
+    """Fields of one <item> / <entry> as a feedparser-style dict (missing fields left out)"""
+    children = {}
+    for child in entry:
+        children.setdefault(_local(child.tag), child)
+
+    fields = {}
+    for field, tags in _FIELDS.items():
+        for tag in tags:
+            child = children.get(tag)
+            if child is not None and tag == ATOM + 'author':
+                child = child.find(ATOM + 'name')
+            text = _text(child) if child is not None else ''
+            if text:
+                fields[field] = text
+                break
+
+    link = children.get('link')
+    link = _text(link) if link is not None else _atom_link(entry)
+    if link:
+        fields['link'] = link
+
+    if 'summary' in fields:
+        fields['summary'] = fields['summary'][:summary_length]
+    fields['id'] = fields.get('id') or fields.get('link')
+    return fields
+
+
+def parse_feed_stream(chunks, last_seen=None, summary_length=200):
+    """
+    Parse a feed from an iterable of byte chunks.
+
+    Returns (feed_title, entries, newest_id): entries in document order up to,
+    not including, the one whose id (guid/id, else link) is `last_seen`, and
+    the id of the first entry in the document (or None if it has none).
+    Stops reading `chunks` as soon as that entry is reached.
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    stack = []
+    feed_title = None
+    entries = []
+    newest_id = None
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                stack.append(element)
+                continue
+
+            stack.pop()
+            tag = element.tag
+            if _local(tag) in _ENTRY_TAGS:
+                entry = _read_entry(element, summary_length)
+                if newest_id is None:
+                    newest_id = entry.get('id')
+                if last_seen is not None and entry.get('id') == last_seen:
+                    return feed_title or 'Unknown Feed', entries, newest_id
+                entries.append(entry)
+                # Drop the entry's elements so the tree never grows past one entry
+                if stack:
+                    stack[-1].remove(element)
+                element.clear()
+            elif feed_title is None and _local(tag) in _TITLE_TAGS and stack \
+                    and _local(stack[-1].tag) in _FEED_TAGS:
+                feed_title = _text(element) or None
+
+    parser.close()
+    return feed_title or 'Unknown Feed', entries, newest_id
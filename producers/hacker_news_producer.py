@@ -1,25 +1,62 @@
 import time
+import random
+import asyncio
+import aiohttp
 import requests
 import logging
-from .kafka_producer import NewsProducer
-from .config import HACKER_NEWS_TOP_STORIES_URL, HACKER_NEWS_ITEM_URL
+from .kafka_producer import NewsProducer, SourceError, format_epoch
+from .rate_limiter import TokenBucket
+from .state_store import StoryStateStore
+from .config import (
+    HACKER_NEWS_TOP_STORIES_URL,
+    HACKER_NEWS_ITEM_URL,
+    HACKER_NEWS_UPDATES_URL,
+    HN_STATE_PATH,
+    HN_REFETCH_TTL,
+    HN_MIN_SCORE_DELTA,
+    HN_MIN_COMMENTS_DELTA,
+    HN_STATE_RETENTION,
+    HN_USE_UPDATES,
+    HN_CONCURRENCY,
+    HN_RATE_LIMIT,
+    HN_MAX_RETRIES,
+    HN_RETRY_BACKOFF
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Status codes worth retrying (rate limited or transient server errors)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
 
 class HackerNewsProducer(NewsProducer):
     """Producer for Hacker News articles"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, top_stories_url=HACKER_NEWS_TOP_STORIES_URL,
+                 item_url=HACKER_NEWS_ITEM_URL, updates_url=HACKER_NEWS_UPDATES_URL,
+                 state_path=HN_STATE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.top_stories_url = top_stories_url
+        self.item_url = item_url
+        self.updates_url = updates_url if HN_USE_UPDATES else None
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': 'News-Aggregator-Bot/1.0'})
+        
+        # Remembers what was already fetched/sent so each cycle is incremental
+        self.state_store = None
+        if state_path:
+            self.state_store = StoryStateStore(
+                state_path,
+                ttl=HN_REFETCH_TTL,
+                min_score_delta=HN_MIN_SCORE_DELTA,
+                min_comments_delta=HN_MIN_COMMENTS_DELTA
+            )
     
     def fetch_story(self, story_id):
         """Fetch a single story by ID"""
         try:
-            url = HACKER_NEWS_ITEM_URL.format(story_id)
+            url = self.item_url.format(story_id)
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             return response.json()
@@ -30,7 +67,7 @@ class HackerNewsProducer(NewsProducer):
     def fetch_top_stories(self, limit=10):
         """Fetch top stories from Hacker News"""
         try:
-            response = self.session.get(HACKER_NEWS_TOP_STORIES_URL, timeout=10)
+            response = self.session.get(self.top_stories_url, timeout=10)
             response.raise_for_status()
             story_ids = response.json()[:limit]
             
@@ -40,35 +77,162 @@ class HackerNewsProducer(NewsProducer):
             logger.error(f"Error fetching top stories: {e}")
             return []
     
+    def fetch_updated_ids(self):
+        """Fetch IDs of items HN reports as recently changed"""
+        if not self.updates_url or self.state_store is None:
+            return []
+        try:
+            response = self.session.get(self.updates_url, timeout=10)
+            response.raise_for_status()
+            return response.json().get('items', [])
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching updates: {e}")
+            return []
+    
+    def select_story_ids(self, story_ids, updated_ids=()):
+        """Keep only the IDs worth fetching this cycle: new, stale past the TTL, or recently updated"""
+        if self.state_store is None:
+            return story_ids
+        
+        selected = self.state_store.stale_ids(story_ids, force=updated_ids)
+        logger.info(f"{len(selected)} of {len(story_ids)} stories are new, stale or updated")
+        return selected
+    
+    def finish_cycle(self):
+        """Persist state at the end of a produce cycle and forget long-gone stories"""
+        if self.state_store is not None:
+            self.state_store.prune(HN_STATE_RETENTION)
+            self.state_store.commit()
+    
+    def produce_story(self, story_id, story):
+        """Send a fetched story to Kafka; returns True if it was produced"""
+        if not story:
+            return False
+        
+        if story.get('type') != 'story':
+            if self.state_store is not None:
+                self.state_store.touch(story_id)
+            return False
+        
+        # Skip stories whose score and comments have not moved enough since the last send
+        if self.state_store is not None and not self.state_store.observe(
+            story_id, story.get('score', 0), story.get('descendants', 0)
+        ):
+            return False
+        
+        # Create message
+        message = self.create_message(
+            source="Hacker News",
+            title=story.get('title', 'No title'),
+            url=story.get('url', f"https://news.ycombinator.com/item?id={story_id}"),
+            score=story.get('score', 0),
+            author=story.get('by', 'unknown'),
+            comments=story.get('descendants', 0),
+            story_id=story_id,
+            published=format_epoch(story.get('time'))
+        )
+        
+        # Send to Kafka. With a state store, score/comment updates are meant to be re-sent
+        return self.send_message(message, dedupe=self.state_store is None)
+    
     def produce_stories(self, limit=10):
         """Fetch and produce top stories to Kafka"""
         story_ids = self.fetch_top_stories(limit)
+        story_ids = self.select_story_ids(story_ids, self.fetch_updated_ids())
         
         produced_count = 0
         for story_id in story_ids:
             story = self.fetch_story(story_id)
             
-            if story and story.get('type') == 'story':
-                # Create message
-                message = self.create_message(
-                    source="Hacker News",
-                    title=story.get('title', 'No title'),
-                    url=story.get('url', f"https://news.ycombinator.com/item?id={story_id}"),
-                    score=story.get('score', 0),
-                    author=story.get('by', 'unknown'),
-                    comments=story.get('descendants', 0),
-                    story_id=story_id
-                )
-                
-                # Send to Kafka
-                self.send_message(message)
+            if self.produce_story(story_id, story):
                 produced_count += 1
                 
                 # Be nice to the API
                 time.sleep(0.1)
         
+        self.finish_cycle()
         logger.info(f"Produced {produced_count} Hacker News stories")
         return produced_count
+    
+    # --- Async mode ---
+    
+    async def fetch_json_async(self, session, url, rate_limiter):
+        """GET a JSON document with rate limiting and retries with exponential backoff"""
+        for attempt in range(HN_MAX_RETRIES + 1):
+            await rate_limiter.acquire()
+            try:
+                async with session.get(url) as response:
+                    if response.status not in RETRYABLE_STATUS:
+                        response.raise_for_status()
+                        return await response.json()
+                    error = f"HTTP {response.status}"
+            except aiohttp.ClientResponseError as e:
+                # Non-retryable HTTP error (e.g. 404)
+                logger.error(f"Error fetching {url}: {e}")
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            
+            if attempt < HN_MAX_RETRIES:
+                # Exponential backoff with jitter so retries don't arrive in lockstep
+                await asyncio.sleep(HN_RETRY_BACKOFF * (2 ** attempt) * (1 + random.random()))
+        
+        logger.error(f"Error fetching {url} after {HN_MAX_RETRIES + 1} attempts: {error}")
+        return None
+    
+    async def fetch_story_async(self, session, story_id, semaphore, rate_limiter):
+        """Fetch a single story by ID, bounded by the concurrency semaphore"""
+        async with semaphore:
+            return await self.fetch_json_async(session, self.item_url.format(story_id), rate_limiter)
+    
+    async def produce_stories_async(self, limit=10, concurrency=HN_CONCURRENCY, rate_limit=HN_RATE_LIMIT):
+        """Fetch top stories concurrently over a pooled keep-alive session and produce them to Kafka"""
+        semaphore = asyncio.Semaphore(concurrency)
+        rate_limiter = TokenBucket(rate_limit)
+        connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers={'User-Agent': 'News-Aggregator-Bot/1.0'}
+        ) as session:
+            story_ids = await self.fetch_json_async(session, self.top_stories_url, rate_limiter)
+            if story_ids is None:
+                raise SourceError(f"Could not fetch {self.top_stories_url}")
+            story_ids = story_ids[:limit]
+            logger.info(f"Fetched {len(story_ids)} top story IDs")
+            
+            updated_ids = []
+            if self.updates_url and self.state_store is not None:
+                updates = await self.fetch_json_async(session, self.updates_url, rate_limiter)
+                updated_ids = (updates or {}).get('items', [])
+            story_ids = self.select_story_ids(story_ids, updated_ids)
+            
+            stories = await asyncio.gather(*[
+                self.fetch_story_async(session, story_id, semaphore, rate_limiter)
+                for story_id in story_ids
+            ])
+        
+        # Produce in ranking order
+        produced_count = sum(
+            self.produce_story(story_id, story)
+            for story_id, story in zip(story_ids, stories)
+        )
+        
+        self.finish_cycle()
+        logger.info(f"Produced {produced_count} Hacker News stories")
+        return produced_count
+    
+    def produce_stories_concurrent(self, limit=10, concurrency=HN_CONCURRENCY, rate_limit=HN_RATE_LIMIT):
+        """Blocking wrapper around produce_stories_async"""
+        return asyncio.run(self.produce_stories_async(limit, concurrency, rate_limit))
+    
+    def close(self):
+        """Close the producer and the story state store"""
+        super().close()
+        if self.state_store is not None:
+            self.state_store.close()
 
 
 def main():
@@ -79,7 +243,7 @@ def main():
         logger.info("Starting Hacker News producer...")
         
         # Fetch and produce top 20 stories
-        producer.produce_stories(limit=20)
+        producer.produce_stories_concurrent(limit=20)
         
     except KeyboardInterrupt:
         logger.info("Interrupted by user")
@@ -90,4 +254,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
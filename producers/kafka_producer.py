@@ -1,8 +1,34 @@
-import json
 import logging
 from datetime import datetime
 from confluent_kafka import Producer
-from .config import PRODUCER_CONFIG, KAFKA_TOPIC
+from .dedup import RotatingBloomFilter, canonicalize_url
+from .partitioner import Partitioner
+from .metrics import ProducerMetrics, StatsdExporter, start_prometheus_server
+from .serializers import get_serializer
+from .spool import Spool, SpoolDrainer, is_permanent
+from .config import (
+    PRODUCER_CONFIG,
+    PRODUCER_SERIALIZER,
+    KAFKA_TOPIC,
+    DEDUP_ENABLED,
+    DEDUP_CAPACITY,
+    DEDUP_ERROR_RATE,
+    DEDUP_ROTATION_HOURS,
+    DEDUP_GENERATIONS,
+    DEDUP_STATE_PATH,
+    SPOOL_PATH,
+    SPOOL_SEGMENT_BYTES,
+    SPOOL_MAX_BYTES,
+    SPOOL_FSYNC_INTERVAL,
+    SPOOL_DRAIN_BATCH,
+    SPOOL_RETRY_DELAY,
+    PARTITION_STRATEGY,
+    METRICS_LOG_INTERVAL,
+    METRICS_POLL_EVERY,
+    METRICS_PROMETHEUS_PORT,
+    METRICS_STATSD_HOST,
+    METRICS_STATSD_PORT
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -10,25 +36,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_metrics = None
+
+
+def get_metrics():
+    """Process-wide producer metrics, with exporters started on first use"""
+    global _metrics
+    if _metrics is None:
+        _metrics = ProducerMetrics(log_interval=METRICS_LOG_INTERVAL)
+        if METRICS_PROMETHEUS_PORT:
+            start_prometheus_server(_metrics, METRICS_PROMETHEUS_PORT)
+        if METRICS_STATSD_HOST:
+            _metrics.exporters.append(StatsdExporter(METRICS_STATSD_HOST, METRICS_STATSD_PORT))
+    return _metrics
+
+
+def format_epoch(seconds):
+    """UTC timestamp string, in the format of `timestamp`, for a Unix time (None if missing)"""
+    if not seconds:
+        return None
+    return datetime.utcfromtimestamp(seconds).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SourceError(Exception):
+    """Raised when a source could not be fetched at all"""
+
 
 class NewsProducer:
     """Base class for producing news messages to Kafka"""
     
-    def __init__(self, topic=KAFKA_TOPIC):
+    def __init__(self, topic=KAFKA_TOPIC, producer=None, serializer=PRODUCER_SERIALIZER, shared=None,
+                 spool_path=SPOOL_PATH):
         self.topic = topic
-        self.producer = Producer(PRODUCER_CONFIG)
+        self.serialize = get_serializer(serializer)
+        self.metrics = get_metrics()
+        self._unpolled = 0
+        
+        # Another NewsProducer whose Kafka client, dedup filter and spool this
+        # one reuses; that one flushes and saves them when it is closed
+        self.shared = shared
+        if shared is not None:
+            self.producer = shared.producer
+            self.partitioner = shared.partitioner
+            self.dedup = shared.dedup
+            self.spool = shared.spool
+            return
+        
+        # An existing client (or a stand-in for benchmarks) can be passed in
+        self.producer = producer if producer is not None else Producer(PRODUCER_CONFIG)
+        self.partitioner = Partitioner(PARTITION_STRATEGY, self._partition_count)
+        
+        # Remembers recently produced URLs so repeated cycles don't re-publish them
+        self.dedup = None
+        if DEDUP_ENABLED:
+            self.dedup = RotatingBloomFilter(
+                capacity=DEDUP_CAPACITY,
+                error_rate=DEDUP_ERROR_RATE,
+                rotation_seconds=DEDUP_ROTATION_HOURS * 3600,
+                generations=DEDUP_GENERATIONS,
+                path=DEDUP_STATE_PATH
+            )
+        
+        # Messages Kafka can't take right now wait on disk, and are produced
+        # again in order by a background thread
+        self.spool = None
+        self.drainer = None
+        if spool_path:
+            self.spool = Spool(spool_path, SPOOL_SEGMENT_BYTES, SPOOL_MAX_BYTES, SPOOL_FSYNC_INTERVAL)
+            self.drainer = SpoolDrainer(
+                self.spool, self.producer, self.metrics,
+                batch_size=SPOOL_DRAIN_BATCH, retry_delay=SPOOL_RETRY_DELAY
+            )
+            self.drainer.start()
         logger.info(f"Kafka producer initialized for topic: {self.topic}")
     
     def delivery_callback(self, err, msg):
         """Callback function called when a message is delivered or fails"""
-        if err:
+        self.metrics.on_delivery(err, msg)
+        if err and self.spool is not None and not is_permanent(err):
+            # The partition is None if librdkafka never assigned one
+            partition = msg.partition()
+            self._spool(msg.topic(), partition if partition is not None else -1, msg.key(), msg.value())
+        elif err:
             logger.error(f"Message delivery failed: {err}")
-        else:
-            logger.info(
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
                 f"Message delivered to {msg.topic()} "
                 f"[partition {msg.partition()}] at offset {msg.offset()}"
             )
     
+    def _partition_count(self):
+        metadata = self.producer.list_topics(self.topic, timeout=5)
+        return len(metadata.topics[self.topic].partitions)
+    
     def create_message(self, source, title, url, **kwargs):
         """Create a standardized news message"""
         message = {
@@ -40,35 +140,109 @@ class NewsProducer:
         }
         return message
     
-    def send_message(self, message):
-        """Send a message to Kafka"""
+    def send_message(self, message, dedupe=True):
+        """
+        Send a message to Kafka.
+        
+        Returns False if the message was dropped as a duplicate of one already
+        produced for the same source, or could not be sent.
+        """
         try:
-            # Convert message to JSON
-            message_json = json.dumps(message)
+            canonical_url = canonicalize_url(message['url'])
+            
+            if dedupe and self.dedup is not None:
+                if self.dedup.check_and_add(f"{message['source']}|{canonical_url}"):
+                    self.metrics.on_duplicate()
+                    return False
+            
+            # Convert message to JSON bytes
+            value = self.serialize(message)
+            
+            # -1 leaves the choice to librdkafka, which hashes the key
+            partition = self.partitioner.partition(message, canonical_url)
+            partition = partition if partition is not None else -1
+            key = canonical_url.encode('utf-8')  # Article id for the worker and MongoDB
+            
+            # Nothing overtakes messages still waiting in the spool
+            if self.spool is not None and self.spool.depth:
+                return self._spool(self.topic, partition, key, value)
             
             # Produce to Kafka
-            self.producer.produce(
-                topic=self.topic,
-                value=message_json.encode('utf-8'),
-                key=message['url'].encode('utf-8'),  # Use URL as key for deduplication
-                callback=self.delivery_callback
-            )
+            try:
+                self.producer.produce(
+                    topic=self.topic,
+                    value=value,
+                    key=key,
+                    partition=partition,
+                    callback=self.delivery_callback
+                )
+            except BufferError:
+                # librdkafka's local queue is full
+                if self.spool is None:
+                    raise
+                return self._spool(self.topic, partition, key, value)
+            self.metrics.on_produce(len(value))
             
-            # Trigger callbacks (non-blocking)
-            self.producer.poll(0)
+            # Serve delivery callbacks (non-blocking) every few messages rather than every one
+            self._unpolled += 1
+            if self._unpolled >= METRICS_POLL_EVERY:
+                self.poll()
+            return True
             
         except Exception as e:
+            self.metrics.on_send_error()
             logger.error(f"Error sending message: {e}")
+            return False
+    
+    def _spool(self, topic, partition, key, value):
+        """Append a message to the spool; returns False if it is full and the message was dropped"""
+        if self.spool.append(topic, partition, key, value):
+            self.metrics.on_spooled()
+            return True
+        self.metrics.on_send_error()
+        logger.error(f"Spool is full ({self.spool.size / 1024 ** 2:.0f} MiB), dropping message")
+        return False
+    
+    def poll(self):
+        """Serve pending delivery callbacks and report queue and spool depth"""
+        self.producer.poll(0)
+        self._unpolled = 0
+        self.metrics.set_queue_depth(len(self.producer))
+        if self.spool is not None:
+            self.metrics.set_spool_depth(self.spool.depth)
+        self.metrics.maybe_log_summary()
     
     def flush(self):
-        """Wait for all messages to be delivered"""
+        """Wait for all messages to be delivered, spooling what still isn't after 10 seconds"""
         remaining = self.producer.flush(timeout=10)
+        if remaining > 0 and self.spool is not None:
+            # Purged messages fail with _PURGE_QUEUE/_PURGE_INFLIGHT and their
+            # delivery callbacks append them to the spool
+            self.producer.purge()
+            self.producer.poll(0)
+            remaining = len(self.producer)
+        self.metrics.set_queue_depth(remaining)
+        if self.spool is not None:
+            self.metrics.set_spool_depth(self.spool.depth)
         if remaining > 0:
             logger.warning(f"{remaining} messages were not delivered")
+        elif self.spool is not None and self.spool.depth:
+            logger.warning(f"{self.spool.depth} messages are waiting in the spool for the next run")
         else:
             logger.info("All messages delivered successfully")
+        self.metrics.maybe_log_summary(force=True)
     
     def close(self):
         """Close the producer"""
+        if self.shared is not None:
+            return
+        if self.drainer is not None:
+            self.drainer.stop()
         self.flush()
+        if self.drainer is not None:
+            self.drainer.join(timeout=10)
+            self.spool.close()
+        if self.dedup is not None:
+            self.dedup.save()
+            logger.info(f"Dedup stats: {self.dedup.stats()}")
         logger.info("Producer closed")
\ No newline at end of file
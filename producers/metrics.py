@@ -0,0 +1,243 @@
+import time
+import socket
+import logging
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Delivery latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Approximate quantile: the upper bound of the bucket holding it. A
+        quantile in the +Inf bucket is clamped to the last finite bound, so
+        logs and statsd get a number (a lower bound in that case).
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+
+class ProducerMetrics:
+    """
+    Process-wide producer instrumentation: counters, a delivery latency
+    histogram, per-partition throughput and queue depth. Summaries are logged
+    periodically instead of one line per message, and can be exported as
+    Prometheus text or pushed to statsd.
+    """
+
+    def __init__(self, log_interval=60.0):
+        self.log_interval = log_interval
+        self.produced = 0
+        self.delivered = 0
+        self.failed = 0
+        self.send_errors = 0
+        self.duplicates = 0
+        self.bytes = 0
+        self.queue_depth = 0
+        self.spooled = 0
+        self.drained = 0
+        self.spool_depth = 0
+        self.delivered_by_partition = defaultdict(int)
+        self.delivery_latency = Histogram()
+        self.exporters = []
+
+        self._lock = threading.Lock()
+        self._last_summary = time.monotonic()
+        self._last_snapshot = self.snapshot()
+
+    def on_produce(self, size):
+        self.produced += 1
+        self.bytes += size
+
+    def on_duplicate(self):
+        self.duplicates += 1
+
+    def on_send_error(self):
+        self.send_errors += 1
+
+    def on_spooled(self):
+        self.spooled += 1
+
+    def on_drained(self, count):
+        self.drained += count
+
+    def on_delivery(self, err, msg):
+        """Record a delivery report from librdkafka"""
+        if err:
+            self.failed += 1
+            return
+        self.delivered += 1
+        self.delivered_by_partition[(msg.topic(), msg.partition())] += 1
+        latency = msg.latency()
+        if latency is not None:
+            self.delivery_latency.observe(latency)
+
+    def set_queue_depth(self, depth):
+        self.queue_depth = depth
+
+    def set_spool_depth(self, depth):
+        self.spool_depth = depth
+
+    def snapshot(self):
+        return {
+            'produced': self.produced,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'send_errors': self.send_errors,
+            'duplicates': self.duplicates,
+            'bytes': self.bytes,
+            'queue_depth': self.queue_depth,
+            'spooled': self.spooled,
+            'drained': self.drained,
+            'spool_depth': self.spool_depth,
+        }
+
+    def maybe_log_summary(self, force=False):
+        """Log and export a summary if the interval has passed (or if forced)"""
+        now = time.monotonic()
+        if not force and now - self._last_summary < self.log_interval:
+            return
+        # Only one thread reports a given interval
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            elapsed = max(now - self._last_summary, 1e-9)
+            current = self.snapshot()
+            delta = {key: current[key] - self._last_snapshot[key] for key in current}
+            self._last_summary, self._last_snapshot = now, current
+
+            active = ('produced', 'delivered', 'failed', 'send_errors', 'spooled', 'drained')
+            if any(delta[key] for key in active) or current['spool_depth'] or force:
+                latency = self.delivery_latency
+                line = (
+                    f"Producer stats: {delta['produced'] / elapsed:.1f} msg/s produced, "
+                    f"{delta['delivered']} delivered, {delta['failed']} failed, "
+                    f"{delta['duplicates']} duplicates skipped, queue depth {current['queue_depth']}, "
+                    f"delivery latency p50<={latency.quantile(0.5)}s p99<={latency.quantile(0.99)}s"
+                )
+                if delta['spooled'] or delta['drained'] or current['spool_depth']:
+                    line += (
+                        f", {delta['spooled']} spooled, spool depth {current['spool_depth']}, "
+                        f"draining {delta['drained'] / elapsed:.1f} msg/s"
+                    )
+                logger.info(line)
+
+            for exporter in self.exporters:
+                try:
+                    exporter.export(self, delta)
+                except Exception as e:
+                    logger.debug(f"Metrics export failed: {e}")
+        finally:
+            self._lock.release()
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        counters = {
+            'news_producer_messages_produced_total': self.produced,
+            'news_producer_messages_delivered_total': self.delivered,
+            'news_producer_messages_failed_total': self.failed,
+            'news_producer_send_errors_total': self.send_errors,
+            'news_producer_duplicates_skipped_total': self.duplicates,
+            'news_producer_bytes_total': self.bytes,
+            'news_producer_messages_spooled_total': self.spooled,
+            'news_producer_messages_drained_total': self.drained,
+        }
+        for name, value in counters.items():
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+
+        lines += ["# TYPE news_producer_queue_depth gauge", f"news_producer_queue_depth {self.queue_depth}"]
+        lines += ["# TYPE news_producer_spool_depth gauge", f"news_producer_spool_depth {self.spool_depth}"]
+
+        lines.append("# TYPE news_producer_partition_delivered_total counter")
+        # Snapshot first: delivery callbacks add partitions from the producer's thread
+        for (topic, partition), value in sorted(list(self.delivered_by_partition.items())):
+            lines.append(
+                f'news_producer_partition_delivered_total{{topic="{topic}",partition="{partition}"}} {value}'
+            )
+
+        histogram = self.delivery_latency
+        lines.append("# TYPE news_producer_delivery_latency_seconds histogram")
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else bound
+            lines.append(f'news_producer_delivery_latency_seconds_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"news_producer_delivery_latency_seconds_sum {histogram.total}")
+        lines.append(f"news_producer_delivery_latency_seconds_count {histogram.count}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdExporter:
+    """Pushes counter deltas and gauges to a statsd daemon over UDP at each summary"""
+
+    def __init__(self, host, port=8125, prefix='news_producer'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, metrics, delta):
+        lines = [
+            f"{self.prefix}.{key}:{value}|c"
+            for key, value in delta.items()
+            if key not in ('queue_depth', 'spool_depth') and value
+        ]
+        lines.append(f"{self.prefix}.queue_depth:{metrics.queue_depth}|g")
+        lines.append(f"{self.prefix}.spool_depth:{metrics.spool_depth}|g")
+        lines.append(f"{self.prefix}.delivery_latency_p99:{metrics.delivery_latency.quantile(0.99) * 1000:.0f}|ms")
+        self.sock.sendto('\n'.join(lines).encode('utf-8'), self.address)
+
+
+def start_prometheus_server(metrics, port):
+    """Serve metrics.render_prometheus() at http://0.0.0.0:<port>/metrics on a daemon thread"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Prometheus metrics available at http://0.0.0.0:{port}/metrics")
+    return server
@@ -0,0 +1,85 @@
+import re
+import time
+import zlib
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+STRATEGIES = ('key', 'host', 'story')
+
+
+def story_hash(title):
+    """
+    Smallest crc32 over a title's word bigrams: a one-value MinHash. Two
+    titles get the same value with probability equal to the Jaccard
+    similarity J of their bigrams, and that is the most any single routing
+    key can promise: copies at J = 0.5 still land on different partitions
+    half the time. The worker's near-duplicate tables are per partition, so
+    such a copy starts its own cluster instead of joining the story's.
+    Routing on one of the worker's LSH bands would not help: a band is
+    several MinHash values that must all match, so it agrees less often.
+
+    Bigrams rather than the worker's character shingles because frequent
+    shingles (' the ', 'tion ') would win the minimum for a large share of
+    all titles and overload whichever partition they hash to.
+    """
+    words = _NON_ALNUM.sub(' ', title.lower()).split()
+    if len(words) < 2:
+        return zlib.crc32(' '.join(words).encode('utf-8'))
+    return min(zlib.crc32(f"{a} {b}".encode('utf-8')) for a, b in zip(words, words[1:]))
+
+
+def host_hash(canonical_url):
+    return zlib.crc32((urlsplit(canonical_url).hostname or '').encode('utf-8'))
+
+
+class Partitioner:
+    """
+    Picks the news-articles partition for a message.
+
+    Messages keep the canonical URL as their key either way (the worker
+    uses it as the article id); only the partition changes:
+
+    - 'key':   librdkafka's default hash of the key (canonical URL)
+    - 'host':  canonical URL host, so each site's articles stay together
+    - 'story': title MinHash, so near-duplicate copies of a story usually
+               share a partition and with it the worker's near-duplicate
+               state (see story_hash() for how often they don't)
+
+    The partition count comes from topic metadata and is re-read every
+    `refresh_seconds`, so partitions added later are picked up. While it is
+    unknown, partition() returns None and the default hashing applies.
+    """
+
+    def __init__(self, strategy, partition_count, refresh_seconds=300.0):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown partition strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.strategy = strategy
+        self._partition_count = partition_count
+        self.refresh_seconds = refresh_seconds
+        self._partitions = None
+        self._checked_at = None
+
+    def partitions(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.refresh_seconds:
+            self._checked_at = now
+            try:
+                self._partitions = self._partition_count()
+            except Exception as e:
+                logger.warning(f"Could not read partition count, using key hashing: {e}")
+                self._partitions = None
+        return self._partitions
+
+    def partition(self, message, canonical_url):
+        if self.strategy == 'key':
+            return None
+        partitions = self.partitions()
+        if not partitions:
+            return None
+        if self.strategy == 'host':
+            return host_hash(canonical_url) % partitions
+        return story_hash(message['title']) % partitions
@@ -0,0 +1,72 @@
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens=1):
+        """Wait until `tokens` are available and take them"""
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class HeaderRateLimiter:
+    """
+    Blocking request pacer driven by X-Ratelimit-Remaining / X-Ratelimit-Reset
+    response headers (Reddit's): the requests left in the current window are
+    spread evenly over the seconds until it resets, never closer together than
+    `min_interval`. Shared by threads; requests go out one at a time.
+    """
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self.remaining = None
+        self.reset = None
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next request may be sent"""
+        with self._lock:
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_at = time.monotonic() + self.min_interval
+
+    def update(self, headers, status=200):
+        """Set the pace from a response's rate-limit headers"""
+        try:
+            remaining = float(headers['X-Ratelimit-Remaining'])
+            reset = float(headers['X-Ratelimit-Reset'])
+        except (KeyError, ValueError):
+            if status == 429:
+                self._delay_next(float(headers.get('Retry-After', 60)))
+            return
+
+        self.remaining, self.reset = remaining, reset
+        if remaining < 1 or status == 429:
+            self._delay_next(reset)
+        else:
+            self._delay_next(max(reset / remaining, self.min_interval))
+
+    def _delay_next(self, seconds):
+        with self._lock:
+            self._next_at = time.monotonic() + seconds
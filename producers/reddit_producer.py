@@ -1,46 +1,173 @@
-import time
+import os
+import json
 import requests
 import logging
-from .kafka_producer import NewsProducer
-from .config import REDDIT_SUBREDDIT_URL
+import threading
+from .kafka_producer import NewsProducer, format_epoch
+from .rate_limiter import HeaderRateLimiter
+from .config import (
+    REDDIT_SUBREDDIT_URL,
+    REDDIT_NEW_URL,
+    REDDIT_MULTI_SIZE,
+    REDDIT_PAGE_LIMIT,
+    REDDIT_MAX_PAGES,
+    REDDIT_MIN_INTERVAL,
+    REDDIT_STATE_PATH
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def subreddit_groups(subreddits, size=REDDIT_MULTI_SIZE):
+    """Split subreddits into multireddits of at most `size`, each fetched with one request per page"""
+    subreddits = sorted(set(subreddits), key=str.lower)
+    return [subreddits[i:i + size] for i in range(0, len(subreddits), size)]
+
+
+class ListingWatermarks:
+    """
+    Newest post seen per listing (fullname and creation time), persisted as
+    JSON, so each poll of /new only pages back as far as the last one.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._marks = {}
+        
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._marks = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable Reddit state {path}: {e}")
+    
+    def get(self, listing):
+        """Return (fullname, created_utc) of the newest post seen, or None"""
+        with self._lock:
+            mark = self._marks.get(listing)
+        return (mark['name'], mark['created_utc']) if mark else None
+    
+    def set(self, listing, post):
+        with self._lock:
+            self._marks[listing] = {'name': post['name'], 'created_utc': post.get('created_utc', 0)}
+    
+    def save(self):
+        """Write the watermarks to disk atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(self._marks)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
 class RedditProducer(NewsProducer):
     """Producer for Reddit posts"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, state_path=REDDIT_STATE_PATH, min_interval=REDDIT_MIN_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'News-Aggregator-Bot/1.0'
         })
+        # One pace for every request this producer makes, set by Reddit's rate-limit headers
+        self.rate_limiter = HeaderRateLimiter(min_interval)
+        self.watermarks = ListingWatermarks(state_path)
+    
+    def get_json(self, url, params=None):
+        """GET a Reddit JSON document at the pace Reddit allows, raising on request errors"""
+        self.rate_limiter.wait()
+        response = self.session.get(url, params=params, timeout=10)
+        self.rate_limiter.update(response.headers, response.status_code)
+        response.raise_for_status()
+        return response.json()
+    
+    def get_subreddit_posts(self, subreddit, limit=25):
+        """Fetch hot posts from a subreddit, raising on request errors"""
+        data = self.get_json(REDDIT_SUBREDDIT_URL.format(subreddit, limit))
+        posts = data.get('data', {}).get('children', [])
+        
+        logger.info(f"Fetched {len(posts)} posts from r/{subreddit}")
+        return posts
+    
+    def get_new_posts(self, subreddits, page_limit=REDDIT_PAGE_LIMIT, max_pages=REDDIT_MAX_PAGES):
+        """
+        Fetch posts made since the last call across `subreddits`, newest
+        first, with one multireddit request (/r/a+b+c/new) per page. Follows
+        the `after` cursor until it reaches the watermark: the newest post
+        seen last time, or anything older than it if that post was removed.
+        Without a watermark only the first page is fetched. Raises on
+        request errors. The watermark moves on in produce_new_posts().
+        """
+        listing = '+'.join(subreddits)
+        mark = self.watermarks.get(listing)
+        
+        posts = []
+        after = None
+        for _ in range(max_pages if mark else 1):
+            params = {'limit': page_limit, 'raw_json': 1}
+            if after:
+                params['after'] = after
+            data = self.get_json(REDDIT_NEW_URL.format(listing), params).get('data', {})
+            
+            for child in data.get('children', []):
+                post = child.get('data', {})
+                if mark and (post.get('name') == mark[0] or post.get('created_utc', 0) < mark[1]):
+                    return posts
+                posts.append(post)
+            
+            after = data.get('after')
+            if not after:
+                return posts
+        
+        if mark:
+            logger.warning(
+                f"More than {max_pages} pages of new posts in {len(subreddits)} subreddits; "
+                f"older ones were skipped (raise REDDIT_MAX_PAGES or poll more often)"
+            )
+        return posts
+    
+    def produce_new_posts(self, subreddits):
+        """Fetch and produce the posts made since the last call across `subreddits`"""
+        posts = self.get_new_posts(subreddits)
+        logger.info(f"Fetched {len(posts)} new posts from {len(subreddits)} subreddits")
+        
+        produced_count = self.produce_posts(reversed(posts))
+        
+        # Only after producing, so a failed run fetches the same posts again
+        if posts:
+            self.watermarks.set('+'.join(subreddits), posts[0])
+            self.watermarks.save()
+        return produced_count
+    
+    def produce_all_subreddits(self, subreddits):
+        """Fetch and produce new posts from any number of subreddits, in multireddit groups"""
+        return sum(self.produce_new_posts(group) for group in subreddit_groups(subreddits))
     
     def fetch_subreddit_posts(self, subreddit, limit=25):
         """Fetch hot posts from a subreddit"""
         try:
-            url = REDDIT_SUBREDDIT_URL.format(subreddit, limit)
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get('data', {}).get('children', [])
-            
-            logger.info(f"Fetched {len(posts)} posts from r/{subreddit}")
-            return posts
+            return self.get_subreddit_posts(subreddit, limit)
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching r/{subreddit}: {e}")
             return []
     
     def produce_subreddit(self, subreddit, limit=25):
-        """Fetch and produce posts from a subreddit to Kafka"""
-        posts = self.fetch_subreddit_posts(subreddit, limit)
-        
+        """Fetch and produce hot posts from a subreddit to Kafka"""
+        posts = [post_data.get('data', {}) for post_data in self.fetch_subreddit_posts(subreddit, limit)]
+        produced_count = self.produce_posts(posts, subreddit)
+        logger.info(f"Produced {produced_count} posts from r/{subreddit}")
+        return produced_count
+    
+    def produce_posts(self, posts, subreddit=None):
+        """Produce already-fetched posts to Kafka; `subreddit` is for posts that don't name theirs"""
         produced_count = 0
-        for post_data in posts:
-            post = post_data.get('data', {})
+        for post in posts:
+            subreddit_name = post.get('subreddit') or subreddit
             
             # Skip stickied posts
             if post.get('stickied', False):
@@ -53,22 +180,22 @@ class RedditProducer(NewsProducer):
             
             # Create message
             message = self.create_message(
-                source=f"Reddit - r/{subreddit}",
+                source=f"Reddit - r/{subreddit_name}",
                 title=post.get('title', 'No title'),
                 url=url,
                 score=post.get('score', 0),
                 author=post.get('author', 'unknown'),
                 comments=post.get('num_comments', 0),
-                subreddit=subreddit,
+                subreddit=subreddit_name,
                 post_id=post.get('id', ''),
-                is_self_post=post.get('is_self', False)
+                is_self_post=post.get('is_self', False),
+                published=format_epoch(post.get('created_utc'))
             )
             
             # Send to Kafka
-            self.send_message(message)
-            produced_count += 1
+            if self.send_message(message):
+                produced_count += 1
         
-        logger.info(f"Produced {produced_count} posts from r/{subreddit}")
         return produced_count
 
 
@@ -88,13 +215,7 @@ def main():
     try:
         logger.info("Starting Reddit producer...")
         
-        total_produced = 0
-        for subreddit in subreddits:
-            count = producer.produce_subreddit(subreddit, limit=10)
-            total_produced += count
-            
-            # Be respectful to Reddit's API
-            time.sleep(2)
+        total_produced = producer.produce_all_subreddits(subreddits)
         
         logger.info(f"Total posts produced: {total_produced}")
         
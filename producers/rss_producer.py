@@ -1,8 +1,19 @@
-import time
 import feedparser
+import requests
 import logging
-from kafka_producer import NewsProducer
-from .config import RSS_FEEDS
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from xml.etree.ElementTree import ParseError
+from .kafka_producer import NewsProducer, SourceError
+from .feed_cache import FeedCache
+from .feed_stream import parse_feed_stream
+from .config import (
+    RSS_FEEDS,
+    RSS_MAX_WORKERS,
+    RSS_CACHE_PATH,
+    RSS_STREAMING,
+    RSS_CHUNK_SIZE,
+    RSS_SUMMARY_LENGTH
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,23 +22,108 @@ logger = logging.getLogger(__name__)
 class RSSProducer(NewsProducer):
     """Producer for RSS feeds"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, cache_path=RSS_CACHE_PATH, max_workers=RSS_MAX_WORKERS, streaming=RSS_STREAMING, **kwargs):
+        super().__init__(**kwargs)
+        self.feed_cache = FeedCache(cache_path)
+        self.max_workers = max_workers
+        self.streaming = streaming
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'News-Aggregator-Bot/1.0'})
+    
+    def get_feed(self, feed_url):
+        """
+        Fetch and parse an RSS feed, skipping it entirely if unchanged since the
+        last fetch, and returning only entries newer than the newest one of the
+        last fetch. Raises SourceError if the feed could not be downloaded.
+        """
+        logger.info(f"Fetching feed: {feed_url}")
+        
+        if self.streaming:
+            try:
+                return self.stream_feed(feed_url)
+            except ParseError as e:
+                logger.info(f"Feed {feed_url} is not well-formed XML ({e}), parsing it with feedparser")
+        
+        return self.parse_feed(feed_url)
+    
+    def conditional_headers(self, feed_url):
+        """If-None-Match / If-Modified-Since from the validators of the last full response"""
+        etag, modified = self.feed_cache.get(feed_url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+        return headers
+    
+    def stream_feed(self, feed_url):
+        """
+        Fast path: parse the response body as it downloads (see feed_stream.py),
+        stopping at the first entry already seen. Raises ParseError for
+        feeds that aren't well-formed XML.
+        """
+        try:
+            with self.session.get(feed_url, headers=self.conditional_headers(feed_url),
+                                  stream=True, timeout=10) as response:
+                if response.status_code == 304:
+                    logger.info(f"Feed not modified: {feed_url}")
+                    return [], 'Unknown Feed'
+                if response.status_code >= 400:
+                    raise SourceError(f"Could not fetch {feed_url}: HTTP {response.status_code}")
+                
+                feed_title, entries, newest_id = parse_feed_stream(
+                    response.iter_content(RSS_CHUNK_SIZE),
+                    last_seen=self.feed_cache.get_last_seen(feed_url),
+                    summary_length=RSS_SUMMARY_LENGTH
+                )
+                etag, modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        except requests.exceptions.RequestException as e:
+            raise SourceError(f"Could not fetch {feed_url}: {e}")
+        
+        self.feed_cache.update(feed_url, etag, modified)
+        self.feed_cache.set_last_seen(feed_url, newest_id)
+        
+        logger.info(f"Fetched {len(entries)} new entries from '{feed_title}'")
+        return entries, feed_title
+    
+    def parse_feed(self, feed_url):
+        """Fetch and parse a feed with feedparser, which copes with malformed feeds"""
+        # Conditional GET: send back the validators from the last full response
+        etag, modified = self.feed_cache.get(feed_url)
+        feed = feedparser.parse(feed_url, etag=etag, modified=modified)
+        
+        # feedparser reports network errors through bozo instead of raising
+        if 'status' not in feed and feed.bozo:
+            raise SourceError(f"Could not fetch {feed_url}: {feed.bozo_exception}")
+        if feed.get('status', 200) >= 400:
+            raise SourceError(f"Could not fetch {feed_url}: HTTP {feed.status}")
+        
+        if feed.get('status') == 304:
+            logger.info(f"Feed not modified: {feed_url}")
+            return [], feed.feed.get('title', 'Unknown Feed')
+        
+        self.feed_cache.update(feed_url, feed.get('etag'), feed.get('modified'))
+        
+        if feed.bozo:
+            logger.warning(f"Feed parsing warning for {feed_url}: {feed.bozo_exception}")
+        
+        entries = feed.entries
+        feed_title = feed.feed.get('title', 'Unknown Feed')
+        
+        # Same cut-off as the streaming parser: stop at the newest entry of the last fetch
+        ids = [entry.get('id') or entry.get('link') for entry in entries]
+        last_seen = self.feed_cache.get_last_seen(feed_url)
+        if last_seen in ids:
+            entries = entries[:ids.index(last_seen)]
+        self.feed_cache.set_last_seen(feed_url, ids[0] if ids else None)
+        
+        logger.info(f"Fetched {len(entries)} new entries from '{feed_title}'")
+        return entries, feed_title
     
     def fetch_feed(self, feed_url):
-        """Fetch and parse an RSS feed"""
+        """Fetch and parse an RSS feed, skipping it entirely if unchanged since the last fetch"""
         try:
-            logger.info(f"Fetching feed: {feed_url}")
-            feed = feedparser.parse(feed_url)
-            
-            if feed.bozo:
-                logger.warning(f"Feed parsing warning for {feed_url}: {feed.bozo_exception}")
-            
-            entries = feed.entries
-            feed_title = feed.feed.get('title', 'Unknown Feed')
-            
-            logger.info(f"Fetched {len(entries)} entries from '{feed_title}'")
-            return entries, feed_title
+            return self.get_feed(feed_url)
         except Exception as e:
             logger.error(f"Error fetching feed {feed_url}: {e}")
             return [], "Unknown Feed"
@@ -35,7 +131,10 @@ class RSSProducer(NewsProducer):
     def produce_feed(self, feed_url):
         """Fetch and produce articles from an RSS feed to Kafka"""
         entries, feed_title = self.fetch_feed(feed_url)
-        
+        return self.produce_entries(entries, feed_title)
+    
+    def produce_entries(self, entries, feed_title):
+        """Produce already-fetched feed entries to Kafka"""
         produced_count = 0
         for entry in entries:
             # Extract relevant fields
@@ -56,27 +155,30 @@ class RSSProducer(NewsProducer):
                 url=url,
                 author=author,
                 published=published,
-                summary=summary[:200] if summary else ''  # Truncate summary
+                summary=summary[:RSS_SUMMARY_LENGTH] if summary else ''  # Truncate summary
             )
             
             # Send to Kafka
-            self.send_message(message)
-            produced_count += 1
+            if self.send_message(message):
+                produced_count += 1
         
         logger.info(f"Produced {produced_count} articles from '{feed_title}'")
         return produced_count
     
     def produce_all_feeds(self, feed_urls):
-        """Produce articles from multiple RSS feeds"""
+        """Produce articles from multiple RSS feeds, fetching them in parallel"""
         total_produced = 0
         
-        for feed_url in feed_urls:
-            count = self.produce_feed(feed_url)
-            total_produced += count
+        # Fetching is network-bound, so a bounded thread pool polls feeds concurrently;
+        # producing stays on this thread as each feed completes
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.fetch_feed, feed_url) for feed_url in feed_urls]
             
-            # Small delay between feeds
-            time.sleep(1)
+            for future in as_completed(futures):
+                entries, feed_title = future.result()
+                total_produced += self.produce_entries(entries, feed_title)
         
+        self.feed_cache.save()
         return total_produced
 
 
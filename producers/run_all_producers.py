@@ -1,9 +1,21 @@
-import time
+import asyncio
 import logging
+from functools import partial
+from .kafka_producer import NewsProducer
 from .hacker_news_producer import HackerNewsProducer
-from .reddit_producer import RedditProducer
+from .reddit_producer import RedditProducer, subreddit_groups
 from .rss_producer import RSSProducer
-from .config import RSS_FEEDS
+from .rate_limiter import TokenBucket
+from .scheduler import ScheduledSource, Scheduler
+from .config import (
+    RSS_FEEDS,
+    HN_POLL_INTERVAL,
+    HN_STORY_LIMIT,
+    REDDIT_POLL_INTERVAL,
+    REDDIT_SUBREDDITS,
+    RSS_POLL_INTERVAL,
+    RSS_RATE_LIMIT
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,76 +24,76 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def run_all_producers():
-    """Run all news producers sequentially"""
-    
-    total_messages = 0
-    
-    # 1. Hacker News
-    logger.info("=" * 50)
-    logger.info("Running Hacker News Producer")
-    logger.info("=" * 50)
-    hn_producer = HackerNewsProducer()
-    try:
-        count = hn_producer.produce_stories(limit=15)
-        total_messages += count
-    finally:
-        hn_producer.close()
-    
-    time.sleep(2)
-    
-    # 2. Reddit
-    logger.info("=" * 50)
-    logger.info("Running Reddit Producer")
-    logger.info("=" * 50)
-    reddit_producer = RedditProducer()
-    try:
-        subreddits = ['technology', 'programming', 'worldnews']
-        for subreddit in subreddits:
-            count = reddit_producer.produce_subreddit(subreddit, limit=10)
-            total_messages += count
-            time.sleep(2)
-    finally:
-        reddit_producer.close()
-    
-    time.sleep(2)
-    
-    # 3. RSS Feeds
-    logger.info("=" * 50)
-    logger.info("Running RSS Producer")
-    logger.info("=" * 50)
-    rss_producer = RSSProducer()
-    try:
-        count = rss_producer.produce_all_feeds(RSS_FEEDS)
-        total_messages += count
-    finally:
-        rss_producer.close()
-    
+def produce_feed(rss, feed_url):
+    entries, feed_title = rss.get_feed(feed_url)
+    return rss.produce_entries(entries, feed_title)
+
+
+def build_scheduler():
+    """
+    One scheduled source for Hacker News, each multireddit group of
+    subreddits and each RSS feed, all producing through one shared Kafka
+    client. Built inside the running
+    event loop, which the rate limiters' locks belong to.
+    """
+    sink = NewsProducer()
+    hn = HackerNewsProducer(shared=sink)
+    reddit = RedditProducer(shared=sink)
+    rss = RSSProducer(shared=sink)
+
+    # Shared by every feed. Reddit requests are paced by the RedditProducer
+    # itself, from Reddit's rate-limit headers
+    rss_limiter = TokenBucket(RSS_RATE_LIMIT)
+
+    sources = [ScheduledSource('hacker-news', partial(hn.produce_stories_async, limit=HN_STORY_LIMIT),
+                               HN_POLL_INTERVAL)]
+    sources += [
+        ScheduledSource(f"reddit r/{'+'.join(group[:3])}{'+...' if len(group) > 3 else ''} ({len(group)})",
+                        partial(reddit.produce_new_posts, group), REDDIT_POLL_INTERVAL)
+        for group in subreddit_groups(REDDIT_SUBREDDITS)
+    ]
+    sources += [
+        ScheduledSource(f'rss {feed_url}', partial(produce_feed, rss, feed_url),
+                        RSS_POLL_INTERVAL, rate_limiter=rss_limiter)
+        for feed_url in RSS_FEEDS
+    ]
+    return Scheduler(sources, sink, producers=[hn, reddit, rss], savers=[rss.feed_cache.save])
+
+
+async def run_all_producers_async():
+    total_messages = await build_scheduler().run_once()
     logger.info("=" * 50)
     logger.info(f"All producers completed! Total messages: {total_messages}")
     logger.info("=" * 50)
+    return total_messages
 
 
-def run_continuous(interval_minutes=15):
-    """Run all producers continuously at specified intervals"""
-    logger.info(f"Starting continuous mode (interval: {interval_minutes} minutes)")
-    
+def run_all_producers():
+    """Run every source once, concurrently"""
+    return asyncio.run(run_all_producers_async())
+
+
+async def run_continuous_async():
+    await build_scheduler().run()
+
+
+def run_continuous():
+    """Poll every source on its own interval until SIGINT/SIGTERM"""
     try:
-        while True:
-            run_all_producers()
-            logger.info(f"Sleeping for {interval_minutes} minutes...")
-            time.sleep(interval_minutes * 60)
+        asyncio.run(run_continuous_async())
     except KeyboardInterrupt:
-        logger.info("Continuous mode stopped by user")
+        pass
+    logger.info("Continuous mode stopped")
 
 
 if __name__ == "__main__":
     import sys
-    
+
     if len(sys.argv) > 1 and sys.argv[1] == "--continuous":
-        # Run continuously
-        interval = int(sys.argv[2]) if len(sys.argv) > 2 else 15
-        run_continuous(interval_minutes=interval)
+        # Run continuously; intervals come from HN_/REDDIT_/RSS_POLL_INTERVAL
+        if len(sys.argv) > 2:
+            logger.warning("The interval argument is ignored, each source has its own *_POLL_INTERVAL")
+        run_continuous()
     else:
         # Run once
-        run_all_producers()
\ No newline at end of file
+        run_all_producers()
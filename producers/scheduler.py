@@ -0,0 +1,249 @@
+import time
+import random
+import signal
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from .config import (
+    SCHEDULE_JITTER,
+    SCHEDULE_RETRY_DELAY,
+    SCHEDULE_MAX_BACKOFF,
+    SCHEDULE_WORKERS,
+    SCHEDULE_DRAIN_TIMEOUT,
+    METRICS_LOG_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledSource:
+    """
+    One source polled on its own interval, with its health.
+
+    `run` returns the number of messages produced and raises when the source
+    could not be fetched. Coroutine functions run on the event loop; plain
+    functions (requests, feedparser) run on the scheduler's thread pool.
+    Sources that hit the same API share one `rate_limiter` (a TokenBucket),
+    taken once per run.
+    """
+
+    def __init__(self, name, run, interval, rate_limiter=None, jitter=SCHEDULE_JITTER,
+                 retry_delay=SCHEDULE_RETRY_DELAY, max_backoff=SCHEDULE_MAX_BACKOFF):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        self.rate_limiter = rate_limiter
+        self.jitter = jitter
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.is_async = asyncio.iscoroutinefunction(run)
+
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.produced = 0
+        self.last_success = None
+        self.last_duration = None
+        self.last_error = None
+        self.next_run = None
+
+    def record_success(self, produced, duration):
+        self.runs += 1
+        self.produced += produced
+        self.consecutive_failures = 0
+        self.last_success = time.monotonic()
+        self.last_duration = duration
+        self.last_error = None
+
+    def record_failure(self, error, duration):
+        self.runs += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_duration = duration
+        self.last_error = str(error) or type(error).__name__
+
+    def next_delay(self):
+        """Seconds until the next run: the interval, or an exponential backoff after failures"""
+        if self.consecutive_failures:
+            delay = min(self.retry_delay * 2 ** (self.consecutive_failures - 1), self.max_backoff)
+        else:
+            delay = self.interval
+        # Jitter keeps sources with the same interval from polling in lockstep
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def health(self):
+        now = time.monotonic()
+        if not self.runs:
+            status = 'pending'
+        elif self.consecutive_failures:
+            status = 'backoff'
+        else:
+            status = 'ok'
+        return {
+            'status': status,
+            'runs': self.runs,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'produced': self.produced,
+            'seconds_since_success': round(now - self.last_success, 1) if self.last_success else None,
+            'last_duration': round(self.last_duration, 2) if self.last_duration is not None else None,
+            'next_run_in': round(max(self.next_run - now, 0), 1) if self.next_run else None,
+            'last_error': self.last_error,
+        }
+
+
+class Scheduler:
+    """
+    Runs every source on its own interval from one asyncio loop, all of
+    them producing through `sink`, a single long-lived NewsProducer (and
+    with it one Kafka client and one dedup filter).
+
+    A slow or failing source only delays itself. On SIGINT/SIGTERM no new
+    runs start, running ones get up to `drain_timeout` seconds to finish,
+    then `producers` (the per-source NewsProducers) are closed and the sink
+    is flushed and closed.
+
+    `savers` persist state the sources share (the RSS feed cache) from the
+    loop, once a second and at shutdown, rather than from every source run.
+    """
+
+    def __init__(self, sources, sink, producers=(), savers=(), workers=SCHEDULE_WORKERS,
+                 drain_timeout=SCHEDULE_DRAIN_TIMEOUT, health_interval=METRICS_LOG_INTERVAL):
+        self.sources = sources
+        self.sink = sink
+        self.producers = producers
+        self.savers = savers
+        self.drain_timeout = drain_timeout
+        self.health_interval = health_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='source')
+        self._stopping = None
+
+    def stop(self):
+        if self._stopping is not None and not self._stopping.is_set():
+            logger.info("Stopping scheduler, letting running sources finish...")
+            self._stopping.set()
+
+    def health(self):
+        return {source.name: source.health() for source in self.sources}
+
+    def log_health(self):
+        for name, health in self.health().items():
+            since = health['seconds_since_success']
+            line = (
+                f"{name}: {health['status']}, {health['produced']} produced in {health['runs']} runs, "
+                f"last success {'never' if since is None else f'{since}s ago'}"
+            )
+            if health['last_error']:
+                line += f", {health['consecutive_failures']} failures in a row: {health['last_error']}"
+            logger.info(line)
+
+    async def run_source_once(self, source):
+        """Run a source once, recording the outcome in its health; never raises"""
+        if source.rate_limiter is not None:
+            await source.rate_limiter.acquire()
+
+        started = time.monotonic()
+        try:
+            if source.is_async:
+                produced = await source.run()
+            else:
+                loop = asyncio.get_running_loop()
+                produced = await loop.run_in_executor(self.executor, source.run)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            source.record_failure(e, time.monotonic() - started)
+            logger.warning(f"{source.name} failed ({source.consecutive_failures} in a row): {source.last_error}")
+        else:
+            source.record_success(produced or 0, time.monotonic() - started)
+            logger.info(f"{source.name}: produced {produced or 0} in {source.last_duration:.1f}s")
+
+    async def _sleep(self, seconds):
+        """Sleep unless the scheduler stops first; returns True if it is stopping"""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run_source(self, source):
+        # Spread the first runs over part of the interval
+        delay = random.uniform(0, source.interval * source.jitter)
+        while True:
+            source.next_run = time.monotonic() + delay
+            if await self._sleep(delay):
+                return
+            await self.run_source_once(source)
+            delay = source.next_delay()
+
+    def save(self):
+        for saver in self.savers:
+            try:
+                saver()
+            except Exception as e:
+                logger.error(f"Error saving source state: {e}")
+
+    async def _housekeeping(self):
+        """Serve delivery callbacks and save source state between runs, and log source health periodically"""
+        last_health = time.monotonic()
+        while not await self._sleep(1.0):
+            self.sink.poll()
+            self.save()
+            if time.monotonic() - last_health >= self.health_interval:
+                self.log_health()
+                last_health = time.monotonic()
+
+    def _install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                # Windows: Ctrl+C cancels run() instead, which drains the same way
+                pass
+
+    async def run(self):
+        """Poll every source until stopped"""
+        self._stopping = asyncio.Event()
+        self._install_signal_handlers()
+        logger.info(
+            f"Scheduling {len(self.sources)} sources: "
+            + ', '.join(f"{source.name} every {source.interval:g}s" for source in self.sources)
+        )
+
+        tasks = [asyncio.ensure_future(self._run_source(source)) for source in self.sources]
+        tasks.append(asyncio.ensure_future(self._housekeeping()))
+        try:
+            await self._stopping.wait()
+        finally:
+            self._stopping.set()
+            await self._drain(tasks)
+
+    async def run_once(self):
+        """Run every source once, concurrently, then close"""
+        self._stopping = asyncio.Event()
+        tasks = [asyncio.ensure_future(self.run_source_once(source)) for source in self.sources]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await self._drain(tasks)
+        return sum(source.produced for source in self.sources)
+
+    async def _drain(self, tasks):
+        done, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        if pending:
+            logger.warning(f"{len(pending)} sources still running after {self.drain_timeout:g}s, cancelling")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        # Blocking sources can't be cancelled; don't wait for stragglers
+        self.executor.shutdown(wait=False)
+
+        self.save()
+        self.log_health()
+        for producer in self.producers:
+            try:
+                producer.close()
+            except Exception as e:
+                logger.error(f"Error closing {type(producer).__name__}: {e}")
+        self.sink.close()
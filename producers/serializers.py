@@ -0,0 +1,40 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _stdlib_json(message):
+    return json.dumps(message).encode('utf-8')
+
+
+def get_serializer(name):
+    """
+    Return a callable turning a message dict into JSON bytes.
+
+    'orjson' and 'msgspec' are optional dependencies that encode straight to
+    bytes; if the requested one is not installed, the stdlib encoder is used.
+    All of them emit JSON, so consumers are unaffected by the choice.
+
+    'binary' is the compact schema-based format from faust_worker/wire_format.py
+    (needs msgpack); unlike the others it requires consumers that can read it.
+    """
+    if name == 'binary':
+        from faust_worker.wire_format import encode_news_article
+        return encode_news_article
+    if name == 'orjson':
+        try:
+            import orjson
+            return orjson.dumps
+        except ImportError:
+            logger.warning("orjson is not installed, falling back to json")
+    elif name == 'msgspec':
+        try:
+            import msgspec
+            return msgspec.json.Encoder().encode
+        except ImportError:
+            logger.warning("msgspec is not installed, falling back to json")
+    elif name != 'json':
+        logger.warning(f"Unknown serializer '{name}', falling back to json")
+
+    return _stdlib_json
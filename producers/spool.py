@@ -0,0 +1,318 @@
+import os
+import time
+import zlib
+import struct
+import logging
+import threading
+from confluent_kafka import KafkaError
+
+logger = logging.getLogger(__name__)
+
+# Record: body length and CRC32, then the body: partition, topic length,
+# key length (-1 = no key), topic, key, value
+_HEADER = struct.Struct('>II')
+_BODY = struct.Struct('>iHi')
+SEGMENT_SUFFIX = '.seg'
+CURSOR_FILE = 'cursor'
+
+# Delivery errors that retrying can't fix; such messages are dropped rather
+# than spooled, or they would block the spool forever
+PERMANENT_ERRORS = {
+    KafkaError.MSG_SIZE_TOO_LARGE,
+    KafkaError.INVALID_MSG,
+    KafkaError.INVALID_MSG_SIZE,
+    KafkaError.INVALID_RECORD,
+    KafkaError.RECORD_LIST_TOO_LARGE,
+    KafkaError.TOPIC_AUTHORIZATION_FAILED,
+    KafkaError._INVALID_ARG,
+}
+
+
+def is_permanent(err):
+    return err.fatal() or err.code() in PERMANENT_ERRORS
+
+
+def _encode(topic, partition, key, value):
+    topic = topic.encode('utf-8')
+    body = _BODY.pack(partition, len(topic), -1 if key is None else len(key)) + topic + (key or b'') + value
+    return _HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def _decode(body):
+    partition, topic_length, key_length = _BODY.unpack_from(body)
+    start = _BODY.size + topic_length
+    topic = body[_BODY.size:start].decode('utf-8')
+    if key_length < 0:
+        return topic, partition, None, body[start:]
+    return topic, partition, body[start:start + key_length], body[start + key_length:]
+
+
+def _read_records(f, limit=None):
+    """Yield (offset after the record, body) for intact records from f's position, stopping at a torn one"""
+    offset = f.tell()
+    while limit is None or limit > 0:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        length, crc = _HEADER.unpack(header)
+        body = f.read(length)
+        if len(body) < length or zlib.crc32(body) != crc:
+            return
+        offset += _HEADER.size + length
+        yield offset, body
+        if limit is not None:
+            limit -= 1
+
+
+class Spool:
+    """
+    Append-only on-disk queue of Kafka messages, kept in fixed-size segment
+    files under `path`.
+
+    Messages are appended when librdkafka's queue is full or delivery fails,
+    and read back in order by a SpoolDrainer. A cursor file records how far
+    the spool has been drained; segments behind it are deleted. Appends are
+    fsynced at most every `fsync_interval` seconds (0 = every append), so a
+    crash loses at most that much. A record torn by a crash mid-write is cut
+    off when the spool is reopened.
+    """
+
+    def __init__(self, path, segment_bytes, max_bytes, fsync_interval=1.0):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.depth = 0  # Records not yet drained
+        self.size = 0  # Their bytes on disk
+        self.appended = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self.not_empty = threading.Condition(self._lock)
+        self._last_sync = time.monotonic()
+        self._unsynced = False
+
+        os.makedirs(path, exist_ok=True)
+        segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(path) if name.endswith(SEGMENT_SUFFIX)
+        )
+        self._cursor = self._load_cursor(segments)
+
+        for segment in segments:
+            if segment < self._cursor[0]:
+                os.remove(self._segment_path(segment))
+            else:
+                self._recover(segment, self._cursor[1] if segment == self._cursor[0] else 0)
+
+        self._write_segment = max(segments[-1] if segments else 0, self._cursor[0])
+        self._writer = open(self._segment_path(self._write_segment), 'ab')
+        if self.depth:
+            logger.info(f"Spool {path} holds {self.depth} undelivered messages ({self.size / 1024 ** 2:.1f} MiB)")
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, f"{segment:012d}{SEGMENT_SUFFIX}")
+
+    def _load_cursor(self, segments):
+        try:
+            with open(os.path.join(self.path, CURSOR_FILE), 'r', encoding='utf-8') as f:
+                segment, offset = (int(part) for part in f.read().split())
+            return segment, offset
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable spool cursor, draining from the oldest segment: {e}")
+        return (segments[0] if segments else 0), 0
+
+    def _recover(self, segment, start):
+        """Count a segment's undrained records, truncating it at the first damaged one"""
+        path = self._segment_path(segment)
+        with open(path, 'rb+') as f:
+            f.seek(start)
+            end = start
+            for end, _ in _read_records(f):
+                self.depth += 1
+            self.size += end - start
+            lost = os.path.getsize(path) - end
+            if lost:
+                logger.warning(f"Truncating {lost} damaged bytes at the end of spool segment {path}")
+                f.truncate(end)
+
+    def _save_cursor(self):
+        tmp_path = os.path.join(self.path, f"{CURSOR_FILE}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{self._cursor[0]} {self._cursor[1]}")
+        os.replace(tmp_path, os.path.join(self.path, CURSOR_FILE))
+
+    def append(self, topic, partition, key, value):
+        """Add a message; returns False if the spool is full (max_bytes)"""
+        record = _encode(topic, partition, key, value)
+        with self._lock:
+            if self.size + len(record) > self.max_bytes:
+                self.rejected += 1
+                return False
+            if self._writer.tell() >= self.segment_bytes:
+                self._roll()
+            self._writer.write(record)
+            self._writer.flush()
+            self._unsynced = True
+            self.depth += 1
+            self.size += len(record)
+            self.appended += 1
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            self.not_empty.notify_all()
+        return True
+
+    def _roll(self):
+        self._sync()
+        self._writer.close()
+        self._write_segment += 1
+        self._writer = open(self._segment_path(self._write_segment), 'ab')
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._writer.fileno())
+            self._unsynced = False
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """fsync appends made since the last sync"""
+        with self._lock:
+            self._sync()
+
+    def wait(self, timeout):
+        """Wait up to `timeout` seconds for messages; returns True if there are any"""
+        with self.not_empty:
+            if not self.depth:
+                self.not_empty.wait(timeout)
+            return self.depth > 0
+
+    def wake(self):
+        with self.not_empty:
+            self.not_empty.notify_all()
+
+    def read_batch(self, max_records):
+        """
+        The oldest undrained messages, up to `max_records` from one segment,
+        as a list of ((topic, partition, key, value), position) where position
+        is what to pass to commit() once that message and the ones before it
+        are delivered. Reading does not consume; commit() does.
+        """
+        with self._lock:
+            while True:
+                segment, offset = self._cursor
+                with open(self._segment_path(segment), 'rb') as f:
+                    f.seek(offset)
+                    batch = [
+                        (_decode(body), (segment, end))
+                        for end, body in _read_records(f, max_records)
+                    ]
+                if batch or segment >= self._write_segment:
+                    return batch
+                # Drained to the end of a finished segment: move on and delete it
+                self._cursor = (segment + 1, 0)
+                self._save_cursor()
+                os.remove(self._segment_path(segment))
+
+    def commit(self, position, count):
+        """Mark the `count` messages up to `position` (from read_batch) as delivered"""
+        with self._lock:
+            segment, offset = position
+            self.depth -= count
+            self.size -= offset - self._cursor[1]
+            self._cursor = position
+            self._save_cursor()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._writer.close()
+
+
+class SpoolDrainer(threading.Thread):
+    """
+    Background thread producing spooled messages back to Kafka, in order, in
+    batches of up to `batch_size`.
+
+    A batch is committed only once every message in it is delivered (or
+    failed permanently, which is logged and skipped); otherwise it is retried
+    whole after an exponential backoff starting at `retry_delay`. Delivery is
+    therefore at least once: a retried batch can repeat messages that did
+    arrive, which consumers already tolerate since articles are keyed by URL.
+    """
+
+    def __init__(self, spool, producer, metrics, batch_size=1000, retry_delay=1.0, max_backoff=60.0):
+        super().__init__(name='spool-drainer', daemon=True)
+        self.spool = spool
+        self.producer = producer
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Start no new batches; the current one still waits for its delivery reports"""
+        self._stopping.set()
+        self.spool.wake()
+
+    def run(self):
+        failures = 0
+        while not self._stopping.is_set():
+            self.spool.sync()
+            if not self.spool.wait(timeout=1.0):
+                continue
+            try:
+                delivered = self.drain_batch()
+            except Exception as e:
+                logger.error(f"Error draining spool: {e}")
+                delivered = False
+
+            if delivered:
+                failures = 0
+                continue
+            failures += 1
+            delay = min(self.retry_delay * 2 ** (failures - 1), self.max_backoff)
+            logger.warning(f"Spool drain failed ({failures} in a row), {self.spool.depth} waiting, retrying in {delay:g}s")
+            self._stopping.wait(delay)
+
+    def drain_batch(self):
+        """Produce one batch and wait for its delivery reports; returns True if it was committed"""
+        batch = self.spool.read_batch(self.batch_size)
+        if not batch:
+            return True
+
+        lock = threading.Lock()
+        reports = {'done': 0, 'retry': 0, 'dropped': 0}
+
+        def on_delivery(err, msg):
+            self.metrics.on_delivery(err, msg)
+            with lock:
+                reports['done'] += 1
+                if err is None:
+                    return
+                if is_permanent(err):
+                    reports['dropped'] += 1
+                    logger.error(f"Dropping spooled message that can't be delivered: {err}")
+                else:
+                    reports['retry'] += 1
+
+        sent = 0
+        for (topic, partition, key, value), _ in batch:
+            try:
+                self.producer.produce(topic=topic, value=value, key=key, partition=partition, callback=on_delivery)
+            except BufferError:
+                # librdkafka's queue is full; what's left stays spooled for the next batch
+                break
+            sent += 1
+        if not sent:
+            return False
+
+        # Every produced message gets exactly one report, within message.timeout.ms
+        while reports['done'] < sent:
+            self.producer.poll(0.1)
+
+        if reports['retry']:
+            return False
+        self.spool.commit(batch[sent - 1][1], sent)
+        self.metrics.on_drained(sent - reports['dropped'])
+        return True
@@ -0,0 +1,114 @@
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+
+class StoryStateStore:
+    """
+    Persistent per-story state for incremental Hacker News ingestion.
+
+    Remembers, per story_id, the score and comment count last sent to Kafka
+    and when the item was last fetched, so each cycle only re-fetches new or
+    stale items and only re-emits stories whose numbers moved meaningfully.
+    """
+
+    def __init__(self, path, ttl=900, min_score_delta=10, min_comments_delta=10):
+        self.ttl = ttl
+        self.min_score_delta = min_score_delta
+        self.min_comments_delta = min_comments_delta
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stories (
+                story_id   INTEGER PRIMARY KEY,
+                score      INTEGER,
+                comments   INTEGER,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def _fetched_at(self, story_ids):
+        """Map story_id -> last fetch time for the IDs already in the store"""
+        fetched = {}
+        for i in range(0, len(story_ids), _MAX_PARAMS):
+            chunk = story_ids[i:i + _MAX_PARAMS]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT story_id, fetched_at FROM stories WHERE story_id IN ({placeholders})",
+                chunk
+            )
+            fetched.update(rows)
+        return fetched
+
+    def stale_ids(self, story_ids, force=()):
+        """Return IDs (in their original order) that are new, older than the TTL, or forced"""
+        now = time.time()
+        force = set(force)
+        fetched = self._fetched_at(list(story_ids))
+        return [
+            story_id for story_id in story_ids
+            if story_id not in fetched
+            or story_id in force
+            or now - fetched[story_id] >= self.ttl
+        ]
+
+    def observe(self, story_id, score, comments):
+        """
+        Record a freshly fetched story.
+
+        Returns True if the story is new or its score/comments moved past the
+        configured deltas, i.e. it should be sent to Kafka.
+        """
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT score, comments FROM stories WHERE story_id = ?", (story_id,)
+        ).fetchone()
+
+        changed = (
+            row is None
+            or row[0] is None
+            or abs((score or 0) - (row[0] or 0)) >= self.min_score_delta
+            or abs((comments or 0) - (row[1] or 0)) >= self.min_comments_delta
+        )
+
+        if changed:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO stories (story_id, score, comments, fetched_at) VALUES (?, ?, ?, ?)",
+                (story_id, score, comments, now)
+            )
+        else:
+            # Keep the last *emitted* numbers so small changes accumulate
+            self.touch(story_id, now)
+        return changed
+
+    def touch(self, story_id, now=None):
+        """Mark an item as fetched without recording story fields (e.g. jobs, polls)"""
+        self.conn.execute(
+            "INSERT INTO stories (story_id, fetched_at) VALUES (?, ?) "
+            "ON CONFLICT(story_id) DO UPDATE SET fetched_at = excluded.fetched_at",
+            (story_id, now or time.time())
+        )
+
+    def prune(self, max_age):
+        """Drop stories not fetched within max_age seconds; returns the number removed"""
+        cursor = self.conn.execute(
+            "DELETE FROM stories WHERE fetched_at < ?", (time.time() - max_age,)
+        )
+        return cursor.rowcount
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()